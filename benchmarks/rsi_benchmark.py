@@ -0,0 +1,52 @@
+'''
+Times RelativeStrengthIndex.build_df on synthetic histories of 10k to 1M bars.
+The legacy loop is only timed on the smaller sizes, as it takes minutes past that.
+
+Usage: python -m benchmarks.rsi_benchmark [--sizes 10000 100000 1000000] [--legacy-max 10000]
+'''
+from investing_companion.indicators import rsi
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+
+
+def synthetic_close(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100*np.exp(np.cumsum(rng.normal(0.0002, 0.02, n_bars)))
+    index = pd.date_range('2000-01-01', periods=n_bars, freq='min')
+    return pd.DataFrame({'Close': close}, index=index)
+
+
+def legacy_build_df(base_df, window_size):
+    '''The per-bar .iloc loop build_df used to run (one side only)'''
+    upward = base_df['Close'].diff(1).clip(lower=0).round(2)
+    avg = upward.rolling(window_size, min_periods=window_size).mean()
+    for i in range(window_size+1, len(upward)):
+        avg.iloc[i] = (avg.iloc[i-1]*(window_size-1) + upward.iloc[i])/window_size
+    return avg
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--window', type=int, default=14)
+    parser.add_argument('--legacy-max', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    ind = rsi.RelativeStrengthIndex(args.window)
+    print(f'{"bars":>10} {"build_df (s)":>14} {"legacy loop (s)":>16}')
+    for n_bars in args.sizes:
+        df = synthetic_close(n_bars)
+        new = min(timeit.repeat(lambda: ind.build_df(df), number=1, repeat=args.repeat))
+        if n_bars <= args.legacy_max:
+            #The legacy loop smooths gains and losses separately, hence the factor 2
+            old = 2*min(timeit.repeat(lambda: legacy_build_df(df, args.window), number=1, repeat=1))
+            print(f'{n_bars:>10} {new:>14.4f} {old:>16.4f}')
+        else:
+            print(f'{n_bars:>10} {new:>14.4f} {"-":>16}')
+
+
+if __name__ == '__main__':
+    main()
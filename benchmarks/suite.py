@@ -0,0 +1,165 @@
+'''
+Benchmark suite on seeded synthetic OHLCV data. Times and memory-profiles every indicator's
+build_df, create_conditions and backtest_strategy for every strategy Method, and every
+optimize_strat_params, at each of the requested sizes. The results are written as JSON,
+one record per (benchmark, size), so two runs can be diffed with --compare.
+
+The wall time is the best of --repeat runs. The peak memory comes from a separate run under
+tracemalloc, so the tracing doesn't skew the timings. The indicator cache is switched off
+for the whole run.
+
+Usage:
+    python -m benchmarks.suite [--sizes 10000 100000 1000000 10000000] [--groups indicators strategies optimizers]
+                               [--output results.json]
+    python -m benchmarks.suite --compare old.json new.json
+'''
+from investing_companion import indicators
+from investing_companion.indicators import moving_averages, bollinger, macd, rsi
+from investing_companion.strategy import macd_strategy, bollinger_strategy, rsi_strategy, ma_strategy
+from investing_companion import strategy
+from investing_companion.data import synthetic
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+GROUPS = ('indicators', 'strategies', 'optimizers')
+
+INDICATORS = [
+    moving_averages.SimpleMovingAverage(50),
+    moving_averages.ExponentialMovingAverage(20),
+    bollinger.BollingerBands(20, 2),
+    macd.MACD(),
+    rsi.RelativeStrengthIndex(14),
+]
+
+STRATEGIES = [
+    (macd_strategy.Macd_Strategy, {}),
+    (bollinger_strategy.Bollinger_Strategy, {}),
+    (rsi_strategy.RSI_Strategy, {}),
+    (ma_strategy.Ma_Strategy, dict(ma_objs=[moving_averages.SimpleMovingAverage(20),
+                                            moving_averages.ExponentialMovingAverage(50)])),
+]
+
+OPTIMIZERS = [
+    (macd_strategy.Macd_Strategy, {}, dict(fastema_range_to_use=[6, 20], signal_range_to_use=[5, 12],
+                                           max_iterations=3)),
+    (bollinger_strategy.Bollinger_Strategy, {}, dict(ema_range=[10, 40], std_range=[1, 3], max_iterations=3)),
+    (rsi_strategy.RSI_Strategy, {}, dict(rsi_range=[7, 28], buffer_range=[1, 3], max_iterations=3)),
+    (ma_strategy.Ma_Strategy, {}, dict(window_range=(5, 60), window_step=5, max_mas=2)),
+]
+
+
+def synthetic_ohlcv(n_bars, seed=0):
+    '''Seeded GBM OHLCV frame on a minute index (so any size fits in the timestamp range)'''
+    return synthetic.SyntheticSource(n_bars, seed=seed, interval='1m', start='1990-01-01').history('SYN')
+
+
+def measure(func, repeat):
+    '''Best wall time over repeat runs, and the peak traced memory of one more run'''
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak
+
+
+def indicator_benchmarks(base_df):
+    for ind in INDICATORS:
+        yield f'indicator/{type(ind).__name__}/build_df', lambda ind=ind: ind.build_df(base_df)
+
+
+def strategy_benchmarks(base_df):
+    for strategy_cls, kwargs in STRATEGIES:
+        for method in strategy_cls.Method:
+            strat = strategy_cls.from_data(base_df, 'SYN', method=method, **kwargs)
+            name = f'strategy/{strategy_cls.__name__}/{method.name}'
+            yield f'{name}/create_conditions', strat.create_conditions
+            yield f'{name}/backtest_strategy', strat.backtest_strategy
+
+
+def optimizer_benchmarks(base_df):
+    for strategy_cls, kwargs, optimize_kwargs in OPTIMIZERS:
+        strat = strategy_cls.from_data(base_df, 'SYN', **kwargs)
+        yield (f'optimizer/{strategy_cls.__name__}/optimize_strat_params',
+               lambda strat=strat, optimize_kwargs=optimize_kwargs: strat.optimize_strat_params(**optimize_kwargs))
+
+
+def run(sizes, groups, repeat, optimizer_max_bars, seed):
+    benchmarks = {'indicators': indicator_benchmarks, 'strategies': strategy_benchmarks,
+                  'optimizers': optimizer_benchmarks}
+    records = []
+    for n_bars in sizes:
+        base_df = synthetic_ohlcv(n_bars, seed)
+        strategy.BaseStrategy.prepare_frame(base_df)
+        for group in groups:
+            if group == 'optimizers' and n_bars > optimizer_max_bars:
+                records.append({'name': 'optimizer/*', 'bars': n_bars, 'skipped': True})
+                continue
+            for name, func in benchmarks[group](base_df):
+                #The optimizers take long enough that a single timed run is representative
+                seconds, peak = measure(func, 1 if group == 'optimizers' else repeat)
+                records.append({'name': name, 'bars': n_bars, 'seconds': seconds, 'peak_bytes': peak})
+                print(f'{name:<70} {n_bars:>10} {seconds:>10.4f}s {peak/2**20:>10.1f}MB', file=sys.stderr)
+    return records
+
+
+def compare(old_path, new_path):
+    '''Prints the time and memory ratios (new/old) of the benchmarks present in both files'''
+    with open(old_path) as f:
+        old = {(r['name'], r['bars']): r for r in json.load(f)['results'] if not r.get('skipped')}
+    with open(new_path) as f:
+        new = {(r['name'], r['bars']): r for r in json.load(f)['results'] if not r.get('skipped')}
+
+    print(f'{"benchmark":<70} {"bars":>10} {"time":>8} {"memory":>8}')
+    for key in sorted(old.keys() & new.keys()):
+        time_ratio = new[key]['seconds']/old[key]['seconds'] if old[key]['seconds'] else float('nan')
+        memory_ratio = new[key]['peak_bytes']/old[key]['peak_bytes'] if old[key]['peak_bytes'] else float('nan')
+        print(f'{key[0]:<70} {key[1]:>10} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--groups', nargs='+', choices=GROUPS, default=list(GROUPS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--optimizer-max-bars', type=int, default=100_000,
+                        help='the optimizers are skipped on larger sizes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='JSON file (stdout if not set)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    indicators.IndicatorBase.cache = None
+    results = {'meta': {'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                        'python': platform.python_version(), 'numpy': np.__version__,
+                        'pandas': pd.__version__, 'machine': platform.machine(),
+                        'seed': args.seed, 'repeat': args.repeat},
+               'results': run(args.sizes, args.groups, args.repeat, args.optimizer_max_bars, args.seed)}
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=1)
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
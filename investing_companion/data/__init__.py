@@ -0,0 +1,76 @@
+import re
+import pandas as pd
+from abc import ABC, abstractmethod
+
+
+class DataSourceBase(ABC):
+    '''
+    Base class for the OHLCV data sources used by the strategies. Shouldn't be used directly.
+
+    Methods:
+    :history() [Abstract]
+    :cache_key()
+    :slice_history() [static]
+    '''
+    def __init__(self, interval='1d', auto_adjust=True):
+        '''
+        Class constructor.
+        :param interval(str): the bar interval of the data (1d, 1h, 1m, etc). Default='1d'
+        :param auto_adjust(bool): whether the prices are adjusted for splits and dividends. Default=True
+        '''
+        self.interval = interval
+        self.auto_adjust = auto_adjust
+
+    @abstractmethod
+    def history(self, symbol, period='max', start=None, end=None):
+        '''
+        Returns an OHLCV dataframe for symbol. start/end take precedence over period
+        when both of them are set, mirroring yf.Ticker.history()
+        '''
+        raise NotImplementedError()
+
+    def cache_key(self, symbol):
+        '''Key under which the history of symbol is stored by the caching layers'''
+        adjustment = 'adj' if self.auto_adjust else 'raw'
+        return f'{symbol}_{self.interval}_{adjustment}'
+
+    @staticmethod
+    def slice_history(df, period='max', start=None, end=None):
+        '''
+        Slices an already loaded history the same way yfinance would: start is inclusive and
+        end is exclusive. period is taken relative to the last stored bar.
+        '''
+        if start is not None and end is not None:
+            index = df.index
+            mask = (index >= _as_index_timestamp(start, index)) & (index < _as_index_timestamp(end, index))
+            return df.loc[mask]
+
+        if period is None or period == 'max' or df.empty:
+            return df
+
+        last = df.index[-1]
+        if period == 'ytd':
+            first = last.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0, nanosecond=0)
+        else:
+            first = last - _period_offset(period)
+        return df.loc[df.index > first]
+
+
+_PERIOD_UNITS = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+
+
+def _period_offset(period):
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period)
+    if match is None:
+        raise ValueError(f'Unsupported period: {period}')
+    return pd.DateOffset(**{_PERIOD_UNITS[match.group(2)]: int(match.group(1))})
+
+
+def _as_index_timestamp(value, index):
+    ts = pd.Timestamp(value)
+    tz = getattr(index, 'tz', None)
+    if tz is not None and ts.tzinfo is None:
+        ts = ts.tz_localize(tz)
+    elif tz is None and ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts
@@ -0,0 +1,219 @@
+'''
+Concurrent multi-symbol loading. BulkLoader fetches the histories of many symbols from a data
+source on a bounded thread pool, retrying the failed requests with exponential backoff,
+honouring the rate limits (the server's Retry-After and an optional client-side requests per
+second limit) and returning a dict of frames or a (dates x symbols) panel.
+
+The requests of all the workers go through the source's single HTTP session: HttpCsvSource
+builds a pooled requests session sized for the workers, and YahooSource relies on the session
+yfinance shares between its tickers (or the one it is given).
+
+Usage:
+    loader = bulk.BulkLoader(yahoo_source.YahooSource(), max_workers=8, rate_limit=5)
+    frames = loader.load(['AAPL', 'MSFT', 'GOOG'], period='5y')
+    closes = loader.panel(['AAPL', 'MSFT', 'GOOG'], column='Close', period='5y')
+'''
+from concurrent.futures import ThreadPoolExecutor
+from investing_companion import data, instrumentation
+import io
+import random
+import threading
+import time
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:
+    YFRateLimitError = None
+
+
+class RateLimitError(Exception):
+    '''The server refused the request for exceeding its rate limit (HTTP 429)'''
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TransientError(Exception):
+    '''A failure worth retrying (HTTP 5xx)'''
+    pass
+
+
+RETRYABLE = tuple(e for e in (RateLimitError, TransientError, requests.ConnectionError, requests.Timeout,
+                              YFRateLimitError) if e is not None)
+
+
+def pooled_session(pool_size=10):
+    '''requests session keeping up to pool_size connections per host open, for pool_size threads'''
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RateLimiter():
+    '''
+    Token bucket shared by the threads: acquire() blocks until a request is allowed.
+
+    Methods:
+    :acquire()
+    '''
+    def __init__(self, rate, burst=1, clock=time.monotonic, sleep=time.sleep):
+        '''
+        Class constructor.
+        :param rate(float): requests per second
+        :param burst(int): requests allowed at once after a quiet period. Default=1
+        '''
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = burst
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last)*self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens)/self.rate
+            self._sleep(wait)
+
+
+class HttpCsvSource(data.DataSourceBase):
+    '''
+    Data source that downloads each symbol's history as a CSV file (index column first) over HTTP.
+    Any server laid out as <base_url>/<symbol>.csv works, including a static file server.
+
+    Methods:
+    :url()
+    :history()
+    '''
+    def __init__(self, base_url, url_template='{base_url}/{symbol}.csv', session=None, pool_size=10,
+                 timeout=30, interval='1d', auto_adjust=True):
+        '''
+        Class constructor.
+        :param base_url(str): the server's URL
+        :param url_template(str): the URL of a symbol. Default='{base_url}/{symbol}.csv'
+        :param session(requests.Session): the session to use. Default=None (a pooled_session(pool_size))
+        :param pool_size(int): connections kept open when the session is created here. Default=10
+        :param timeout(float): seconds to wait for the server. Default=30
+        :param interval(str): the bar interval of the served data. Default='1d'
+        :param auto_adjust(bool): whether the served prices are adjusted. Default=True
+        '''
+        super().__init__(interval, auto_adjust)
+        self.base_url = base_url.rstrip('/')
+        self.url_template = url_template
+        self.session = pooled_session(pool_size) if session is None else session
+        self.timeout = timeout
+
+    def url(self, symbol):
+        return self.url_template.format(base_url=self.base_url, symbol=symbol)
+
+    def history(self, symbol, period='max', start=None, end=None):
+        '''
+        Raises RateLimitError on HTTP 429, TransientError on 5xx, KeyError when the symbol is not
+        found and requests.HTTPError on other failures
+        '''
+        response = self.session.get(self.url(symbol), timeout=self.timeout)
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            raise RateLimitError(f'Rate limited fetching {symbol}',
+                                 float(retry_after) if retry_after is not None else None)
+        if response.status_code >= 500:
+            raise TransientError(f'HTTP {response.status_code} fetching {symbol}')
+        if response.status_code == 404:
+            raise KeyError(symbol)
+        response.raise_for_status()
+
+        df = pd.read_csv(io.StringIO(response.text), index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True)
+        return self.slice_history(df, period, start=start, end=end)
+
+
+class BulkLoader():
+    '''
+    Fetches the history of many symbols concurrently.
+
+    Methods:
+    :fetch()
+    :load()
+    :panel()
+    '''
+    def __init__(self, source, max_workers=8, retries=3, backoff=0.5, max_backoff=30., rate_limit=None,
+                 burst=1, sleep=time.sleep):
+        '''
+        Class constructor.
+        :param source(DataSourceBase): where the histories are fetched from
+        :param max_workers(int): the most requests in flight at once. Default=8
+        :param retries(int): retries per symbol after a rate limit or a transient failure. Default=3
+        :param backoff(float): seconds before the first retry, doubling (with jitter) on each one. Default=0.5
+        :param max_backoff(float): the longest wait between retries. Default=30
+        :param rate_limit(float): requests per second over all the workers. Default=None (no limit)
+        :param burst(int): requests allowed at once by rate_limit. Default=1
+        :param sleep(callable): how to wait. Default=time.sleep
+        '''
+        self.source = source
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self.limiter = RateLimiter(rate_limit, burst, sleep=sleep) if rate_limit else None
+        self.errors = {}
+
+    def fetch(self, symbol, period='max', start=None, end=None):
+        '''History of one symbol, with the rate limit and the retries applied'''
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            instrumentation.count('bulk.requests')
+            try:
+                if start is not None and end is not None:
+                    return self.source.history(symbol, start=start, end=end)
+                return self.source.history(symbol, period=period)
+            except RETRYABLE as exc:
+                if attempt == self.retries:
+                    raise
+                instrumentation.count('bulk.retries')
+                wait = min(self.max_backoff, self.backoff*2**attempt)*random.uniform(0.5, 1.)
+                retry_after = getattr(exc, 'retry_after', None)
+                self._sleep(max(wait, retry_after) if retry_after is not None else wait)
+
+    def load(self, symbols, period='max', start=None, end=None, raise_errors=False):
+        '''
+        Histories of the symbols, fetched on up to max_workers threads.
+
+        :param period, start, end: same as in DataSourceBase.history()
+        :param raise_errors(bool): raise the first failure instead of leaving the symbol out. Default=False
+        :return: dict symbol -> frame, in the order of symbols. The symbols that failed are left out,
+        with their exception in self.errors
+        '''
+        symbols = list(dict.fromkeys(symbols))
+        self.errors = {}
+
+        def fetch(symbol):
+            try:
+                return self.fetch(symbol, period, start, end)
+            except Exception as exc:
+                if raise_errors:
+                    raise
+                self.errors[symbol] = exc
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            frames = list(pool.map(fetch, symbols))
+        return {symbol: df for symbol, df in zip(symbols, frames) if df is not None}
+
+    def panel(self, symbols, column='Close', period='max', start=None, end=None, raise_errors=False):
+        '''(dates x symbols) DataFrame of one column of the histories, on the union of their dates'''
+        frames = self.load(symbols, period, start, end, raise_errors)
+        return pd.DataFrame({symbol: df[column] for symbol, df in frames.items()})
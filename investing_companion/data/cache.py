@@ -0,0 +1,144 @@
+from investing_companion import data
+from investing_companion.data import file_source
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import os
+
+Refresh = namedtuple('Refresh', ['status', 'new_rows'])
+
+#Columns compared on the overlapping bars to tell whether the stored history was adjusted since
+_PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+class CachedSource(data.DataSourceBase):
+    '''
+    Wraps another data source with an on-disk columnar cache. The first request for a
+    symbol downloads its whole history once and stores it under a key made of
+    symbol/interval/adjustment. Every later request, including start/end and period
+    slices, is then served from local storage. refresh() brings a stored history up to date
+    fetching only the bars after the last stored one.
+
+    Methods:
+    :path()
+    :is_cached()
+    :load()
+    :store()
+    :invalidate()
+    :last_timestamp()
+    :refresh()
+    :history()
+    '''
+    def __init__(self, source, cache_dir, file_format='parquet', keep_in_memory=True):
+        '''
+        Class constructor.
+        :param source(DataSourceBase): the source used on cache misses
+        :param cache_dir(str): directory where the cached files are written. Created if missing
+        :param file_format(str): parquet, csv or pickle. Parquet needs pyarrow or fastparquet. Default='parquet'
+        :param keep_in_memory(bool): also keep the loaded frames in memory so repeat requests within
+        the same process don't hit the disk either. Default=True
+        '''
+        super().__init__(source.interval, source.auto_adjust)
+        self.source = source
+        self.cache_dir = cache_dir
+        self.file_format = file_format
+        self.keep_in_memory = keep_in_memory
+        self._frames = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, symbol):
+        extension = file_source._EXTENSIONS[self.file_format]
+        return os.path.join(self.cache_dir, self.cache_key(symbol) + extension)
+
+    def is_cached(self, symbol):
+        return self.cache_key(symbol) in self._frames or os.path.exists(self.path(symbol))
+
+    def load(self, symbol):
+        '''Returns the full stored history of symbol, downloading it on a cache miss'''
+        key = self.cache_key(symbol)
+        if key in self._frames:
+            return self._frames[key]
+
+        path = self.path(symbol)
+        if os.path.exists(path):
+            df = file_source.read_frame(path, self.file_format)
+        else:
+            df = self.source.history(symbol, period='max')
+            self.store(symbol, df)
+
+        if self.keep_in_memory:
+            self._frames[key] = df
+        return df
+
+    def store(self, symbol, df):
+        file_source.write_frame(df, self.path(symbol), self.file_format)
+        if self.keep_in_memory:
+            self._frames[self.cache_key(symbol)] = df
+
+    def invalidate(self, symbol):
+        self._frames.pop(self.cache_key(symbol), None)
+        path = self.path(symbol)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def last_timestamp(self, symbol):
+        '''The last stored bar of symbol, None if it isn't cached'''
+        if not self.is_cached(symbol):
+            return None
+        df = self.load(symbol)
+        return df.index[-1] if len(df) else None
+
+    def refresh(self, symbol, overlap=3, rtol=1e-6):
+        '''
+        Brings the stored history of symbol up to date. Only the bars from the last few stored ones
+        onwards are fetched: the last stored bar is replaced (it may have been incomplete) and the
+        newer ones are appended. When the prices of the overlapping bars changed, or a new bar has a
+        dividend or split and the prices are adjusted, the earlier history has been adjusted too
+        and the whole of it is downloaded and rewritten.
+
+        :param overlap(int): stored bars fetched again to detect adjustments. Default=3
+        :param rtol(float): relative tolerance of the comparison of the overlapping prices. Default=1e-6
+        :return: Refresh(status, new_rows), status being 'downloaded' (it wasn't cached), 'rewritten',
+        'appended', 'updated' (only the last bar changed) or 'unchanged'
+        '''
+        if self.last_timestamp(symbol) is None:
+            self.invalidate(symbol)
+            return Refresh('downloaded', len(self.load(symbol)))
+
+        df = self.load(symbol)
+        last = df.index[-1]
+        first = df.index[max(len(df) - overlap, 0)]
+        now = pd.Timestamp.now(tz=df.index.tz) if df.index.tz is not None else pd.Timestamp.now()
+        fresh = self.source.history(symbol, start=first, end=now + pd.Timedelta(days=1))
+        if df.index.tz is not None and fresh.index.tz is not None:
+            fresh.index = fresh.index.tz_convert(df.index.tz)
+
+        if self._adjusted(df.loc[df.index < last], fresh, last, rtol):
+            full = self.source.history(symbol, period='max')
+            self.store(symbol, full)
+            return Refresh('rewritten', int((full.index > last).sum()))
+
+        new_rows = int((fresh.index > last).sum())
+        if last in fresh.index:
+            updated = pd.concat([df.iloc[:-1], fresh.loc[fresh.index >= last]])
+        else:
+            updated = pd.concat([df, fresh.loc[fresh.index > last]])
+        if new_rows == 0 and updated.equals(df):
+            return Refresh('unchanged', 0)
+        self.store(symbol, updated)
+        return Refresh('appended' if new_rows else 'updated', new_rows)
+
+    def _adjusted(self, stored, fresh, last, rtol):
+        common = stored.index.intersection(fresh.index)
+        columns = [c for c in _PRICE_COLUMNS if c in stored.columns and c in fresh.columns]
+        if not np.allclose(stored.loc[common, columns].to_numpy(dtype='float64'),
+                           fresh.loc[common, columns].to_numpy(dtype='float64'), rtol=rtol, equal_nan=True):
+            return True
+        if not self.auto_adjust:
+            return False
+        events = [c for c in ('Dividends', 'Stock Splits') if c in fresh.columns]
+        return bool((fresh.loc[fresh.index > last, events] != 0).any().any())
+
+    def history(self, symbol, period='max', start=None, end=None):
+        df = self.load(symbol)
+        return self.slice_history(df, period, start=start, end=end).copy()
@@ -0,0 +1,67 @@
+from investing_companion import data
+import pandas as pd
+import os
+
+_EXTENSIONS = {'parquet': '.parquet', 'csv': '.csv', 'pickle': '.pkl'}
+
+
+def read_frame(path, file_format):
+    '''Reads a stored OHLCV frame, making sure the index comes back as a DatetimeIndex'''
+    if file_format == 'parquet':
+        df = pd.read_parquet(path)
+    elif file_format == 'pickle':
+        df = pd.read_pickle(path)
+    elif file_format == 'csv':
+        df = pd.read_csv(path, index_col=0)
+    else:
+        raise ValueError(f'Unsupported file format: {file_format}')
+
+    if not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index, utc=True)
+    return df
+
+
+def write_frame(df, path, file_format):
+    '''Writes an OHLCV frame. Parquet requires pyarrow or fastparquet to be installed'''
+    if file_format == 'parquet':
+        df.to_parquet(path)
+    elif file_format == 'pickle':
+        df.to_pickle(path)
+    elif file_format == 'csv':
+        df.to_csv(path)
+    else:
+        raise ValueError(f'Unsupported file format: {file_format}')
+
+
+class FileSource(data.DataSourceBase):
+    '''
+    Offline data source. Reads the history of each symbol from a file named
+    <symbol><extension> inside a directory, so no network access is needed.
+
+    Methods:
+    :path()
+    :history()
+    '''
+    def __init__(self, directory, file_format='parquet', interval='1d', auto_adjust=True):
+        '''
+        Class constructor.
+        :param directory(str): the directory holding one file per symbol
+        :param file_format(str): parquet, csv or pickle. Default='parquet'
+        :param interval(str): the bar interval of the stored files. Default='1d'
+        :param auto_adjust(bool): whether the stored prices are adjusted. Default=True
+        '''
+        super().__init__(interval, auto_adjust)
+        if file_format not in _EXTENSIONS:
+            raise ValueError(f'Unsupported file format: {file_format}')
+        self.directory = directory
+        self.file_format = file_format
+
+    def path(self, symbol):
+        return os.path.join(self.directory, symbol + _EXTENSIONS[self.file_format])
+
+    def history(self, symbol, period='max', start=None, end=None):
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'No stored history for {symbol} ({path})')
+        df = read_frame(path, self.file_format)
+        return self.slice_history(df, period, start=start, end=end).copy()
@@ -0,0 +1,229 @@
+'''
+Memory-mapped columnar storage for long histories (years of minute bars). Each symbol is a
+directory with one raw binary file per column, an int64 file with the timestamps of the bars
+(nanoseconds, UTC) and a small meta.json with the dtypes, the timezone and the row count.
+The files are appended to chunk by chunk, so a history never has to fit in memory to be written,
+and they are read through np.memmap: the frames MmapStore.frame() and MmapSource.history() return
+are views on the mapped files, one column per block, for any date range. Only the pages the
+computations touch are read in, and the OS can drop them again under memory pressure.
+
+BaseStrategy.prepare_data() and the compact mode (see BaseStrategy) keep the price columns of
+such a frame as views, so a compact strategy over a memory-mapped history only allocates the
+columns it computes (returns, indicators, signals and positions).
+
+Usage:
+    store = mmap_store.MmapStore('/data/minute')
+    store.write_chunks('AAPL', synthetic.SyntheticSource(n_bars=10_000_000, interval='1m').iter_chunks('AAPL'))
+    strat = rsi_strategy.RSI_Strategy('AAPL', start='2020-01-01', end='2021-01-01',
+                                      data_source=mmap_store.MmapSource(store), compact=True, float_dtype='float32')
+'''
+from investing_companion import data
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+_INDEX_FILE = 'index.bin'
+_META_FILE = 'meta.json'
+
+
+class MmapStore():
+    '''
+    Directory of memory-mapped per-symbol column files.
+
+    Methods:
+    :path()
+    :symbols()
+    :meta()
+    :append()
+    :write()
+    :write_chunks()
+    :delete()
+    :columns()
+    :index_values()
+    :locate()
+    :frame()
+    '''
+    def __init__(self, directory, float_dtype=None):
+        '''
+        Class constructor.
+        :param directory(str): where the symbols are stored. Created if missing
+        :param float_dtype(str): dtype the float columns are stored as (ie 'float32' to halve the
+        files). Default=None (the dtypes of the first frame written)
+        '''
+        self.directory = directory
+        self.float_dtype = None if float_dtype is None else np.dtype(float_dtype)
+        self._maps = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol, name=None):
+        folder = os.path.join(self.directory, symbol)
+        return folder if name is None else os.path.join(folder, name)
+
+    def symbols(self):
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.exists(self.path(name, _META_FILE)))
+
+    def meta(self, symbol):
+        '''dict with the column dtypes, the timezone and the rows of symbol, None if it isn't stored'''
+        path = self.path(symbol, _META_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def append(self, symbol, df):
+        '''
+        Appends the bars of df, which have to be after the last stored one, to the files of symbol
+        (creating them on the first call). The columns have to be the same on every call.
+        '''
+        meta = self.meta(symbol)
+        if meta is None:
+            os.makedirs(self.path(symbol), exist_ok=True)
+            dtypes = {name: self._storage_dtype(dtype) for name, dtype in df.dtypes.items()}
+            meta = {'columns': {name: dtype.str for name, dtype in dtypes.items()},
+                    'tz': str(df.index.tz) if df.index.tz is not None else None, 'rows': 0}
+        elif list(df.columns) != list(meta['columns']):
+            raise ValueError(f'{symbol} is stored with the columns {list(meta["columns"])}')
+        if df.empty:
+            return
+
+        stamps = self._utc_nanoseconds(df.index)
+        if meta['rows'] and stamps[0] <= self.index_values(symbol)[-1]:
+            raise ValueError(f'The bars appended to {symbol} have to be after the last stored one')
+
+        self._maps.pop(symbol, None)
+        with open(self.path(symbol, _INDEX_FILE), 'ab') as f:
+            f.write(stamps.tobytes())
+        for name, dtype in meta['columns'].items():
+            with open(self.path(symbol, name + '.bin'), 'ab') as f:
+                f.write(df[name].to_numpy(dtype=np.dtype(dtype)).tobytes())
+        meta['rows'] += len(df)
+        with open(self.path(symbol, _META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+    def write(self, symbol, df):
+        '''Stores df as the history of symbol, replacing what was stored'''
+        self.delete(symbol)
+        self.append(symbol, df)
+
+    def write_chunks(self, symbol, chunks):
+        '''Stores the consecutive frames of an iterable (ie SyntheticSource.iter_chunks()) one at a time'''
+        self.delete(symbol)
+        for chunk in chunks:
+            self.append(symbol, chunk)
+
+    def delete(self, symbol):
+        self._maps.pop(symbol, None)
+        if os.path.exists(self.path(symbol)):
+            shutil.rmtree(self.path(symbol))
+
+    def _storage_dtype(self, dtype):
+        if self.float_dtype is not None and np.issubdtype(dtype, np.floating):
+            return self.float_dtype
+        return np.dtype(dtype)
+
+    @staticmethod
+    def _utc_nanoseconds(index):
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        return index.asi8.astype('int64')
+
+    def _mapped(self, symbol):
+        if symbol not in self._maps:
+            meta = self.meta(symbol)
+            if meta is None:
+                raise KeyError(symbol)
+            rows = meta['rows']
+
+            def open_map(name, dtype):
+                if rows == 0:
+                    return np.empty(0, dtype=dtype)
+                return np.memmap(self.path(symbol, name), dtype=dtype, mode='r', shape=(rows,))
+
+            columns = {name: open_map(name + '.bin', np.dtype(dtype)) for name, dtype in meta['columns'].items()}
+            self._maps[symbol] = (open_map(_INDEX_FILE, np.dtype('int64')), columns, meta['tz'])
+        return self._maps[symbol]
+
+    def columns(self, symbol):
+        '''dict column name -> read-only memory-mapped array with every stored bar'''
+        return self._mapped(symbol)[1]
+
+    def index_values(self, symbol):
+        '''Read-only memory-mapped int64 array with the UTC nanosecond timestamps of the bars'''
+        return self._mapped(symbol)[0]
+
+    def locate(self, symbol, start=None, end=None):
+        '''
+        Row positions [first, last) of the bars from start (inclusive) to end (exclusive), found by
+        binary search on the mapped index. Naive timestamps are taken in the stored timezone
+        '''
+        stamps, _, tz = self._mapped(symbol)
+
+        def position(value, default):
+            if value is None:
+                return default
+            ts = pd.Timestamp(value)
+            if ts.tzinfo is None and tz is not None:
+                ts = ts.tz_localize(tz)
+            ts = ts.tz_convert('UTC').tz_localize(None) if ts.tzinfo is not None else ts
+            return int(np.searchsorted(stamps, ts.value, side='left'))
+
+        return position(start, 0), position(end, len(stamps))
+
+    def frame(self, symbol, start=None, end=None, columns=None):
+        '''
+        OHLCV DataFrame of the bars of symbol from start (inclusive) to end (exclusive). The
+        columns are views on the mapped files (read-only); only the index is built in memory.
+
+        :param columns(list): the columns to include. Default=None (all of them)
+        '''
+        stamps, mapped, tz = self._mapped(symbol)
+        first, last = self.locate(symbol, start, end)
+        index = pd.DatetimeIndex(np.asarray(stamps[first:last]).view('M8[ns]'), name='Date')
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        names = list(mapped) if columns is None else list(columns)
+        if not names:
+            return pd.DataFrame(index=index)
+        return pd.concat([pd.Series(mapped[name][first:last], index=index, name=name, copy=False)
+                          for name in names], axis=1, copy=False)
+
+
+class MmapSource(data.DataSourceBase):
+    '''
+    Data source that serves the histories of an MmapStore as zero-copy views.
+
+    Methods:
+    :history()
+    '''
+    def __init__(self, store, interval='1m', auto_adjust=True):
+        '''
+        Class constructor.
+        :param store(MmapStore): the store
+        :param interval(str): the bar interval of the stored histories. Default='1m'
+        :param auto_adjust(bool): whether the stored prices are adjusted. Default=True
+        '''
+        super().__init__(interval, auto_adjust)
+        self.store = store
+
+    def history(self, symbol, period='max', start=None, end=None):
+        if start is not None and end is not None:
+            return self.store.frame(symbol, start, end)
+        if period is None or period == 'max':
+            return self.store.frame(symbol)
+
+        stamps = self.store.index_values(symbol)
+        if len(stamps) == 0:
+            return self.store.frame(symbol)
+        tz = self.store.meta(symbol)['tz']
+        last = pd.Timestamp(int(stamps[-1]), tz='UTC')
+        last = last.tz_convert(tz) if tz is not None else last.tz_localize(None)
+        if period == 'ytd':
+            first = last.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0, nanosecond=0)
+        else:
+            first = last - data._period_offset(period)
+        #Bars after first, like DataSourceBase.slice_history()
+        return self.store.frame(symbol, first + pd.Timedelta(1, 'ns'))
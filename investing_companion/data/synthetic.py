@@ -0,0 +1,205 @@
+from investing_companion import data
+import hashlib
+import numpy as np
+import pandas as pd
+
+#pandas frequency of the generated index for each yfinance interval
+_FREQUENCIES = {'1m': 'min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+                '60m': 'h', '90m': '90min', '1h': 'h', '1d': 'B', '5d': '5B', '1wk': 'W-MON',
+                '1mo': 'MS', '3mo': 'QS'}
+
+#Bars per year of each interval, used to scale the annualized model parameters. The intraday
+#indexes run round the clock (365.25 days of 24 hours), the daily ones on business days (252)
+_BARS_PER_YEAR = {'1m': 525960, '2m': 262980, '5m': 105192, '15m': 35064, '30m': 17532, '60m': 8766,
+                  '90m': 5844, '1h': 8766, '1d': 252, '5d': 50.4, '1wk': 52, '1mo': 12, '3mo': 4}
+
+MODELS = ('gbm', 'regime', 'jump')
+
+
+class SyntheticSource(data.DataSourceBase):
+    '''
+    Offline data source that generates seeded OHLCV histories, so strategies can be run and
+    load-tested on any number of symbols and bars without network access.
+
+    The log returns of the Close follow one of three models:
+    - 'gbm': geometric brownian motion with the given drift and volatility
+    - 'regime': a two-state Markov chain switching between the (drift, volatility) pairs of regimes
+    - 'jump': geometric brownian motion plus Poisson jumps with normally distributed log sizes
+    Drifts, volatilities and the jump intensity are annualized and scaled to the bar interval,
+    over the calendar the index uses: business days for the daily bars, and round the clock for
+    the intraday ones, which have no sessions, nights or weekends (a year of 1m bars is 525,960
+    bars). Select trading hours afterwards with indicators.timeframes.Session if needed.
+    Open, High, Low and Volume are derived from the Close path with seeded noise.
+
+    The bars are generated in fixed blocks of block_size bars, each from its own generator seeded
+    with (seed, symbol, block number), carrying the last Close and regime over to the next block.
+    A history is therefore the same whatever the chunk size it is read with, and iter_chunks()
+    never holds more than one chunk in memory. Daily-or-longer intervals are bounded by the pandas
+    timestamp range (year 2262), so use an intraday interval for tens of millions of bars.
+
+    Methods:
+    :symbols() [static]
+    :iter_chunks()
+    :history()
+    '''
+    def __init__(self, n_bars=2520, model='gbm', seed=0, interval='1d', start='2000-01-03', tz=None,
+                 initial_price=100., drift=0.07, volatility=0.25, regimes=((0.12, 0.15), (-0.25, 0.45)),
+                 switch_probabilities=(0.01, 0.05), jump_intensity=2.5, jump_mean=-0.02, jump_std=0.05,
+                 block_size=65536):
+        '''
+        Class constructor.
+        :param n_bars(int): the number of bars of every symbol's history. Default=2520
+        :param model(str): 'gbm', 'regime' or 'jump'. Default='gbm'
+        :param seed(int): the base seed. Default=0
+        :param interval(str): the bar interval (1m, 5m, 1h, 1d, 1wk, etc). Default='1d'
+        :param start: the timestamp of the first bar. Default='2000-01-03'
+        :param tz(str): timezone of the index. Default=None (naive)
+        :param initial_price(float): the Close before the first bar. Default=100
+        :param drift(float): the annual expected return of the 'gbm' and 'jump' models. Default=0.07
+        :param volatility(float): the annual volatility of the 'gbm' and 'jump' models. Default=0.25
+        :param regimes(tuple): the annual (drift, volatility) of each regime of the 'regime' model.
+        Default=((0.12, 0.15), (-0.25, 0.45))
+        :param switch_probabilities(tuple): the probability per bar of leaving each regime. Default=(0.01, 0.05)
+        :param jump_intensity(float): the expected number of jumps per year of the 'jump' model. Default=2.5
+        :param jump_mean(float): the mean log size of a jump. Default=-0.02
+        :param jump_std(float): the standard deviation of the log size of a jump. Default=0.05
+        :param block_size(int): the number of bars generated from each seeded generator. Default=65536
+        '''
+        super().__init__(interval, True)
+        if model not in MODELS:
+            raise ValueError(f'Unsupported model: {model}. Use one of {MODELS}')
+        if interval not in _FREQUENCIES:
+            raise ValueError(f'Unsupported interval: {interval}')
+        if len(regimes) != 2 or len(switch_probabilities) != 2:
+            raise ValueError('The regime model takes exactly two regimes')
+        if not all(0 < p <= 1 for p in switch_probabilities):
+            raise ValueError('The switch probabilities have to be in (0, 1]')
+        self.n_bars = int(n_bars)
+        self.model = model
+        self.seed = int(seed)
+        self.dt = 1/_BARS_PER_YEAR[interval]
+        self.freq = pd.tseries.frequencies.to_offset(_FREQUENCIES[interval])
+        self.start = pd.Timestamp(start)
+        self.tz = tz
+        self.initial_price = float(initial_price)
+        self.drift = drift
+        self.volatility = volatility
+        self.regimes = np.asarray(regimes, dtype='float64')
+        self.switch_probabilities = tuple(switch_probabilities)
+        self.jump_intensity = jump_intensity
+        self.jump_mean = jump_mean
+        self.jump_std = jump_std
+        self.block_size = int(block_size)
+
+    @staticmethod
+    def symbols(count, prefix='SYN'):
+        '''count symbol names (SYN0000, SYN0001...) to request from the source'''
+        width = max(len(str(count - 1)), 4)
+        return [f'{prefix}{i:0{width}d}' for i in range(count)]
+
+    def cache_key(self, symbol):
+        return f'{symbol}_{self.interval}_{self.model}_{self.seed}'
+
+    def _symbol_seed(self, symbol):
+        #Stable across processes, unlike hash()
+        return int.from_bytes(hashlib.blake2b(symbol.encode(), digest_size=8).digest(), 'little')
+
+    def _regime_path(self, rng, n, regime):
+        '''Regime of each bar of a block starting in regime. The run lengths are geometric'''
+        path = np.empty(n, dtype='int8')
+        filled = 0
+        while filled < n:
+            run = int(rng.geometric(self.switch_probabilities[regime]))
+            path[filled:filled+run] = regime
+            filled += run
+            regime = 1 - regime
+        return path
+
+    def _returns(self, rng, n, regime):
+        '''
+        Log returns of the Close for one block, their volatility per bar and the regime the
+        next block starts in
+        '''
+        shocks = rng.standard_normal(n)
+        if self.model == 'regime':
+            path = self._regime_path(rng, n, regime)
+            drift, volatility, regime = self.regimes[path, 0], self.regimes[path, 1], int(path[-1])
+        else:
+            drift, volatility = self.drift, self.volatility
+        returns = (drift - volatility*volatility/2)*self.dt + volatility*np.sqrt(self.dt)*shocks
+
+        if self.model == 'jump':
+            jumps = rng.poisson(self.jump_intensity*self.dt, n)
+            has_jumps = jumps > 0
+            returns[has_jumps] += rng.normal(self.jump_mean*jumps[has_jumps],
+                                             self.jump_std*np.sqrt(jumps[has_jumps]))
+        return returns, volatility*np.sqrt(self.dt), regime
+
+    def _blocks(self, symbol, n_bars):
+        '''
+        Yields the OHLCV arrays of each block of the history of symbol. Every block is drawn in
+        full and then cut, so a shorter history is always the start of a longer one
+        '''
+        symbol_seed = self._symbol_seed(symbol)
+        close, regime = self.initial_price, 0
+        n = self.block_size
+        for block, first in enumerate(range(0, n_bars, n)):
+            rng = np.random.default_rng([self.seed, symbol_seed, block])
+            returns, scale, regime = self._returns(rng, n, regime)
+
+            closes = close*np.exp(np.cumsum(returns))
+            previous = np.concatenate(([close], closes[:-1]))
+            opens = previous*np.exp(rng.normal(0, scale/4, n))
+            highs = np.maximum(opens, closes)*np.exp(np.abs(rng.normal(0, scale/2, n)))
+            lows = np.minimum(opens, closes)*np.exp(-np.abs(rng.normal(0, scale/2, n)))
+            #Busier bars on larger moves
+            volumes = np.round(1e6*np.exp(rng.normal(0, 0.3, n))*(1 + np.abs(returns)/np.maximum(scale, 1e-12)))
+            close = closes[-1]
+            size = min(n, n_bars - first)
+            yield {'Open': opens[:size], 'High': highs[:size], 'Low': lows[:size], 'Close': closes[:size],
+                   'Volume': volumes[:size]}
+
+    def _index(self, first, periods):
+        index = pd.date_range(first, periods=periods, freq=self.freq, tz=self.tz, name='Date')
+        index.freq = None
+        return index
+
+    def iter_chunks(self, symbol, chunk_size=1_000_000, n_bars=None):
+        '''
+        Yields the history of symbol as consecutive OHLCV dataframes of chunk_size bars
+        (the last one can be shorter). Concatenated, they equal history(symbol).
+
+        :param symbol(str): the symbol
+        :param chunk_size(int): bars per chunk. Default=1_000_000
+        :param n_bars(int): the number of bars to generate. Default=None (the source's n_bars)
+        '''
+        n_bars = self.n_bars if n_bars is None else int(n_bars)
+        first = self.freq.rollforward(self.start.tz_localize(self.tz) if self.tz else self.start)
+        pending, pending_bars = [], 0
+
+        def make_chunk(size):
+            nonlocal first, pending, pending_bars
+            columns = pending[0] if len(pending) == 1 else\
+                {name: np.concatenate([block[name] for block in pending]) for name in pending[0]}
+            index = self._index(first, size)
+            chunk = pd.DataFrame({name: values[:size] for name, values in columns.items()}, index=index)
+            chunk['Dividends'] = 0.
+            chunk['Stock Splits'] = 0.
+            first = index[-1] + self.freq
+            pending = [{name: values[size:] for name, values in columns.items()}]
+            pending_bars -= size
+            return chunk
+
+        for block in self._blocks(symbol, n_bars):
+            pending.append(block)
+            pending_bars += len(block['Close'])
+            while pending_bars >= chunk_size:
+                yield make_chunk(chunk_size)
+        if pending_bars:
+            yield make_chunk(pending_bars)
+
+    def history(self, symbol, period='max', start=None, end=None):
+        if self.n_bars < 1:
+            raise ValueError('n_bars has to be positive')
+        df = next(self.iter_chunks(symbol, chunk_size=self.n_bars))
+        return self.slice_history(df, period, start=start, end=end)
@@ -0,0 +1,28 @@
+from investing_companion import data
+import yfinance as yf
+
+
+class YahooSource(data.DataSourceBase):
+    '''
+    Data source that downloads the history from Yahoo Finance through yfinance.
+    This is what BaseStrategy uses when no other source is provided.
+
+    Methods:
+    :history()
+    '''
+    def __init__(self, interval='1d', auto_adjust=True, session=None):
+        '''
+        Class constructor.
+        :param interval(str): the bar interval requested to yfinance. Default='1d'
+        :param auto_adjust(bool): whether to request adjusted prices. Default=True
+        :param session: optional HTTP session handed over to yf.Ticker
+        '''
+        super().__init__(interval, auto_adjust)
+        self.session = session
+
+    def history(self, symbol, period='max', start=None, end=None):
+        ticker = yf.Ticker(symbol, session=self.session)
+        if start is not None and end is not None:
+            return ticker.history(start=start, end=end,
+                                  interval=self.interval, auto_adjust=self.auto_adjust)
+        return ticker.history(period=period, interval=self.interval, auto_adjust=self.auto_adjust)
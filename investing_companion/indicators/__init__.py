@@ -1,3 +1,7 @@
+from investing_companion.indicators import cache, price_points
+from investing_companion import instrumentation
+import functools
+
 
 class IndicatorBase():
     '''
@@ -7,7 +11,23 @@ class IndicatorBase():
     :set_parameters(): When seeking to change the column names, call this one instead of modifying
     the instance variable directly as it also calls set_column_names()
     :set_column_names(): To be implemented by the child classes
+    :build_columns(): To be implemented by the child classes
+    :get_price_series(): the price_point series of a frame, derived ones (HL2, HLC3...) included
+    :node_columns(): build_columns() in terms of the shared nodes of a pipeline (see indicators.pipeline)
+
+    The build_df() of every child class goes through the indicator cache (see indicators.cache).
+    Set IndicatorBase.cache (or the attribute of a single instance) to None to bypass it.
+    build_df() and build_columns() are recorded by the active profiler, if any (see
+    investing_companion.instrumentation), along with the cache hits and misses.
     '''
+    cache = cache.default_cache
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'build_df' in cls.__dict__:
+            cls.build_df = _cached_build_df(cls.__dict__['build_df'])
+        instrumentation.instrument_class(cls, ('build_df', 'build_columns'))
+
     def __init__(self,price_point='Close',tag=str()):
         '''
         Class constructor.
@@ -20,8 +40,54 @@ class IndicatorBase():
     def set_column_names(self):
         pass
 
+    def build_columns(self, prices):
+        '''
+        Computes the indicator from the prices. build_df() is built on top of it.
+
+        :param prices(pd.Series or pd.DataFrame): a price series, or a (bars x symbols) frame of
+        prices to compute the indicator for every column at once
+        :return: dict of column name -> values, of the same type as prices
+        '''
+        raise NotImplementedError()
+
+    def node_columns(self, nodes):
+        '''
+        Same as build_columns(), but requesting the intermediate series from the nodes of a
+        pipeline run so that the indicators built together share them. The child classes override
+        it; by default only the price point is shared.
+
+        :param nodes(pipeline.Nodes): the nodes of the run
+        :return: dict of column name -> values
+        '''
+        return self.build_columns(nodes[nodes.price(self.price_point)])
+
+    def get_price_series(self, base_df):
+        '''
+        The series the indicator is computed on: the price_point column of base_df, or the derived
+        price point (see indicators.price_points) when base_df has no such column
+        '''
+        return price_points.get(base_df, self.price_point)
+
     def set_parameters(self, *args, **kwargs):
         for key, val in kwargs.items():
             if key in self.__dict__:
                 self.__setattr__(key, val)
         self.set_column_names()
+
+
+def _cached_build_df(build_df):
+    @functools.wraps(build_df)
+    def wrapper(self, base_df, *args, **kwargs):
+        store = self.cache
+        if store is None or args or kwargs:
+            return build_df(self, base_df, *args, **kwargs)
+
+        key = store.make_key(self, self.get_price_series(base_df))
+        df = store.get(key)
+        instrumentation.count('indicator_cache.misses' if df is None else 'indicator_cache.hits')
+        if df is None:
+            df = build_df(self, base_df)
+            store.put(key, df)
+        #Callers are free to modify what they get back, so the cached frame is never handed out
+        return df.copy()
+    return wrapper
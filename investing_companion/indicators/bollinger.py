@@ -1,4 +1,6 @@
 from investing_companion import indicators
+from investing_companion.indicators import streaming
+from investing_companion.indicators import rolling_moments
 import pandas as pd
 
 class BollingerBands(indicators.IndicatorBase):
@@ -7,7 +9,11 @@ class BollingerBands(indicators.IndicatorBase):
 
     Methods:
     :set_column_names()
+    :build_columns()
+    :node_columns()
     :build_df()
+    :build_multi_df()
+    :to_stream()
     '''
     def __init__(self, window_size = 20, std_deviations=2, price_point='Close', tag='Boll_Bands'):
         '''
@@ -33,13 +39,57 @@ class BollingerBands(indicators.IndicatorBase):
         self.lower_band_name = f'BB_Lower{(self.window_size,self.std_deviations)}'
 
     
-    def build_df(self, base_df):
-        sma = base_df[self.price_point].rolling(self.window_size, min_periods=self.window_size).mean()
-        stdev = base_df[self.price_point].rolling(self.window_size, min_periods=self.window_size).std(ddof=0)
+    def build_columns(self, prices):
+        sma = prices.rolling(self.window_size, min_periods=self.window_size).mean()
+        stdev = prices.rolling(self.window_size, min_periods=self.window_size).std(ddof=0)
         upper_band = sma + stdev*self.std_deviations
         lower_band = sma - stdev*self.std_deviations
+        return {self.upper_band_name: upper_band,
+                self.lower_band_name: lower_band,}
+
 
-        df = pd.DataFrame({self.upper_band_name: upper_band,
-                           self.lower_band_name: lower_band,})
+    def node_columns(self, nodes):
+        price = nodes.price(self.price_point)
+        sma = nodes[nodes.sma(price, self.window_size)]
+        stdev = nodes[nodes.rolling_std(price, self.window_size)]
+        return {self.upper_band_name: sma + stdev*self.std_deviations,
+                self.lower_band_name: sma - stdev*self.std_deviations}
 
+
+    def build_df(self, base_df):
+        df = pd.DataFrame(self.build_columns(self.get_price_series(base_df)))
         return df
+
+
+    def build_multi_df(self, base_df, window_sizes, std_deviations=None, compensated=True):
+        '''
+        Builds the bands of several window sizes (and band widths) at once. The rolling mean and
+        standard deviation of every window come from a single set of prefix sums
+        (see rolling_moments.RollingMoments), instead of two rolling passes per window.
+
+        :param base_df(pd.DataFrame): the OHLCV frame
+        :param window_sizes(list[int]): the window sizes
+        :param std_deviations(list[float]): the band widths. Default=None (the instance's)
+        :param compensated(bool): use the numerically stable prefix sums. Default=True
+        :return: DataFrame with the upper and lower band of every (window, width), named like
+        build_df() names them
+        '''
+        window_sizes = list(dict.fromkeys(int(w) for w in window_sizes))
+        std_deviations = [self.std_deviations] if std_deviations is None else std_deviations
+        moments = rolling_moments.RollingMoments(self.get_price_series(base_df), max(window_sizes),
+                                                 compensated=compensated)
+        columns = {}
+        for window in window_sizes:
+            sma, stdev = moments.mean_std(window)
+            for width in std_deviations:
+                columns[f'BB_Upper{(window, width)}'] = sma + stdev*width
+                columns[f'BB_Lower{(window, width)}'] = sma - stdev*width
+        return pd.DataFrame(columns, index=base_df.index)
+
+
+    def to_stream(self):
+        '''
+        :return: a StreamingBollinger that keeps the last row of build_df() up to date one bar at a time.
+        Call initialize() on it with the history before the first update()
+        '''
+        return streaming.StreamingBollinger(self)
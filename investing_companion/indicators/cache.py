@@ -0,0 +1,145 @@
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+import re
+import threading
+import numpy as np
+import pandas as pd
+
+#Names of the spilled entries (see IndicatorCache._spill_path()), other files in spill_dir are left alone
+_SPILL_FILE = re.compile(r'[0-9a-f]{40}\.pkl')
+
+
+class IndicatorCache():
+    '''
+    Memoizing LRU cache for the frames returned by IndicatorBase.build_df(). Entries are keyed
+    by the indicator class, its parameters (price_point included) and a fingerprint of the input
+    series, so the same indicator on the same prices is only computed once across strategies,
+    optimizer iterations and notebook reruns.
+
+    Methods:
+    :make_key()
+    :get()
+    :put()
+    :clear()
+    :stats()
+    :fingerprint() [static]
+    '''
+    def __init__(self, max_bytes=256*2**20, spill_dir=None):
+        '''
+        Class constructor.
+        :param max_bytes(int): memory budget for the cached frames. The least recently used
+        entries are evicted past it. Default=256MB
+        :param spill_dir(str): if set, evicted entries are written there and read back on a later
+        miss instead of being recomputed. Default=None (evicted entries are dropped)
+        '''
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def make_key(self, indicator, series):
+        params = repr(sorted((k, v) for k, v in vars(indicator).items() if k != 'tag'))
+        cls = type(indicator)
+        return (f'{cls.__module__}.{cls.__qualname__}', params, self.fingerprint(series))
+
+    def get(self, key):
+        '''Returns the cached frame for key (None on a miss), updating the hit/miss counters'''
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        df = self._read_spilled(key)
+        with self._lock:
+            if df is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.spill_hits += 1
+        self.put(key, df)
+        return df
+
+    def put(self, key, df):
+        size = int(df.memory_usage(index=True).sum())
+        evicted = []
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                evicted.append((key, df))
+            else:
+                self._entries[key] = (df, size)
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    old_key, (old_df, old_size) = self._entries.popitem(last=False)
+                    self.current_bytes -= old_size
+                    self.evictions += 1
+                    evicted.append((old_key, old_df))
+
+        for old_key, old_df in evicted:
+            self._spill(old_key, old_df)
+
+    def clear(self, spilled=True):
+        '''
+        Empties the cache and resets its counters.
+        :param spilled(bool): also delete the entries spilled to spill_dir. Default=True
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = self.spill_hits = 0
+            if spilled and self.spill_dir is not None:
+                for name in os.listdir(self.spill_dir):
+                    if _SPILL_FILE.fullmatch(name):
+                        os.remove(os.path.join(self.spill_dir, name))
+
+    def stats(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'spill_hits': self.spill_hits,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes}
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.pkl')
+
+    def _spill(self, key, df):
+        if self.spill_dir is None:
+            return
+        with open(self._spill_path(key), 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _read_spilled(self, key):
+        if self.spill_dir is None or not os.path.exists(self._spill_path(key)):
+            return None
+        with open(self._spill_path(key), 'rb') as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def fingerprint(series):
+        '''Hash of the values, index and name of a series'''
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((series.name, series.dtype, len(series))).encode())
+        h.update(np.ascontiguousarray(series.to_numpy()))
+        index = series.index
+        if isinstance(index, pd.DatetimeIndex):
+            h.update(np.ascontiguousarray(index.asi8))
+            h.update(str(index.tz).encode())
+        else:
+            h.update(np.ascontiguousarray(pd.util.hash_pandas_object(index).to_numpy()))
+        return h.hexdigest()
+
+
+default_cache = IndicatorCache()
@@ -1,4 +1,5 @@
 from investing_companion import indicators
+from investing_companion.indicators import streaming
 import pandas as pd
 
 class MACD(indicators.IndicatorBase):
@@ -6,7 +7,10 @@ class MACD(indicators.IndicatorBase):
     The Class used to calculate the MACD indicator. Inherits from IndicatorBase.
 
     Methods:
+    :build_columns()
+    :node_columns()
     :build_df()
+    :to_stream()
     :set_column_names()
     '''
     def __init__(self, 
@@ -43,14 +47,14 @@ class MACD(indicators.IndicatorBase):
         self.ppo_name = f'MACD%{(self.slowema_window, self.fastema_window, self.signal_window)}'
         
 
-    def build_df(self, base_df):
-        slow_ema = base_df[self.price_point].ewm(span=self.slowema_window,
-                                    min_periods=self.slowema_window, 
-                                    adjust=False).mean()
+    def build_columns(self, prices):
+        slow_ema = prices.ewm(span=self.slowema_window,
+                              min_periods=self.slowema_window, 
+                              adjust=False).mean()
         
-        fast_ema = base_df[self.price_point].ewm(span = self.fastema_window,
-                                    min_periods=self.fastema_window, 
-                                    adjust=False).mean()
+        fast_ema = prices.ewm(span = self.fastema_window,
+                              min_periods=self.fastema_window, 
+                              adjust=False).mean()
 
         macd_line = fast_ema.subtract(slow_ema)
 
@@ -60,10 +64,31 @@ class MACD(indicators.IndicatorBase):
                                     min_periods=self.signal_window, 
                                     adjust=False).mean()
 
-        df = pd.DataFrame({self.macd_name: macd_line,
-                           self.ppo_name : ppo_value,
-                           self.signal_name: signal_line, 
-                           self.histogram_name: macd_line-signal_line})
+        return {self.macd_name: macd_line,
+                self.ppo_name : ppo_value,
+                self.signal_name: signal_line, 
+                self.histogram_name: macd_line-signal_line}
+
+
+    def node_columns(self, nodes):
+        price = nodes.price(self.price_point)
+        slow, fast = nodes.ema(price, self.slowema_window), nodes.ema(price, self.fastema_window)
+        macd_line = nodes.node(('subtract', fast, slow), lambda: nodes[fast].subtract(nodes[slow]))
+        signal_line = nodes[nodes.ema(macd_line, self.signal_window)]
+        return {self.macd_name: nodes[macd_line],
+                self.ppo_name: nodes[macd_line].div(nodes[slow]).multiply(100),
+                self.signal_name: signal_line,
+                self.histogram_name: nodes[macd_line]-signal_line}
+
+
+    def build_df(self, base_df):
+        df = pd.DataFrame(self.build_columns(self.get_price_series(base_df)))
         return df
 
-        
\ No newline at end of file
+
+    def to_stream(self):
+        '''
+        :return: a StreamingMACD that keeps the last row of build_df() up to date one bar at a time.
+        Call initialize() on it with the history before the first update()
+        '''
+        return streaming.StreamingMACD(self)
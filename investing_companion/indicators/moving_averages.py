@@ -1,4 +1,6 @@
 from investing_companion import indicators
+from investing_companion.indicators import streaming
+from investing_companion.indicators import rolling_moments
 import pandas as pd
 
 class SimpleMovingAverage(indicators.IndicatorBase):
@@ -7,7 +9,11 @@ class SimpleMovingAverage(indicators.IndicatorBase):
 
     Methods:
     :set_column_names()
+    :build_columns()
+    :node_columns()
     :build_df()
+    :build_multi_df()
+    :to_stream()
     '''
     def __init__(self, window_size=50,price_point='Close', tag='SMA'):
         '''
@@ -29,20 +35,54 @@ class SimpleMovingAverage(indicators.IndicatorBase):
         self.ma_name = f'SMA({self.window_size})'
 
 
+    def build_columns(self, prices):
+        return {self.ma_name: prices.rolling(self.window_size, min_periods=self.window_size).mean()}
+
+
+    def node_columns(self, nodes):
+        return {self.ma_name: nodes[nodes.sma(nodes.price(self.price_point), self.window_size)]}
+
+
     def build_df(self, base_df): 
-        df = pd.DataFrame({self.ma_name: base_df[self.price_point].rolling(self.window_size, 
-                                                                      min_periods=self.window_size)
-                                                                      .mean()})
+        df = pd.DataFrame(self.build_columns(self.get_price_series(base_df)))
         return df
 
 
+    def build_multi_df(self, base_df, window_sizes, compensated=True):
+        '''
+        Builds the SMA of several window sizes at once from a single set of prefix sums
+        (see rolling_moments.RollingMoments), instead of one rolling pass per window.
+
+        :param base_df(pd.DataFrame): the OHLCV frame
+        :param window_sizes(list[int]): the window sizes
+        :param compensated(bool): use the numerically stable prefix sums. Default=True
+        :return: DataFrame with one column per window, named like build_df() names them
+        '''
+        window_sizes = list(dict.fromkeys(int(w) for w in window_sizes))
+        moments = rolling_moments.RollingMoments(self.get_price_series(base_df), max(window_sizes),
+                                                 compensated=compensated)
+        return pd.DataFrame({f'SMA({w})': moments.mean(w) for w in window_sizes}, index=base_df.index)
+
+
+    def to_stream(self):
+        '''
+        :return: a StreamingSMA that keeps the last row of build_df() up to date one bar at a time.
+        Call initialize() on it with the history before the first update()
+        '''
+        return streaming.StreamingSMA(self)
+
+
+
 class ExponentialMovingAverage(indicators.IndicatorBase):
     '''
     The Class used to calculate the EMA indicator. Inherits from IndicatorBase.
 
     Methods:
     :set_column_names()
+    :build_columns()
+    :node_columns()
     :build_df()
+    :to_stream()
     '''
     def __init__(self,window_size=20,price_point='Close', tag='EMA'):
         '''
@@ -63,8 +103,24 @@ class ExponentialMovingAverage(indicators.IndicatorBase):
         self.ma_name = f'EMA({self.window_size})'
 
 
+    def build_columns(self, prices):
+        return {self.ma_name: prices.ewm(span = self.window_size, 
+                                         min_periods=self.window_size, 
+                                         adjust=False).mean()}
+
+
+    def node_columns(self, nodes):
+        return {self.ma_name: nodes[nodes.ema(nodes.price(self.price_point), self.window_size)]}
+
+
     def build_df(self, base_df):
-        df = pd.DataFrame({self.ma_name: base_df[self.price_point].ewm(span = self.window_size, 
-                                                                       min_periods=self.window_size, 
-                                                                       adjust=False).mean()})
+        df = pd.DataFrame(self.build_columns(self.get_price_series(base_df)))
         return df
+
+
+    def to_stream(self):
+        '''
+        :return: a StreamingEMA that keeps the last row of build_df() up to date one bar at a time.
+        Call initialize() on it with the history before the first update()
+        '''
+        return streaming.StreamingEMA(self)
@@ -0,0 +1,118 @@
+'''
+Indicator pipeline: builds many indicators over the same prices at once, sharing their
+intermediate series. Every indicator describes its columns in terms of nodes (the price point,
+EMA(span), SMA(n), rolling variance and standard deviation, diff...) through its node_columns()
+method, and each distinct node is computed a single time per run. EMA(12) and MACD(26, 12, 9)
+share the 12-bar EMA, SMA(20) and BollingerBands(20, 2) share the 20-bar mean, and so on.
+
+Usage:
+    pipe = pipeline.Pipeline([moving_averages.ExponentialMovingAverage(12), macd.MACD(),
+                              moving_averages.SimpleMovingAverage(20), bollinger.BollingerBands(20, 2)])
+    df = pipe.build_df(base_df)
+'''
+from investing_companion.indicators import price_points
+import numpy as np
+import pandas as pd
+
+
+class Nodes():
+    '''
+    The intermediate series of one pipeline run, keyed by tuples that identify how they are
+    computed. Each method returns the key of its node, computing the node on the first request
+    only; nodes[key] gives its values.
+
+    Methods:
+    :node()
+    :price()
+    :ema()
+    :sma()
+    :rolling_var()
+    :rolling_std()
+    :diff()
+    '''
+    def __init__(self, prices):
+        '''
+        :param prices(callable): takes a price point name, returns its series (or (bars x symbols) frame)
+        '''
+        self._prices = prices
+        self.values = {}
+        self.requests = 0
+
+    def __getitem__(self, key):
+        return self.values[key]
+
+    def node(self, key, func):
+        '''Generic node: func() is only called if key hasn't been computed yet'''
+        self.requests += 1
+        if key not in self.values:
+            self.values[key] = func()
+        return key
+
+    def price(self, price_point):
+        return self.node(('price', price_point), lambda: self._prices(price_point))
+
+    def ema(self, source, span):
+        '''EMA with min_periods=span and adjust=False, the one every indicator uses'''
+        return self.node(('ema', source, span),
+                         lambda: self[source].ewm(span=span, min_periods=span, adjust=False).mean())
+
+    def sma(self, source, window_size):
+        return self.node(('sma', source, window_size),
+                         lambda: self[source].rolling(window_size, min_periods=window_size).mean())
+
+    def rolling_var(self, source, window_size):
+        '''Population (ddof=0) rolling variance'''
+        return self.node(('var', source, window_size),
+                         lambda: self[source].rolling(window_size, min_periods=window_size).var(ddof=0))
+
+    def rolling_std(self, source, window_size):
+        '''Population (ddof=0) rolling standard deviation, the square root of the rolling_var() node'''
+        var = self.rolling_var(source, window_size)
+        #Same as rolling().std(), which takes the square root of the variance and clips it at 0
+        return self.node(('std', source, window_size), lambda: np.sqrt(self[var].clip(lower=0)))
+
+    def diff(self, source, periods=1):
+        return self.node(('diff', source, periods), lambda: self[source].diff(periods))
+
+
+class Pipeline():
+    '''
+    Builds the columns of a set of indicators in one run, computing each shared intermediate
+    series once (see Nodes). The result is the same as the indicators' own build_columns().
+
+    Methods:
+    :add()
+    :build_columns()
+    :build_df()
+    '''
+    def __init__(self, indicators=()):
+        '''
+        Class constructor.
+        :param indicators(list): the indicators to build
+        '''
+        self.indicators = list(indicators)
+        self.nodes = None
+
+    def add(self, *indicators):
+        self.indicators.extend(indicators)
+        return self
+
+    def build_columns(self, prices):
+        '''
+        :param prices: an OHLCV frame (derived price points included, see indicators.price_points),
+        or a callable that takes a price point name and returns its series or (bars x symbols) frame
+        :return: dict of column name -> values with the columns of every indicator, in order.
+        The nodes of the run are kept in self.nodes
+        '''
+        if isinstance(prices, pd.DataFrame):
+            frame = prices
+            prices = lambda price_point: price_points.get(frame, price_point)
+        self.nodes = Nodes(prices)
+        columns = {}
+        for indicator in self.indicators:
+            columns.update(indicator.node_columns(self.nodes))
+        return columns
+
+    def build_df(self, base_df):
+        '''DataFrame with the columns of every indicator, indexed like base_df'''
+        return pd.DataFrame(self.build_columns(base_df), index=base_df.index)
@@ -0,0 +1,98 @@
+'''
+Derived price points (HL2, HLC3, HLCC4, OHLC4 and any registered custom one). They aren't stored
+as columns: an indicator whose price_point is not a column of the frame it is built on gets the
+derived series from here, computed on first use and cached for as long as the frame lives. That
+way price_point='HLC3' works on the frames of any data source.
+
+Usage:
+    price_points.register('HL2C', lambda p: (p['High'] + p['Low'] + p['Close'])/3, ('High', 'Low', 'Close'))
+    sma = moving_averages.SimpleMovingAverage(20, price_point='HL2C')
+'''
+import threading
+import weakref
+
+_REGISTRY = {}
+#id(frame) -> {price point: (frame index, series)}, dropped when the frame is garbage collected
+_frame_cache = {}
+_lock = threading.Lock()
+
+
+def register(name, func, columns):
+    '''
+    Registers a derived price point.
+
+    :param name(str): the name the indicators' price_point refers to it by
+    :param func(callable): takes the frame (or a single bar as a dict/Series) and returns the values
+    :param columns(tuple): the columns func reads, kept by the compact strategies
+    '''
+    _REGISTRY[name] = (func, tuple(columns))
+    clear_cache()
+
+
+def unregister(name):
+    _REGISTRY.pop(name, None)
+    clear_cache()
+
+
+def is_derived(name):
+    return name in _REGISTRY
+
+
+def required_columns(price_point):
+    '''The frame columns price_point is computed from (itself if it isn't a derived one)'''
+    return list(_REGISTRY[price_point][1]) if price_point in _REGISTRY else [price_point]
+
+
+def value(bar, price_point):
+    '''The price point of a single bar (dict or Series)'''
+    if price_point in bar or price_point not in _REGISTRY:
+        return bar[price_point]
+    return _REGISTRY[price_point][0](bar)
+
+
+def get(df, price_point):
+    '''
+    The price_point series of df: its column if it has one, else the derived series, computed on
+    the first request for this frame and cached with it. The cached series are dropped when the
+    frame is collected or its index is replaced (eg by an in-place dropna()); values modified in
+    place aren't detected, so call clear_cache() after doing that.
+    '''
+    if price_point in df.columns or price_point not in _REGISTRY:
+        return df[price_point]
+
+    key = id(df)
+    with _lock:
+        index, series = _frame_cache.get(key, {}).get(price_point, (None, None))
+    if index is df.index:
+        return series
+
+    series = _REGISTRY[price_point][0](df).rename(price_point)
+    with _lock:
+        if key not in _frame_cache:
+            _frame_cache[key] = {}
+            weakref.finalize(df, _frame_cache.pop, key, None)
+        _frame_cache[key][price_point] = (df.index, series)
+    return series
+
+
+def add_columns(df, names=None):
+    '''
+    Materializes derived price points as columns of df, in place.
+
+    :param names(list): the price points to add. Default=None (every registered one)
+    :return: df
+    '''
+    for name in (list(_REGISTRY) if names is None else names):
+        df[name] = get(df, name)
+    return df
+
+
+def clear_cache():
+    with _lock:
+        _frame_cache.clear()
+
+
+register('HL2', lambda p: (p['High'] + p['Low'])/2, ('High', 'Low'))
+register('HLC3', lambda p: (p['High'] + p['Low'] + p['Close'])/3, ('High', 'Low', 'Close'))
+register('HLCC4', lambda p: (p['High'] + p['Low'] + p['Close']*2)/4, ('High', 'Low', 'Close'))
+register('OHLC4', lambda p: (p['High'] + p['Low'] + p['Close'] + p['Open'])/4, ('Open', 'High', 'Low', 'Close'))
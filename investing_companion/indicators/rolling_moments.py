@@ -0,0 +1,123 @@
+'''
+Prefix-sum engine for rolling means and population standard deviations over many window sizes.
+The cumulative sums and sums of squares of the series are built once, and every window size is
+then read off them in O(n) with two subtractions per bar, instead of one rolling pass per window.
+'''
+import numpy as np
+
+
+class RollingMoments():
+    '''
+    Rolling mean and population standard deviation (ddof=0) of a series for any window size,
+    from prefix sums built once. A window containing a NaN gives NaN, like
+    rolling(window, min_periods=window) does.
+
+    Plain prefix sums lose precision as they grow: the difference of two large running totals
+    cancels, and the error grows with the length of the series. The compensated variant (the
+    default) restarts the prefix sums every block_size bars (the smallest power of two that fits
+    max_window) and sums the deviations from each block's own mean rather than the raw prices.
+    A window then spans two blocks at most, and the part in the earlier block is re-centered
+    on the later block's mean before adding it, so the error only depends on the block size and
+    on how far the prices move within it, never on the length of the series.
+
+    Methods:
+    :mean()
+    :mean_std()
+    '''
+    def __init__(self, values, max_window, compensated=True):
+        '''
+        Class constructor. Builds the prefix sums.
+
+        :param values(array-like): the series
+        :param max_window(int): the largest window size that will be requested
+        :param compensated(bool): use the numerically stable variant. Default=True
+        '''
+        values = np.asarray(values, dtype='float64')
+        self.n = len(values)
+        self.max_window = int(max_window)
+        self.compensated = compensated
+
+        missing = np.isnan(values)
+        self.missing = np.concatenate(([0], np.cumsum(missing)))
+        if not compensated:
+            self.block_size = None
+            filled = np.where(missing, 0., values)
+            self.sums = np.cumsum(filled)
+            self.squares = np.cumsum(filled*filled)
+            return
+
+        self.block_size = 1 << max(self.max_window - 1, 0).bit_length()
+        n_blocks = -(-self.n//self.block_size)
+        blocks = np.full(n_blocks*self.block_size, np.nan)
+        blocks[:self.n] = values
+        blocks = blocks.reshape(n_blocks, self.block_size)
+        counts = (~np.isnan(blocks)).sum(axis=1)
+        self.centers = np.nansum(blocks, axis=1)/np.maximum(counts, 1)
+        deviations = np.nan_to_num(blocks - self.centers[:, None], nan=0.)
+        self.sums = np.cumsum(deviations, axis=1).ravel()[:self.n]
+        self.squares = np.cumsum(deviations*deviations, axis=1).ravel()[:self.n]
+
+        #Per bar: its block, its block's mean, and what is left of its block after it
+        self.blocks = np.arange(self.n)//self.block_size
+        self.bar_centers = self.centers[self.blocks]
+        block_end = np.minimum((self.blocks + 1)*self.block_size, self.n) - 1
+        self.tail_sums = self.sums[block_end] - self.sums
+        self.tail_squares = self.squares[block_end] - self.squares
+        self.tail_bars = block_end - np.arange(self.n)
+
+    def _moments(self, window_size):
+        window_size = int(window_size)
+        if window_size > self.max_window:
+            raise ValueError(f'Window {window_size} is larger than max_window={self.max_window}')
+
+        means = np.full(self.n, np.nan)
+        variances = np.full(self.n, np.nan)
+        if window_size < 1 or window_size > self.n:
+            return means, variances
+
+        #Row k of the window arrays is the window ending at bar w-1+k. From row 1 on, the bar
+        #before the window is `before` and the last one `end`
+        w = window_size
+        before, end = slice(0, self.n-w), slice(w, self.n)
+        total = self.sums[w-1:].copy()
+        squares = self.squares[w-1:].copy()
+        total[1:] -= self.sums[before]
+        squares[1:] -= self.squares[before]
+        if not self.compensated:
+            center = 0.
+        else:
+            center = self.bar_centers[w-1:]
+            #Where the window starts in the previous block: take what is left of that block
+            #and re-center it on the mean of the block the window ends in
+            spans = self.blocks[before] != self.blocks[end]
+            shift = self.bar_centers[before] - self.bar_centers[end]
+            tail_sums = self.tail_sums[before]
+            total[1:] = np.where(spans, tail_sums + self.tail_bars[before]*shift + self.sums[end],
+                                 total[1:])
+            squares[1:] = np.where(spans, self.tail_squares[before] + 2*shift*tail_sums
+                                          + self.tail_bars[before]*shift*shift + self.squares[end],
+                                   squares[1:])
+
+        mean_deviation = total/w
+        means[w-1:] = center + mean_deviation
+        variances[w-1:] = np.clip(squares/w - mean_deviation**2, 0, None)
+        if self.missing[-1]:
+            incomplete = (self.missing[w:] - self.missing[:self.n-w+1]) != 0
+            means[w-1:][incomplete] = np.nan
+            variances[w-1:][incomplete] = np.nan
+        return means, variances
+
+    def mean(self, window_size):
+        '''
+        :param window_size(int): the window size
+        :return: array with the rolling mean (NaN during the warmup)
+        '''
+        return self._moments(window_size)[0]
+
+    def mean_std(self, window_size):
+        '''
+        :param window_size(int): the window size
+        :return: tuple of arrays (rolling mean, rolling population standard deviation)
+        '''
+        means, variances = self._moments(window_size)
+        return means, np.sqrt(variances)
@@ -1,14 +1,19 @@
 from investing_companion import indicators
+from investing_companion.indicators import streaming
 import pandas as pd
+import numpy as np
 
 class RelativeStrengthIndex(indicators.IndicatorBase):
     '''
     The Class used to calculate the RSI indicator. Inherits from IndicatorBase.
   
     Methods:
-    :rsi()
     :set_column_names()
+    :wilder_smoothing() [static]
+    :build_columns()
+    :node_columns()
     :build_df()
+    :to_stream()
     '''
     def __init__(self, window_size=14,price_point='Close', tag='RSI'):
         ''' 
@@ -30,38 +35,67 @@ class RelativeStrengthIndex(indicators.IndicatorBase):
         self.rsi_name = f'RSI({self.window_size})'
 
 
+    @staticmethod
+    def wilder_smoothing(values, window_size):
+        '''
+        Wilder's Smoothing Mean (WSM) of an array. The first value is the SMA of the
+        window_size values ending at position window_size (position 0 is expected to be the NaN
+        left by diff()), and every later value is (previous*(window_size-1) + current)/window_size.
+        That recursion is an EMA with alpha=1/window_size, so it runs in pandas' compiled ewm
+        instead of a Python loop.
+
+        :param values(array-like): the values to smooth. 2-D arrays are smoothed column by column
+        :param window_size(int): the smoothing window
+        :return: numpy array with the same shape as values (NaN during the warmup)
+        '''
+        values = np.asarray(values, dtype='float64')
+        out = np.full(values.shape, np.nan)
+        if len(values) <= window_size:
+            return out
+
+        out[:window_size+1] = pd.DataFrame(values[:window_size+1].reshape(window_size+1, -1))\
+                                .rolling(window_size, min_periods=window_size).mean()\
+                                .to_numpy().reshape(out[:window_size+1].shape)
+        seeded = np.concatenate((out[window_size:window_size+1], values[window_size+1:]))
+        smoothed = pd.DataFrame(seeded.reshape(len(seeded), -1))\
+                     .ewm(alpha=1/window_size, adjust=False).mean().to_numpy().reshape(seeded.shape)
+        #Columns without a seed stay NaN, instead of starting from their first value
+        out[window_size:] = np.where(np.isnan(out[window_size]), np.nan, smoothed)
+        return out
+
+
+    def build_columns(self, prices):
+        return self._columns_from_diff(prices.diff(1))
+
+
+    def node_columns(self, nodes):
+        return self._columns_from_diff(nodes[nodes.diff(nodes.price(self.price_point))])
+
+
+    def _columns_from_diff(self, diff):
+        upward = diff.clip(lower=0).round(2)
+        downward = diff.clip(upper=0).abs().round(2)
+
+        average_upward = self.wilder_smoothing(upward, self.window_size)
+        average_downward = self.wilder_smoothing(downward, self.window_size)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = average_upward/average_downward
+            rsi_values = 100 - (100/(1.0+rs))
+
+        if isinstance(diff, pd.DataFrame):
+            return {self.rsi_name: pd.DataFrame(rsi_values, index=diff.index, columns=diff.columns)}
+        return {self.rsi_name: pd.Series(rsi_values, index=diff.index)}
+
+
     def build_df(self, base_df):
-        df = pd.DataFrame(index=base_df.index)
-        df['diff'] = base_df[self.price_point].diff(1)
-        df['upward'] = df['diff'].clip(lower=0).round(2)
-        df['downward'] = df['diff'].clip(upper=0).abs().round(2)
-
-        df['average_upward'] = df['upward'].rolling(self.window_size,
-                                                    min_periods=self.window_size)\
-                                                    .mean()[:self.window_size+1]
-
-        df['average_downward'] = df['downward'].rolling(self.window_size,
-                                                        min_periods=self.window_size)\
-                                                        .mean()[:self.window_size+1]
-
-        #Calculating Wilder's Smoothing Mean (WSM)
-        #Average gains
-        for i, row in enumerate(df['average_upward'].iloc[self.window_size+1:]):
-            df['average_upward'].iloc[i+self.window_size+1] =\
-                (df['average_upward'].iloc[i+self.window_size]*
-                (self.window_size-1) +
-                df['upward'].iloc[i+self.window_size+1])\
-                    /self.window_size
-        #Average Losses
-        for i, row in enumerate(df['average_downward'].iloc[self.window_size+1:]):
-            df['average_downward'].iloc[i+self.window_size+1] =\
-                (df['average_downward'].iloc[i+self.window_size]*
-                (self.window_size-1) +
-                df['downward'].iloc[i+self.window_size+1])\
-                    /self.window_size
-
-        df['rs'] = df['average_upward']/df['average_downward']
-    
-        df[self.rsi_name] = 100 - (100/(1.0+df['rs'])) 
-        df = df[[self.rsi_name]]
+        df = pd.DataFrame(self.build_columns(self.get_price_series(base_df)))
         return df
+
+
+    def to_stream(self):
+        '''
+        :return: a StreamingRSI that keeps the last row of build_df() up to date one bar at a time.
+        Call initialize() on it with the history before the first update()
+        '''
+        return streaming.StreamingRSI(self)
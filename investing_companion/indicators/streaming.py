@@ -0,0 +1,311 @@
+'''
+Stateful streaming counterparts of the indicators. Each one is initialized from a history
+(vectorized, in one go) and then advanced one bar at a time with update(), in constant time.
+After every update the values match the last row of build_df() over the history plus the new bars.
+
+Usage:
+    stream = macd.MACD().to_stream().initialize(history_df)
+    values = stream.update(bar)    #bar: dict/Series with the price_point, or the price itself
+'''
+from collections import deque
+import math
+import numpy as np
+import pandas as pd
+from investing_companion.indicators import price_points
+
+
+class _Ewm():
+    '''
+    Replica of the recursion pandas runs for ewm(adjust=False).mean(), including the handling
+    of NaNs and of min_periods, so that the streamed values match build_df() exactly.
+    '''
+    def __init__(self, alpha, min_periods):
+        com = 1./alpha - 1.
+        self.alpha = 1./(1. + com)
+        self.min_periods = max(min_periods, 1)
+        self.weighted = np.nan
+        self.old_wt = 1.
+        self.nobs = 0
+
+    @classmethod
+    def from_span(cls, span, min_periods):
+        ewm = cls.__new__(cls)
+        com = (span - 1)/2.
+        ewm.alpha = 1./(1. + com)
+        ewm.min_periods = max(min_periods, 1)
+        ewm.weighted = np.nan
+        ewm.old_wt = 1.
+        ewm.nobs = 0
+        return ewm
+
+    def initialize(self, values):
+        '''Sets the state as if every value in values had been passed to update()'''
+        values = np.asarray(values, dtype='float64')
+        observed = ~np.isnan(values)
+        self.nobs = int(observed.sum())
+        if self.nobs == 0:
+            return self
+        self.weighted = pd.Series(values).ewm(alpha=self.alpha, adjust=False).mean().to_numpy()[-1]
+        trailing_nans = len(values) - 1 - int(np.flatnonzero(observed)[-1])
+        self.old_wt = (1. - self.alpha)**trailing_nans
+        return self
+
+    def value(self):
+        return self.weighted if self.nobs >= self.min_periods else np.nan
+
+    def update(self, x):
+        observed = x == x
+        self.nobs += observed
+        if self.weighted == self.weighted:
+            self.old_wt *= 1. - self.alpha
+            if observed:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt*self.weighted + self.alpha*x)/(self.old_wt + self.alpha)
+                self.old_wt = 1.
+        elif observed:
+            self.weighted = x
+        return self.value()
+
+
+class _RollingWindow():
+    '''Fixed-size window with a compensated running sum, mean and population variance'''
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.values = deque(maxlen=window_size)
+        self.nans = 0
+        self.total = 0.
+        self.compensation = 0.
+        self.mean = 0.
+        self.ssqdm = 0.
+        self.nobs = 0
+
+    def initialize(self, values):
+        for x in np.asarray(values, dtype='float64')[-self.window_size:]:
+            self.values.append(x)
+        self.nans = sum(1 for x in self.values if x != x)
+        valid = [x for x in self.values if x == x]
+        self.nobs = len(valid)
+        self.total = math.fsum(valid)
+        self.compensation = 0.
+        self.mean = self.total/self.nobs if self.nobs else 0.
+        self.ssqdm = math.fsum((x - self.mean)**2 for x in valid)
+        return self
+
+    def _add(self, x):
+        y = x - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+        self.nobs += 1
+        delta = x - self.mean
+        self.mean += delta/self.nobs
+        self.ssqdm += (self.nobs - 1)*delta*delta/self.nobs
+
+    def _remove(self, x):
+        y = -x - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+        self.nobs -= 1
+        if self.nobs:
+            delta = x - self.mean
+            self.mean -= delta/self.nobs
+            self.ssqdm -= (self.nobs + 1)*delta*delta/self.nobs
+        else:
+            self.mean = self.ssqdm = 0.
+
+    def update(self, x):
+        if len(self.values) == self.window_size:
+            old = self.values[0]
+            if old != old:
+                self.nans -= 1
+            else:
+                self._remove(old)
+        self.values.append(x)
+        if x != x:
+            self.nans += 1
+        else:
+            self._add(x)
+
+    def full(self):
+        return len(self.values) == self.window_size and self.nans == 0
+
+    def rolling_mean(self):
+        return self.total/self.window_size if self.full() else np.nan
+
+    def rolling_std(self):
+        if not self.full():
+            return np.nan
+        return math.sqrt(max(self.ssqdm, 0.)/self.window_size)
+
+
+class StreamingIndicator():
+    '''
+    Base class for the streaming indicators. Shouldn't be used directly.
+
+    Methods:
+    :initialize() [Abstract]
+    :update() [Abstract]
+    :price()
+    '''
+    def __init__(self, indicator):
+        '''
+        :param indicator(IndicatorBase): the indicator whose parameters and column names are used
+        '''
+        self.indicator = indicator
+
+    def price(self, bar):
+        '''Extracts the price point of the indicator from a bar (mapping or number)'''
+        if isinstance(bar, (int, float, np.floating, np.integer)):
+            return float(bar)
+        return float(price_points.value(bar, self.indicator.price_point))
+
+    def _history_prices(self, history):
+        return self.indicator.get_price_series(history).to_numpy(dtype='float64')
+
+    def initialize(self, history):
+        raise NotImplementedError()
+
+    def update(self, bar):
+        raise NotImplementedError()
+
+
+class StreamingSMA(StreamingIndicator):
+    '''Streaming counterpart of SimpleMovingAverage'''
+    def __init__(self, indicator):
+        super().__init__(indicator)
+        self.window = _RollingWindow(indicator.window_size)
+
+    def initialize(self, history):
+        self.window.initialize(self._history_prices(history))
+        return self
+
+    def update(self, bar):
+        self.window.update(self.price(bar))
+        return {self.indicator.ma_name: self.window.rolling_mean()}
+
+
+class StreamingEMA(StreamingIndicator):
+    '''Streaming counterpart of ExponentialMovingAverage'''
+    def __init__(self, indicator):
+        super().__init__(indicator)
+        self.ewm = _Ewm.from_span(indicator.window_size, indicator.window_size)
+
+    def initialize(self, history):
+        self.ewm.initialize(self._history_prices(history))
+        return self
+
+    def update(self, bar):
+        return {self.indicator.ma_name: self.ewm.update(self.price(bar))}
+
+
+class StreamingBollinger(StreamingIndicator):
+    '''Streaming counterpart of BollingerBands'''
+    def __init__(self, indicator):
+        super().__init__(indicator)
+        self.window = _RollingWindow(indicator.window_size)
+
+    def initialize(self, history):
+        self.window.initialize(self._history_prices(history))
+        return self
+
+    def update(self, bar):
+        self.window.update(self.price(bar))
+        sma = self.window.rolling_mean()
+        stdev = self.window.rolling_std()
+        return {self.indicator.upper_band_name: sma + stdev*self.indicator.std_deviations,
+                self.indicator.lower_band_name: sma - stdev*self.indicator.std_deviations}
+
+
+class StreamingMACD(StreamingIndicator):
+    '''Streaming counterpart of MACD'''
+    def __init__(self, indicator):
+        super().__init__(indicator)
+        self.fast = _Ewm.from_span(indicator.fastema_window, indicator.fastema_window)
+        self.slow = _Ewm.from_span(indicator.slowema_window, indicator.slowema_window)
+        self.signal = _Ewm.from_span(indicator.signal_window, indicator.signal_window)
+
+    def initialize(self, history):
+        prices = self._history_prices(history)
+        self.fast.initialize(prices)
+        self.slow.initialize(prices)
+        fast = pd.Series(prices).ewm(span=self.indicator.fastema_window,
+                                     min_periods=self.indicator.fastema_window, adjust=False).mean()
+        slow = pd.Series(prices).ewm(span=self.indicator.slowema_window,
+                                     min_periods=self.indicator.slowema_window, adjust=False).mean()
+        self.signal.initialize((fast - slow).to_numpy())
+        return self
+
+    def update(self, bar):
+        price = self.price(bar)
+        fast = self.fast.update(price)
+        slow = self.slow.update(price)
+        macd_line = fast - slow
+        signal_line = self.signal.update(macd_line)
+        return {self.indicator.macd_name: macd_line,
+                self.indicator.ppo_name: (fast - slow)/slow*100,
+                self.indicator.signal_name: signal_line,
+                self.indicator.histogram_name: macd_line - signal_line}
+
+
+class StreamingRSI(StreamingIndicator):
+    '''Streaming counterpart of RelativeStrengthIndex (Wilder's smoothing, SMA seed)'''
+    def __init__(self, indicator):
+        super().__init__(indicator)
+        self.last_price = np.nan
+        self.seed_gains = []
+        self.seed_losses = []
+        self.average_upward = _Ewm(1/indicator.window_size, 1)
+        self.average_downward = _Ewm(1/indicator.window_size, 1)
+
+    def initialize(self, history):
+        prices = self._history_prices(history)
+        if len(prices) == 0:
+            return self
+        self.last_price = prices[-1]
+        diff = np.diff(prices)
+        upward = np.round(np.clip(diff, 0, None), 2)
+        downward = np.round(np.abs(np.clip(diff, None, 0)), 2)
+
+        window_size = self.indicator.window_size
+        if len(diff) < window_size:
+            self.seed_gains = list(upward)
+            self.seed_losses = list(downward)
+            return self
+
+        #Same smoothing as build_df, with the diff's leading NaN put back in
+        up = self.indicator.wilder_smoothing(np.concatenate(([np.nan], upward)), window_size)
+        down = self.indicator.wilder_smoothing(np.concatenate(([np.nan], downward)), window_size)
+        for ewm, values in ((self.average_upward, up), (self.average_downward, down)):
+            ewm.weighted = values[-1]
+            ewm.nobs = len(values) - window_size
+            ewm.old_wt = 1.
+        self.seed_gains = self.seed_losses = None
+        return self
+
+    def update(self, bar):
+        price = self.price(bar)
+        diff = price - self.last_price
+        self.last_price = price
+        upward = np.round(max(diff, 0.), 2) if diff == diff else np.nan
+        downward = np.round(abs(min(diff, 0.)), 2) if diff == diff else np.nan
+
+        if self.seed_gains is not None:
+            if diff != diff:
+                return {self.indicator.rsi_name: np.nan}
+            self.seed_gains.append(upward)
+            self.seed_losses.append(downward)
+            if len(self.seed_gains) < self.indicator.window_size:
+                return {self.indicator.rsi_name: np.nan}
+            self.average_upward.update(math.fsum(self.seed_gains)/self.indicator.window_size)
+            self.average_downward.update(math.fsum(self.seed_losses)/self.indicator.window_size)
+            self.seed_gains = self.seed_losses = None
+        else:
+            self.average_upward.update(upward)
+            self.average_downward.update(downward)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(self.average_upward.weighted)/np.float64(self.average_downward.weighted)
+            return {self.indicator.rsi_name: float(100 - (100/(1.0+rs)))}
@@ -0,0 +1,339 @@
+'''
+Multi-timeframe support: resampling of a base series of bars (ie 1-minute) into several higher
+timeframes at once, and indicators computed on a higher timeframe and aligned back onto the base
+bars, so a strategy can combine, say, a daily MACD with a 15-minute RSI over one 1-minute history.
+
+Resampler decomposes the timestamps once (session day, time since the session open) and derives
+the bins of every timeframe from that, then aggregates each column with one reduceat per bin
+array: Open first, High max, Low min, Close last, Volume and Dividends summed, Stock Splits
+multiplied, any other column last. With a Session, the bars outside trading hours are left out and
+the intraday bins start at the open (15-minute bins at 9:30, 9:45...).
+
+A higher-timeframe bar is only known once it is over, so align() gives each base bar the values
+of the latest higher-timeframe bar complete at that bar. A bin is complete at its last base bar
+when that bar closes at the end of the bin (its start plus the timeframe, or the session close);
+otherwise, as when bars are missing or a history ends in the middle of a bin, nothing says it is
+over until the next base bar, and its values show up there. Neither depends on the bars after, so
+there is no look-ahead and the values on a bar don't depend on how far the history goes: a
+backtest, extend() or a refresh give the same ones. Daily bins without a Session end at midnight,
+so on bars with trading hours pass one for the daily values to be known at the close.
+
+Usage:
+    daily_macd = timeframes.Timeframe(macd.MACD(), '1d', session=timeframes.Session('09:30', '16:00'))
+    strat = macd_strategy.Macd_Strategy('AAPL', period='7d', data_source=yahoo_source.YahooSource('1m'),
+                                        macd_object=daily_macd)
+
+    df = timeframes.build_df(minute_df, [daily_macd, timeframes.Timeframe(rsi.RelativeStrengthIndex(), '15m')])
+'''
+from investing_companion import indicators
+from investing_companion.indicators import price_points
+import re
+import numpy as np
+import pandas as pd
+
+#Aggregation of each OHLCV column, the rest take the last value of the bin
+AGGREGATIONS = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Adj Close': 'last',
+                'Volume': 'sum', 'Dividends': 'sum', 'Stock Splits': 'product'}
+
+#yfinance-like intervals -> pandas frequencies
+_UNITS = {'m': 'min', 'h': 'h', 'd': 'D', 'wk': 'W', 'mo': 'M'}
+
+
+def to_offset(timeframe):
+    '''pandas offset of a timeframe, given as a yfinance interval (15m, 1h, 1d, 1wk, 1mo) or a pandas frequency'''
+    match = re.fullmatch(r'(\d+)(m|h|d|wk|mo)', timeframe)
+    if match is not None:
+        timeframe = match.group(1) + _UNITS[match.group(2)]
+    return pd.tseries.frequencies.to_offset(timeframe)
+
+
+class Session():
+    '''
+    Trading hours. Bars outside [open, close) are left out of the resampled bars and the intraday
+    bins are anchored at the open. Sessions crossing midnight are not supported.
+    '''
+    def __init__(self, open='09:30', close='16:00', tz=None):
+        '''
+        Class constructor.
+        :param open(str): the session open, local time. Default='09:30'
+        :param close(str): the session close, local time. Default='16:00'
+        :param tz(str): the timezone the hours are in. Default=None (the index's)
+        '''
+        self.open = pd.Timedelta(open + ':00' if open.count(':') == 1 else open)
+        self.close = pd.Timedelta(close + ':00' if close.count(':') == 1 else close)
+        if not self.open < self.close:
+            raise ValueError('The session has to close after it opens, on the same day')
+        self.tz = tz
+
+    def __repr__(self):
+        return f'Session({self.open}, {self.close}, {self.tz})'
+
+
+class Resampler():
+    '''
+    Bins of several timeframes over one DatetimeIndex (sorted, as the histories are).
+
+    Methods:
+    :bins()
+    :labels()
+    :ohlcv()
+    :aggregate()
+    :completed_at()
+    :align()
+    '''
+    def __init__(self, index, timeframes, session=None, interval=None):
+        '''
+        Class constructor.
+        :param index(pd.DatetimeIndex): the timestamps of the base bars
+        :param timeframes(list[str]): the timeframes, each longer than the base interval
+        :param session(Session): the trading hours. Default=None (every bar counts, intraday bins
+        start at midnight)
+        :param interval(str): the base bar interval (1m, 5m...), which tells when a bar closes.
+        Default=None (the shortest step of the index)
+        '''
+        self.index = index
+        self.session = session
+        local = index
+        if session is not None and session.tz is not None and index.tz is not None:
+            local = index.tz_convert(session.tz)
+        #Wall-clock times, so the sessions keep their hours across the DST changes
+        self._tz = local.tz
+        if local.tz is not None:
+            local = local.tz_localize(None)
+        days = local.normalize()
+        since_midnight = local.asi8 - days.asi8
+        if interval is not None:
+            self.bar_length = to_offset(interval).nanos
+        else:
+            steps = np.diff(local.asi8)
+            self.bar_length = int(steps[steps > 0].min()) if (steps > 0).any() else 0
+        if session is not None:
+            self.mask = (since_midnight >= session.open.value) & (since_midnight < session.close.value)
+            origin = session.open.value
+        else:
+            self.mask = np.ones(len(index), dtype=bool)
+            origin = 0
+        #Rows of the base index the bins are made of, in order
+        self.rows = np.flatnonzero(self.mask)
+        self._days = days[self.rows]
+        self._since_open = since_midnight[self.rows] - origin
+        #When each bar closes, wall-clock nanoseconds
+        self._closes = local.asi8[self.rows] + self.bar_length
+        self._origin = origin
+        self._bins = {}
+        self._completed = {}
+        for timeframe in timeframes:
+            self.bins(timeframe)
+
+    def bins(self, timeframe):
+        '''
+        :return: tuple (starts, ends, labels): the first and one-past-the-last positions of each
+        bin among self.rows, and the timestamp each bin starts at
+        '''
+        if timeframe not in self._bins:
+            offset = to_offset(timeframe)
+            if isinstance(offset, pd.offsets.Tick) and offset < pd.Timedelta(days=1):
+                width = offset.nanos
+                slot = self._since_open//width
+                keys = (self._days.asi8//width)*(86400*10**9//width + 1) + slot
+                label = lambda first: self._days[first] + pd.to_timedelta(self._origin + slot[first]*width)
+                def bin_end(first):
+                    end = self._days.asi8[first] + self._origin + (slot[first] + 1)*width
+                    if self.session is None:
+                        return end
+                    return np.minimum(end, self._days.asi8[first] + self.session.close.value)
+            else:
+                if offset.n != 1:
+                    raise ValueError(f'Only single day, week or month timeframes are supported: {timeframe}')
+                periods = self._days.to_period(offset)
+                keys = periods.asi8
+                label = lambda first: periods[first].start_time
+                def bin_end(first):
+                    if self.session is None:
+                        return (periods[first] + 1).start_time.asi8
+                    return periods[first].end_time.normalize().asi8 + self.session.close.value
+            if len(keys):
+                starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            else:
+                starts = np.empty(0, dtype='int64')
+            ends = np.r_[starts[1:], len(keys)].astype('int64')
+            labels = pd.DatetimeIndex(label(starts), name=self.index.name)
+            if self._tz is not None:
+                labels = labels.tz_localize(self._tz, ambiguous=np.ones(len(labels), dtype=bool),
+                                            nonexistent='shift_forward')
+            self._bins[timeframe] = (starts, ends, labels)
+            #Complete at the last bar when it closes the bin, at the next base bar otherwise
+            last = ends - 1
+            self._completed[timeframe] = np.where(self._closes[last] >= bin_end(starts),
+                                                  self.rows[last], self.rows[last] + 1)
+        return self._bins[timeframe]
+
+    def labels(self, timeframe):
+        return self.bins(timeframe)[2]
+
+    def aggregate(self, timeframe, values, how='last'):
+        '''
+        Aggregates the values of the base bars (1-D, or 2-D with one column per series) over the bins.
+
+        :param how(str): 'first', 'last', 'max', 'min', 'sum' or 'product' (of the non-zero values,
+        0 if all of them are). Default='last'
+        '''
+        starts, ends, _ = self.bins(timeframe)
+        values = np.asarray(values)[self.rows]
+        if len(starts) == 0:
+            return values[:0]
+        if how == 'first':
+            return values[starts]
+        if how == 'last':
+            return values[ends - 1]
+        if how == 'max':
+            return np.maximum.reduceat(values, starts, axis=0)
+        if how == 'min':
+            return np.minimum.reduceat(values, starts, axis=0)
+        if how == 'sum':
+            return np.add.reduceat(values, starts, axis=0)
+        if how == 'product':
+            product = np.multiply.reduceat(np.where(values == 0, 1, values), starts, axis=0)
+            return np.where(product == 1, 0, product)
+        raise ValueError(f'Unknown aggregation: {how}')
+
+    def ohlcv(self, df, timeframes=None, columns=None):
+        '''
+        Resampled bars of every timeframe (see AGGREGATIONS). The last one may be incomplete
+
+        :param timeframes(list[str]): the timeframes to build. Default=None (every one of the resampler)
+        :param columns(list): the columns of df to aggregate. Default=None (all of them)
+        :return: dict timeframe -> DataFrame indexed by the start of each bin
+        '''
+        columns = list(df.columns) if columns is None else columns
+        frames = {}
+        for timeframe in (list(self._bins) if timeframes is None else timeframes):
+            frames[timeframe] = pd.DataFrame(
+                {name: self.aggregate(timeframe, df[name].to_numpy(), AGGREGATIONS.get(name, 'last'))
+                 for name in columns}, index=self.labels(timeframe))
+        return frames
+
+    def completed_at(self, timeframe):
+        '''Position in the index of the base bar at which each bin is complete (len(index) if none is yet)'''
+        self.bins(timeframe)
+        return self._completed[timeframe]
+
+    def align(self, timeframe, values):
+        '''
+        Values of the resampled bars (one per bin, 1-D or 2-D) spread over the base bars without
+        look-ahead: each base bar gets the last bin complete at it (see completed_at()), NaN before
+        the first one
+        '''
+        values = np.asarray(values, dtype='float64')
+        completed_at = self.completed_at(timeframe)
+        latest = np.searchsorted(completed_at, np.arange(len(self.index)), side='right') - 1
+        aligned = values[np.maximum(latest, 0)] if len(values) else np.full((len(self.index),) + values.shape[1:], np.nan)
+        aligned[latest < 0] = np.nan
+        return aligned
+
+
+def build_df(base_df, timeframe_indicators, session=None):
+    '''
+    Builds several Timeframe indicators over base_df, resampling it once for all of them: the
+    indicators of the same timeframe share its bars.
+
+    :param timeframe_indicators(list[Timeframe]): the indicators
+    :param session(Session): overrides the sessions of the indicators. Default=None (theirs)
+    :return: DataFrame indexed like base_df with the aligned columns of every indicator
+    '''
+    groups = {}
+    for ind in timeframe_indicators:
+        groups.setdefault(repr(session or ind.session), []).append(ind)
+
+    columns = {}
+    for group in groups.values():
+        timeframes = list(dict.fromkeys(ind.timeframe for ind in group))
+        resampler = Resampler(base_df.index, timeframes, session or group[0].session)
+        needed = dict.fromkeys(c for ind in group for c in price_points.required_columns(ind.price_point))
+        bars = resampler.ohlcv(base_df, columns=list(needed))
+        for ind in group:
+            built = ind.indicator.build_df(bars[ind.timeframe])
+            for name in built.columns:
+                columns[ind.column_name(name)] = resampler.align(ind.timeframe, built[name].to_numpy())
+    return pd.DataFrame(columns, index=base_df.index)
+
+
+def same_timeframe(reference, indicator):
+    '''indicator on the timeframe and session of reference when that is a Timeframe, as is otherwise'''
+    if isinstance(reference, Timeframe):
+        return Timeframe(indicator, reference.timeframe, reference.session)
+    return indicator
+
+
+class Timeframe(indicators.IndicatorBase):
+    '''
+    Wraps an indicator to compute it on a higher timeframe than the bars it is built on, with its
+    values aligned back onto those bars (see Resampler.align()). The column names get the timeframe
+    as a suffix (MACD(26,12,9)@1d) and the *_name attributes of the wrapped indicator are mirrored
+    with it, as are its parameters, so the wrapper drops into the strategies in place of the
+    indicator: Macd_Strategy(macd_object=Timeframe(macd.MACD(), '1d')). tune(), walk_forward()
+    and optimize_strat_params() keep the timeframe (see same_timeframe()); the sweeps, the MA
+    search and the live evaluators work on base timeframe arrays and don't take the wrapper.
+
+    The wrapped indicator's build_df() goes through the indicator cache on the resampled bars, so
+    the wrapper itself isn't cached.
+
+    Methods:
+    :set_column_names()
+    :set_parameters()
+    :column_name()
+    :build_df()
+    :build_columns()
+    '''
+    cache = None
+
+    def __init__(self, indicator, timeframe, session=None, tag=None):
+        '''
+        Class constructor.
+        :param indicator(IndicatorBase): the indicator to compute on the higher timeframe. Its
+        parameters are copied, set them through the wrapper (set_parameters()) to keep both in sync
+        :param timeframe(str): the timeframe (15m, 1h, 1d, 1wk, 1mo or a pandas frequency)
+        :param session(Session): the trading hours. Default=None (every bar counts)
+        :param tag(str): identifier of the instance. Default=None (the indicator's tag@timeframe)
+        '''
+        super().__init__(indicator.price_point, tag or f'{indicator.tag}@{timeframe}')
+        to_offset(timeframe)
+        self.indicator = indicator
+        self.timeframe = timeframe
+        self.session = session
+        self.set_column_names()
+
+    def __str__(self):
+        return f'{self.indicator} on {self.timeframe} bars'
+
+    def set_column_names(self):
+        for key, value in vars(self.indicator).items():
+            if key in ('tag', 'price_point'):
+                continue
+            setattr(self, key, self.column_name(value) if key.endswith('_name') and isinstance(value, str) else value)
+
+    def set_parameters(self, *args, **kwargs):
+        self.indicator.set_parameters(*args, **kwargs)
+        self.set_column_names()
+
+    def column_name(self, name):
+        return f'{name}@{self.timeframe}'
+
+    def build_df(self, base_df):
+        return build_df(base_df, [self])
+
+    def build_columns(self, prices):
+        '''
+        From the price series (or (bars x symbols) frame) alone: each price is aggregated like the
+        column it is named after, the last value of the bin for the derived price points, whose
+        bars need the full frame (build_df()).
+        '''
+        resampler = Resampler(prices.index, [self.timeframe], self.session)
+        how = AGGREGATIONS.get(self.price_point, 'last')
+        resampled = self.indicator.build_columns(prices.__class__(
+            resampler.aggregate(self.timeframe, prices.to_numpy(), how), index=resampler.labels(self.timeframe),
+            **({'columns': prices.columns} if isinstance(prices, pd.DataFrame) else {})))
+        return {self.column_name(name): prices.__class__(
+                    resampler.align(self.timeframe, values.to_numpy()), index=prices.index,
+                    **({'columns': prices.columns} if isinstance(prices, pd.DataFrame) else {}))
+                for name, values in resampled.items()}
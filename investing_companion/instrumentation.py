@@ -0,0 +1,233 @@
+'''
+Opt-in instrumentation of the strategy pipeline. While a Profiler is active, every stage of the
+pipeline (retrieve_data, prepare_data, the indicators' build_df, create_conditions,
+get_signal_column, _get_performance, backtest_strategy, the optimizers...) records its wall time,
+the rows it processed and, if asked for, its peak memory. Counters track the indicator cache hits
+and misses and the optimizer evaluations. When no profiler is active each instrumented call costs
+a single global lookup.
+
+Stage names are <class>.<method>. Times and peaks are inclusive: backtest_strategy includes the
+create_conditions it runs. Peak memory is measured with tracemalloc, which is process-wide, so
+stages running concurrently in threads see each other's allocations. Work done in a process pool
+is not recorded.
+
+Usage:
+    with instrumentation.profile(track_memory=True) as prof:
+        macd_strategy.Macd_Strategy('AAPL').backtest_strategy()
+    prof.to_json('profile.json')
+
+    #Or switched on and off explicitly
+    prof = instrumentation.enable()
+    ...
+    instrumentation.disable()
+'''
+from contextlib import contextmanager
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import types
+import numpy as np
+import pandas as pd
+
+_active = None
+
+
+class Profiler():
+    '''
+    Collects the per-stage measurements and the counters.
+
+    Methods:
+    :stage()
+    :count()
+    :reset()
+    :to_dict()
+    :to_json()
+    :merge() [static]
+    '''
+    def __init__(self, track_memory=False):
+        '''
+        Class constructor.
+        :param track_memory(bool): record the peak memory of each stage with tracemalloc. It slows
+        the allocations down noticeably. Default=False
+        '''
+        self.track_memory = track_memory
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        '''
+        Measures the block as one call of the stage name. The yielded dict takes the number of
+        rows processed under 'rows'.
+        '''
+        frames = self._local.__dict__.setdefault('frames', [])
+        frame = None
+        if self.track_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            #The enclosing stages keep the peak reached so far before it is reset for this one
+            for outer in frames:
+                if outer is not None:
+                    outer[1] = max(outer[1], peak)
+            tracemalloc.reset_peak()
+            frame = [current, current]
+        frames.append(frame)
+        info = {'rows': None}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - start
+            frames.pop()
+            peak_bytes = None
+            if frame is not None:
+                peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+                if frames and frames[-1] is not None:
+                    frames[-1][1] = max(frames[-1][1], peak)
+                peak_bytes = peak - frame[0]
+            self._record(name, seconds, info['rows'], peak_bytes)
+
+    def _record(self, name, seconds, rows, peak_bytes):
+        with self._lock:
+            stats = self.stages.setdefault(name, {'calls': 0, 'seconds': 0., 'rows': 0, 'peak_bytes': None})
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            if rows is not None:
+                stats['rows'] += int(rows)
+            if peak_bytes is not None:
+                stats['peak_bytes'] = max(stats['peak_bytes'] or 0, int(peak_bytes))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def to_dict(self):
+        '''
+        :return: {'stages': {name: {'calls', 'seconds', 'rows', 'peak_bytes'}}, 'counters': {name: count}}.
+        peak_bytes is None when the memory isn't tracked
+        '''
+        with self._lock:
+            return {'stages': {name: dict(stats) for name, stats in self.stages.items()},
+                    'counters': dict(self.counters)}
+
+    def to_json(self, path=None):
+        '''Returns the report as a JSON string, also writing it to path if set'''
+        report = json.dumps(self.to_dict(), indent=1)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(report)
+        return report
+
+    @staticmethod
+    def merge(reports):
+        '''
+        Aggregates the to_dict() reports of many runs: calls, seconds, rows and counters are
+        summed, peak_bytes is the largest one.
+        '''
+        merged = {'stages': {}, 'counters': {}}
+        for report in reports:
+            for name, stats in report['stages'].items():
+                total = merged['stages'].setdefault(name, {'calls': 0, 'seconds': 0., 'rows': 0,
+                                                           'peak_bytes': None})
+                for key in ('calls', 'seconds', 'rows'):
+                    total[key] += stats[key]
+                if stats['peak_bytes'] is not None:
+                    total['peak_bytes'] = max(total['peak_bytes'] or 0, stats['peak_bytes'])
+            for name, n in report['counters'].items():
+                merged['counters'][name] = merged['counters'].get(name, 0) + n
+        return merged
+
+
+def active():
+    '''The active Profiler, None when the instrumentation is off'''
+    return _active
+
+
+def enable(track_memory=False):
+    '''
+    Switches the instrumentation on with a new Profiler, and starts tracemalloc if the memory is
+    tracked and it isn't running yet.
+
+    :return: the new Profiler
+    '''
+    global _active
+    profiler = Profiler(track_memory)
+    profiler._started_tracing = track_memory and not tracemalloc.is_tracing()
+    if profiler._started_tracing:
+        tracemalloc.start()
+    _active = profiler
+    return profiler
+
+
+def disable():
+    '''Switches the instrumentation off and returns the Profiler that was active'''
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None and profiler._started_tracing:
+        tracemalloc.stop()
+    return profiler
+
+
+@contextmanager
+def profile(track_memory=False):
+    '''
+    Profiles the block, yielding the Profiler. The profiler active before (if any) is restored
+    on exit.
+
+    :param track_memory(bool): record the peak memory of each stage. Default=False
+    '''
+    global _active
+    previous = _active
+    profiler = enable(track_memory)
+    try:
+        yield profiler
+    finally:
+        disable()
+        _active = previous
+
+
+def count(name, n=1):
+    '''Adds n to the counter name of the active profiler, if any'''
+    if _active is not None:
+        _active.count(name, n)
+
+
+def _rows(obj, args):
+    '''Rows processed by a call: the length of its first argument if it is a frame or an array,
+    else the length of the object's data'''
+    if args and isinstance(args[0], (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(args[0])
+    data = getattr(obj, 'data', None)
+    return len(data) if isinstance(data, pd.DataFrame) else None
+
+
+def instrumented(method):
+    '''Decorator that records each call of method as the stage <class>.<method> while a profiler is active'''
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return method(self, *args, **kwargs)
+        with profiler.stage(f'{type(self).__name__}.{method.__name__}') as info:
+            result = method(self, *args, **kwargs)
+            info['rows'] = _rows(self, args)
+        return result
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_class(cls, names):
+    '''Wraps the methods in names that cls defines itself with instrumented()'''
+    for name in names:
+        method = cls.__dict__.get(name)
+        if isinstance(method, types.FunctionType) and not getattr(method, '__instrumented__', False):
+            setattr(cls, name, instrumented(method))
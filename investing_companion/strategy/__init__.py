@@ -1,5 +1,10 @@
+import itertools
 import numpy as np
-import yfinance as yf
+import pandas as pd
+from investing_companion.data import yahoo_source
+from investing_companion import instrumentation
+from investing_companion.indicators import price_points, timeframes
+from investing_companion.strategy import optimizer, parallel, walk_forward
 from abc import ABC, abstractmethod
 
 class BaseStrategy(ABC):
@@ -7,16 +12,51 @@ class BaseStrategy(ABC):
     Shouldn't be instantiated directly.
       
     Methods
+    :from_data() [class]
     :retrieve_data()
     :prepare_data()
+    :prepare_frame() [static]
+    :prepared() [static]
+    :add_indicators()
+    :extend()
+    :refresh()
     :get_signal_column()
     :_get_performance()
+    :consecutive_count() [static]
     :buffer_all() [static]
+    :buffer_any() [static]
+    :buffer_count() [static]
+    :shift_rows() [static]
+    :ffill_nonzero() [static]
+    :param_grid() [static]
+    :performance_matrix()
+    :memory_usage()
+    :memory_savings() [class]
+    :panel_conditions() [class]
+    :tunable_params()
+    :_strategy_kwargs()
+    :_base_timeframe_only()
+    :objective()
+    :_find_optimum()
+    :tune()
+    :walk_forward()
     :create_conditions() [Abstract]
     :backtest_strategy() [Abstract]
     :optimize_indic_parameters()[Abstract]
+
+    The pipeline stages (data retrieval and preparation, conditions, signals, performance, backtest
+    and optimization) are recorded by the active profiler, if any (see investing_companion.instrumentation).
     '''
-    def __init__(self, symbol, start=None, end=None, period='max'):
+    _instrumented = ('retrieve_data', 'prepare_data', 'create_conditions', 'get_signal_column',
+                     '_get_performance', 'performance_matrix', 'backtest_strategy', 'sweep_strat_params',
+                     'optimize_strat_params', 'tune', 'walk_forward')
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        instrumentation.instrument_class(cls, cls._instrumented)
+
+    def __init__(self, symbol, start=None, end=None, period='max', data_source=None, data=None,
+                 compact=False, float_dtype='float64'):
         '''
         Class constructor
         :param symbol(str): The ticker symbol, passed as a string
@@ -24,34 +64,202 @@ class BaseStrategy(ABC):
         :param end(str): the end date from which the dataframe will be built. Default=None
         :param period(str): the time period from which the dataframe will be built. Used if start or end are not set.
         default = 'max'
+        :param data_source(DataSourceBase): where the OHLCV data is retrieved from (see investing_companion.data).
+        Default=None, which downloads it from Yahoo Finance
+        :param data(pd.DataFrame): an already loaded OHLCV frame to use instead of retrieving one. It isn't
+        copied nor modified: its columns are shared. If it was already through prepare_data() (ie it comes
+        from another strategy's base_data) it is used as is. Default=None
+        :param compact(bool): keep only the columns the strategy needs (Close, daily_returns and the
+        columns of the indicators' price points), add the indicator columns without copying the frame, and store the
+        signals and positions as int8. The price columns already in float_dtype aren't copied either, so
+        they stay views of a memory-mapped history (see data.mmap_store). Default=False
+        :param float_dtype(str): dtype of the price, return and indicator columns in compact mode.
+        'float32' halves them, at the cost of the precision of the cumulative strat_returns.
+        Default='float64'
         '''
+        self.compact = compact
+        self.float_dtype = np.dtype(float_dtype)
         self.symbol = symbol
         self.period = period
         self.start = start
         self.end = end
-        self.retrieve_data(self.symbol, self.period, start=self.start, end=self.end)
-        self.prepare_data()
+        self.data_source = yahoo_source.YahooSource() if data_source is None else data_source
+        if data is None:
+            self.retrieve_data(self.symbol, self.period, start=self.start, end=self.end)
+            self.prepare_data()
+        elif 'daily_returns' in data.columns:
+            self.data = data
+        else:
+            self.data = data
+            self.prepare_data()
+        #The prepared frame, before any indicator is added. The subclasses build self.data
+        #on top of it with add_indicators(), so it is never modified and can be shared between instances
+        self.base_data = self.data
+
+
+    @classmethod
+    def from_data(cls, data, symbol=None, **kwargs):
+        '''
+        Alternate constructor: builds the strategy from an OHLCV frame that is already loaded,
+        skipping retrieve_data() (and prepare_data() if the frame is already prepared).
+        Only the indicator and signal stages are computed.
+
+        :param data(pd.DataFrame): raw OHLCV frame or the base_data of another strategy
+        :param symbol(str): the symbol the data belongs to. Default=None
+        :param kwargs: the rest of the constructor arguments of the strategy
+        '''
+        return cls(symbol, data=data, **kwargs)
 
     
     def retrieve_data(self, symbol, period, start=None, end=None):
         if start is not None and end is not None:
-            self.data = yf.Ticker(symbol).history(start=start, end=end)
+            self.data = self.data_source.history(symbol, start=start, end=end)
         else:
-            self.data = yf.Ticker(symbol).history(period=period)
+            self.data = self.data_source.history(symbol, period=period)
 
 
     def prepare_data(self):
-        self.data['daily_returns'] = np.log(self.data['Close']/self.data['Close'].shift(1))
-        self.data['bnh_returns'] = self.data['daily_returns'].cumsum()
-        self.data.dropna(inplace=True)
+        self.data = self.prepared(self.data)
+
+
+    @staticmethod
+    def prepare_frame(df):
+        '''Adds the daily (log) and buy-and-hold returns to an OHLCV frame, in place, dropping the first row'''
+        df['daily_returns'] = np.log(df['Close']/df['Close'].shift(1))
+        df['bnh_returns'] = df['daily_returns'].cumsum()
+        df.dropna(inplace=True)
     
 
+    @staticmethod
+    def prepared(df):
+        '''
+        Returns df as prepare_frame() would leave it, without modifying or copying it: the OHLCV
+        columns of the result are views of df's (as long as only the first row is dropped),
+        so they can stay on a memory-mapped file
+        '''
+        prepared = df.copy(deep=False)
+        prepared['daily_returns'] = np.log(df['Close']/df['Close'].shift(1))
+        prepared['bnh_returns'] = prepared['daily_returns'].cumsum()
+        valid = np.ones(len(prepared), dtype=bool)
+        for j in range(prepared.shape[1]):
+            valid &= prepared.iloc[:, j].notna().to_numpy()
+        if len(valid) and not valid[0] and valid[1:].all():
+            return prepared.iloc[1:]
+        return prepared.loc[valid]
+
+
+    def add_indicators(self, *indicators):
+        '''
+        Builds the indicators over base_data and sets self.data to base_data plus their columns.
+        By default the result is a new frame (pd.concat). In compact mode base_data is first cut
+        down to the columns the strategy needs and cast to float_dtype, and self.data is a shallow
+        copy of it the indicator columns are inserted into, so the prices aren't copied.
+        '''
+        self.indicators = indicators
+        self._streams = None
+        if not self.compact:
+            self.data = pd.concat([self.base_data, *[ind.build_df(self.base_data) for ind in indicators]], axis=1)
+            return
+
+        needed = list(dict.fromkeys(['Close', 'daily_returns',
+                                     *[c for ind in indicators for c in price_points.required_columns(ind.price_point)]]))
+        if list(self.base_data.columns) != needed or (self.base_data.dtypes != self.float_dtype).any():
+            base = self.base_data
+            self.base_data = pd.concat([base[c] if base[c].dtype == self.float_dtype else base[c].astype(self.float_dtype)
+                                        for c in needed], axis=1, copy=False)
+        self.data = self.base_data.copy(deep=False)
+        for ind in indicators:
+            for name, column in ind.build_df(self.base_data).items():
+                self.data[name] = column.astype(self.float_dtype, copy=False)
+
+
+    def extend(self, bars):
+        '''
+        Continues the strategy with the bars that follow its history, without going over the
+        history again: only the new rows are prepared, the indicators advance through their
+        streams (see indicators.streaming; indicators without one are rebuilt) and the conditions
+        are recreated. backtest_strategy() then covers the whole extended history.
+
+        :param bars(pd.DataFrame): OHLCV rows. The ones not after the last bar are ignored
+        :return: the number of bars added
+        '''
+        last = self.base_data.index[-1]
+        new = bars.loc[bars.index > last].copy()
+        if new.empty:
+            return 0
+
+        close = new['Close']
+        new['daily_returns'] = np.log(close/close.shift(1).fillna(self.base_data['Close'].iloc[-1]))
+        if 'bnh_returns' in self.base_data.columns:
+            new['bnh_returns'] = self.base_data['bnh_returns'].iloc[-1] + new['daily_returns'].cumsum()
+        new = new[list(self.base_data.columns)].dropna()
+        if self.compact:
+            new = new.astype(self.float_dtype)
+
+        if self._streams is None:
+            self._streams = [ind.to_stream().initialize(self.base_data) if hasattr(ind, 'to_stream') else None
+                             for ind in self.indicators]
+        self.base_data = pd.concat([self.base_data, new])
+
+        columns = {}
+        for ind, stream in zip(self.indicators, self._streams):
+            if stream is None:
+                built = ind.build_df(self.base_data)
+                columns.update({name: built[name] for name in built.columns})
+                continue
+            rows = [stream.update(bar) for bar in new.to_dict('records')]
+            for name in rows[0]:
+                values = pd.Series([row[name] for row in rows], index=new.index)
+                columns[name] = pd.concat([self.data[name], values])
+
+        if self.compact:
+            self.data = self.base_data.copy(deep=False)
+            for name, column in columns.items():
+                self.data[name] = column.astype(self.float_dtype, copy=False)
+        else:
+            self.data = pd.concat([self.base_data, pd.DataFrame(columns, index=self.base_data.index)], axis=1)
+        self.create_conditions()
+        return len(new)
+
+    def refresh(self):
+        '''
+        Brings the strategy up to date with its data source and continues it with extend().
+        A CachedSource is refreshed first, fetching only the new bars (see CachedSource.refresh());
+        if its history had to be rewritten because of a split or dividend adjustment, the
+        strategy is rebuilt from the rewritten history instead.
+
+        :return: the number of bars added, or None when the strategy was rebuilt
+        '''
+        if hasattr(self.data_source, 'refresh') and self.data_source.refresh(self.symbol).status == 'rewritten':
+            self.retrieve_data(self.symbol, self.period, start=self.start, end=self.end)
+            self.prepare_data()
+            self.base_data = self.data
+            self.add_indicators(*self.indicators)
+            self.create_conditions()
+            return None
+
+        last = self.base_data.index[-1]
+        end = self.end if self.end is not None else pd.Timestamp.now(tz=last.tz) + pd.Timedelta(days=1)
+        return self.extend(self.data_source.history(self.symbol, start=last, end=end))
+
     def get_signal_column(self,buy_cond,sell_cond):
+        if self.compact:
+            return np.select([buy_cond, sell_cond], [np.int8(1), np.int8(-1)], np.int8(0))
         return np.select([buy_cond, sell_cond],[1, -1], 0)
     
 
     def _get_performance(self, start=None):
-        self.data['position'] = self.data['signal'].replace(to_replace=0, method='ffill')
+        if self.compact:
+            #int8 positions, flat before the first bar, and the returns summed in float64
+            position = self.shift_rows(self.ffill_nonzero(self.data['signal'].to_numpy()), 1, fill_value=0)
+            strat_returns = position*self.data['daily_returns'].to_numpy(dtype='float64')
+            self.data['position'] = position
+            performance = pd.Series({'daily_returns': self.data['daily_returns'].to_numpy(dtype='float64')[start:].sum(),
+                                     'strat_returns': strat_returns[start:].sum()})
+            self.data['strat_returns'] = np.cumsum(strat_returns).astype(self.float_dtype)
+            return performance
+
+        self.data['position'] = self.ffill_nonzero(self.data['signal'])
         self.data['position'] = self.data['position'].shift()
         self.data['strat_returns'] = self.data['position'] * self.data['daily_returns']
 
@@ -63,13 +271,341 @@ class BaseStrategy(ABC):
 
 
     @staticmethod
-    def buffer_all(i):
-        '''Function used to check for a condition over all the elements in the buffer'''
-        return i.all()
-    
+    def consecutive_count(cond):
+        '''
+        Run-length count: for every row, how many rows in a row (this one included) cond has
+        been True for. Works along the first axis, so 2-D arrays are counted column by column.
+        NaNs count as False, the same way a rolling window containing them never passes.
+        '''
+        values = np.asarray(cond)
+        if values.dtype != bool:
+            values = np.nan_to_num(values.astype('float64'), nan=0.0) != 0
+        index = np.arange(len(values)).reshape((-1,) + (1,)*(values.ndim-1))
+        last_false = np.maximum.accumulate(np.where(values, -1, index), axis=0)
+        return index - last_false
+
+    @staticmethod
+    def buffer_all(cond, buffer):
+        '''
+        Checks whether cond has held True for the last buffer rows (the current one included).
+        Same result as cond.rolling(buffer).apply(all).fillna(0).astype(bool), but computed with
+        a run-length count instead of a callback per window.
+
+        :param cond: boolean Series, DataFrame or array. 2-D inputs are evaluated per column
+        :param buffer(int or array): the window. An array gives one window per column
+        :return: same type (and index) as cond, with boolean values
+        '''
+        held = BaseStrategy.consecutive_count(cond) >= np.asarray(buffer)
+        return BaseStrategy._like(cond, held)
+
+    @staticmethod
+    def buffer_any(cond, buffer):
+        '''
+        Checks whether cond has been True at least once in the last buffer rows (the current one
+        included). Rows without a full window behind them are False, like a rolling window would be.
+
+        :param cond: boolean Series, DataFrame or array. 2-D inputs are evaluated per column
+        :param buffer(int or array): the window. An array gives one window per column
+        :return: same type (and index) as cond, with boolean values
+        '''
+        values = np.asarray(cond)
+        if values.dtype != bool:
+            values = np.nan_to_num(values.astype('float64'), nan=0.0) != 0
+        buffer = np.asarray(buffer)
+        index = np.arange(len(values)).reshape((-1,) + (1,)*(values.ndim-1))
+        last_true = np.maximum.accumulate(np.where(values, index, -len(values)-1), axis=0)
+        hit = ((index - last_true) < buffer) & (index >= buffer - 1)
+        return BaseStrategy._like(cond, hit)
+
+    @staticmethod
+    def buffer_count(cond, buffer):
+        '''
+        How many of the last buffer rows cond was True on. Same as cond.rolling(buffer).sum(),
+        with 0 instead of NaN for the rows without a full window behind them.
+
+        :param cond: boolean Series, DataFrame or array. 2-D inputs are evaluated per column
+        :param buffer(int or array): the window. An array gives one window per column
+        '''
+        values = np.asarray(cond)
+        if values.dtype != bool:
+            values = np.nan_to_num(values.astype('float64'), nan=0.0) != 0
+        buffer = np.asarray(buffer)
+        totals = np.cumsum(values, axis=0)
+        count = totals - BaseStrategy.shift_rows(totals, buffer, fill_value=0)
+        index = np.arange(len(values)).reshape((-1,) + (1,)*(values.ndim-1))
+        return BaseStrategy._like(cond, np.where(index >= buffer - 1, count, 0))
+
+    @staticmethod
+    def shift_rows(values, periods, fill_value=np.nan):
+        '''
+        Array counterpart of Series.shift() along the first axis.
+
+        :param values(array): 1-D or 2-D array
+        :param periods(int or array): non-negative shift. An array gives one shift per column
+        :param fill_value: value for the rows shifted in. Default=NaN
+        '''
+        values = np.asarray(values)
+        if fill_value is not None and np.isnan(fill_value) and values.dtype.kind != 'f':
+            values = values.astype('float64')
+        periods = np.asarray(periods)
+        n = len(values)
+        if periods.ndim == 0:
+            shifted = np.full(values.shape, fill_value, dtype=values.dtype)
+            p = int(periods)
+            if p < n:
+                shifted[p:] = values[:n-p]
+            return shifted
+
+        #Shifts are grouped by value: there are usually only a handful of distinct ones
+        shifted = np.full(values.shape, fill_value, dtype=values.dtype)
+        for p in np.unique(periods):
+            cols = np.flatnonzero(periods == p)
+            if p < n:
+                shifted[p:, cols] = values[:n-p, cols]
+        return shifted
+
+    @staticmethod
+    def ffill_nonzero(values):
+        '''
+        Carries the last non-zero value forward over the zeros that follow it, the way
+        Series.replace(to_replace=0, method='ffill') does. Leading zeros are kept.
+        2-D arrays are filled column by column.
+        '''
+        array = np.asarray(values)
+        index = np.arange(len(array)).reshape((-1,) + (1,)*(array.ndim-1))
+        last_nonzero = np.maximum.accumulate(np.where(array != 0, index, -1), axis=0)
+        filled = np.take_along_axis(array, np.clip(last_nonzero, 0, None), axis=0) if array.ndim > 1\
+                 else array[np.clip(last_nonzero, 0, None)]
+        filled = np.where(last_nonzero >= 0, filled, 0)
+        return BaseStrategy._like(values, filled)
+
+    @staticmethod
+    def param_grid(**param_values):
+        '''
+        Builds a DataFrame with one row per combination of the given parameter values,
+        varying the last parameter fastest.
+        Example: param_grid(window=[10, 20], buffer=[1, 2]) -> 4 rows
+        '''
+        names = list(param_values.keys())
+        values = [list(np.atleast_1d(v)) for v in param_values.values()]
+        return pd.DataFrame(list(itertools.product(*values)), columns=names)
+
+    def performance_matrix(self, signal, start):
+        '''
+        Vectorized counterpart of _get_performance() for many signal columns at once:
+        positions, positions shifted one bar, strategy returns, and the sums from each column's
+        start row onwards.
+
+        :param signal(array): (bars x columns) array of 1/-1/0 signals aligned with self.data
+        :param start(array): the first row taken into account, one per column
+        :return: tuple of arrays (daily_returns, strat_returns) with one value per column
+        '''
+        returns = self.data['daily_returns'].to_numpy(dtype='float64')
+        position = self.shift_rows(self.ffill_nonzero(signal), 1, fill_value=0)
+        strat = position*returns[:, None]
+        in_range = np.arange(len(returns))[:, None] >= np.asarray(start)[None, :]
+        instrumentation.count('optimizer_evaluations', position.shape[1])
+        strat_returns = np.where(in_range, strat, 0.0).sum(axis=0)
+        daily_returns = np.where(in_range, returns[:, None], 0.0).sum(axis=0)
+        return daily_returns, strat_returns
+
+    def _sweep(self, grid, signal_matrix, start, chunk_size=256):
+        '''
+        Runs a parameter sweep. The grid is processed in chunks of columns so the
+        (bars x combinations) arrays stay within a reasonable memory footprint.
+
+        :param grid(pd.DataFrame): one row per parameter combination
+        :param signal_matrix(callable): takes a chunk of the grid, returns its (bars x rows) signals
+        :param start(callable): takes a chunk of the grid, returns the first row to evaluate per row
+        :return: the grid with the daily_returns and strat_returns of each combination
+        '''
+        daily, strat = [], []
+        for i in range(0, len(grid), chunk_size):
+            chunk = grid.iloc[i:i+chunk_size]
+            chunk_daily, chunk_strat = self.performance_matrix(signal_matrix(chunk), start(chunk))
+            daily.append(chunk_daily)
+            strat.append(chunk_strat)
+
+        results = grid.copy()
+        results['daily_returns'] = np.concatenate(daily) if daily else []
+        results['strat_returns'] = np.concatenate(strat) if strat else []
+        return results
+
+    def memory_usage(self):
+        '''
+        Bytes held by the strategy's frames (values and index). In compact mode self.data shares
+        the columns of base_data, so they are only counted once in the total.
+
+        :return: dict with the bytes of 'data', 'base_data' and the 'total'
+        '''
+        def column_buffers(df):
+            buffers = {}
+            for j in range(df.shape[1]):
+                values = df.iloc[:, j].to_numpy()
+                buffers[(values.__array_interface__['data'][0], values.nbytes)] = values.nbytes
+            return buffers
+
+        data, base = column_buffers(self.data), column_buffers(self.base_data)
+        index = self.data.index.memory_usage()
+        base_index = 0 if self.base_data.index is self.data.index else self.base_data.index.memory_usage()
+        return {'data': sum(data.values()) + index,
+                'base_data': sum(base.values()) + self.base_data.index.memory_usage(),
+                'total': sum({**data, **base}.values()) + index + base_index}
+
+    @classmethod
+    def memory_savings(cls, data, symbol=None, float_dtype='float32', **kwargs):
+        '''
+        Backtests the strategy on data in the default and in compact mode and compares the memory
+        each one holds on to.
+
+        :param data(pd.DataFrame): raw OHLCV frame of the symbol
+        :param float_dtype(str): the float_dtype of the compact run. Default='float32'
+        :param kwargs: the rest of the constructor arguments of the strategy
+        :return: dict with the 'full' and 'compact' total bytes and the bytes 'saved'
+        '''
+        totals = {}
+        for mode, options in (('full', {}), ('compact', dict(compact=True, float_dtype=float_dtype))):
+            strat = cls.from_data(data, symbol, **options, **kwargs)
+            strat.backtest_strategy()
+            totals[mode] = strat.memory_usage()['total']
+        totals['saved'] = totals['full'] - totals['compact']
+        return totals
+
     @staticmethod
-    def buffer_any(i):
-        return i.any()
+    def _like(template, values):
+        if isinstance(template, pd.Series):
+            return pd.Series(values, index=template.index)
+        if isinstance(template, pd.DataFrame):
+            return pd.DataFrame(values, index=template.index, columns=template.columns)
+        return values
+
+    @classmethod
+    def panel_conditions(cls, prices, **kwargs):
+        '''
+        Builds the buy and sell conditions of many symbols at once (see strategy.panel).
+        To be implemented by the child classes that support panels.
+
+        :param prices(callable): takes a price point name, returns a (bars x symbols) DataFrame
+        :param kwargs: the strategy's constructor arguments (indicator objects, buffer, method, ...)
+        :return: tuple (buy condition, sell condition, first row evaluated by backtest_strategy())
+        '''
+        raise NotImplementedError(f'{cls.__name__} does not support panel backtests')
+
+    def tunable_params(self):
+        '''
+        The current values of the parameters the optimizers can change, by name.
+        To be implemented by the child classes that support tune().
+        '''
+        raise NotImplementedError(f'{type(self).__name__} does not support tune()')
+
+    def _strategy_kwargs(self, **params):
+        '''
+        Constructor arguments of a copy of the strategy with the given tunable parameters changed
+        (the others keep their current value), sharing this strategy's base_data.
+        To be implemented by the child classes that support tune().
+        '''
+        raise NotImplementedError(f'{type(self).__name__} does not support tune()')
+
+    def _base_timeframe_only(self, search, *indicators, hint='use tune() for indicators on another timeframe'):
+        '''
+        Raises NotImplementedError for the methods that work from the base bars (the searches that
+        compute their candidates from them, the live evaluators' streams) when one of the
+        indicators is on another timeframe (see indicators.timeframes)
+        '''
+        if any(isinstance(ind, timeframes.Timeframe) for ind in indicators):
+            raise NotImplementedError(f'{type(self).__name__}.{search}() works on the base timeframe: {hint}')
+
+    def _common_kwargs(self):
+        return dict(symbol=self.symbol, start=self.start, end=self.end, period=self.period,
+                    data_source=self.data_source, data=self.base_data, compact=self.compact,
+                    float_dtype=self.float_dtype)
+
+    def objective(self, pool, budget=None, patience=None, min_improvement=0.):
+        '''
+        Memoized objective over the tunable parameters: the strat_returns of the backtested copies
+        of the strategy (see optimizer.Objective). A fidelity under 1 backtests the most recent
+        part of the history only.
+
+        :param pool(Executor): where the backtests run (see parallel.executor_scope())
+        :param budget(int): the most backtests the searches can run. Default=None (no limit)
+        :param patience(int): stop after this many backtests without improvement. Default=None (never)
+        :param min_improvement(float): the improvement patience waits for. Default=0
+        '''
+        def evaluate(points, fidelity):
+            data = self.base_data
+            if fidelity < 1:
+                data = data.iloc[-max(int(round(len(data)*fidelity)), 1):]
+            tasks = [(type(self), {**self._strategy_kwargs(**params), 'data': data}) for params in points]
+            return parallel.evaluate_strategies(pool, tasks)
+
+        return optimizer.Objective(evaluate, budget, patience, min_improvement)
+
+    def _find_optimum(self, range_to_use, to_modify, max_iterations=5, round_numbers=False,
+                      executor='serial', max_workers=None, objective=None, **fixed):
+        '''
+        Golden-section search of one parameter, used by optimize_strat_params(). Not meant to be
+        called directly. Every iteration costs a single backtest, and points already evaluated by
+        an earlier search on the same objective are not backtested again.
+
+        :param range_to_use: the range [a,b] to search
+        :param to_modify(str): the tunable parameter to optimize
+        :param max_iterations(int): the max number of golden-section iterations. Default=5
+        :param round_numbers(bool): only try integers. Default=False
+        :param objective(optimizer.Objective): the objective to search. Default=None (a new one on executor)
+        :param fixed: values of the other parameters (such as those already optimized)
+        :return: the best value found, or the current one if the budget ran out before any backtest
+        '''
+        if objective is None:
+            with parallel.executor_scope(executor, max_workers) as pool:
+                return self._find_optimum(range_to_use, to_modify, max_iterations, round_numbers,
+                                          objective=self.objective(pool), **fixed)
+
+        dimension = optimizer.Dimension(to_modify, tuple(range_to_use), integer=bool(round_numbers))
+        fixed = {**self.tunable_params(), **fixed}
+        fixed.pop(to_modify)
+        result = optimizer.optimize(objective, [dimension], 'golden', fixed=fixed, max_iterations=max_iterations)
+        if result['params'] is None:
+            return self.tunable_params()[to_modify]
+        return result['params'][to_modify]
+
+    def tune(self, space, method='coordinate', budget=None, patience=None, min_improvement=0.,
+             executor='serial', max_workers=None, **method_kwargs):
+        '''
+        Searches the tunable parameters for the highest strat_returns (see strategy.optimizer).
+
+        :param space(dict): {parameter: (low, high) or list of choices}, see tunable_params() for the names
+        :param method(str): 'golden', 'coordinate', 'halving', 'random' or 'lhs'. Default='coordinate'
+        :param budget(int): the most backtests to run. Default=None (no limit)
+        :param patience(int): stop after this many backtests without improvement. Default=None (never)
+        :param min_improvement(float): the improvement patience waits for. Default=0
+        :param executor: 'serial', 'thread', 'process' or an Executor instance. Default='serial'
+        :param max_workers(int): worker count for the pools. Default=None (one per core)
+        :param method_kwargs: the search's own arguments (see strategy.optimizer)
+        :return: dict with the best 'params', their 'score', the 'evaluations' made and why the
+        search 'stopped' early, if it did
+        '''
+        if method == 'coordinate':
+            current = self.tunable_params()
+            method_kwargs.setdefault('start', {name: current[name] for name in space if name in current} or None)
+        with parallel.executor_scope(executor, max_workers) as pool:
+            return optimizer.optimize(self.objective(pool, budget, patience, min_improvement),
+                                      space, method, **method_kwargs)
+
+    def walk_forward(self, space, train_size, test_size, executor='serial', max_workers=None, **kwargs):
+        '''
+        Walk-forward validation: the parameters in space are optimized on rolling train windows and
+        backtested on the test window after each one (see strategy.walk_forward).
+
+        :param space(dict): {parameter: (low, high) or list of choices}, see tunable_params()
+        :param train_size(int): bars per train window
+        :param test_size(int): bars per test window
+        :param executor: how the folds are spread: 'serial', 'thread', 'process' or an Executor instance.
+        Default='serial'
+        :param max_workers(int): worker count for the pools. Default=None (one per core)
+        :param kwargs: the rest of the WalkForward arguments (step, anchored, gap, method, budget...)
+        :return: the WalkForward, already run: see its report and summary()
+        '''
+        return walk_forward.WalkForward(self, space, train_size, test_size, **kwargs).run(executor, max_workers)
 
     @abstractmethod
     def create_conditions(self):
@@ -86,3 +622,4 @@ class BaseStrategy(ABC):
         raise NotImplementedError()
 
 
+instrumentation.instrument_class(BaseStrategy, BaseStrategy._instrumented)
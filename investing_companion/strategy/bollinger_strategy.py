@@ -1,5 +1,8 @@
-from investing_companion.indicators import bollinger
+from investing_companion.indicators import bollinger, timeframes
+from investing_companion.indicators import rolling_moments
 from investing_companion import strategy
+from investing_companion.strategy import live
+from investing_companion.strategy import parallel
 import pandas as pd
 import numpy as np
 from enum import Enum, auto
@@ -10,8 +13,13 @@ class Bollinger_Strategy(strategy.BaseStrategy):
 
     :Methods:
     create_conditions()
+    conditions_from_arrays() [class]
     backtest_strategy()
-    _find_optimum()
+    panel_conditions() [class]
+    to_live()
+    sweep_strat_params()
+    tunable_params()
+    _strategy_kwargs()
     optimize_strat_params()
     '''
     class Method(Enum):
@@ -22,7 +30,11 @@ class Bollinger_Strategy(strategy.BaseStrategy):
     def __init__(self, symbol, start=None, end=None, period='max',
                  bollinger_obj=bollinger.BollingerBands(), 
                  method=Method.BAND_CROSSOVER_SIMPLE,
-                 buffer=1):
+                 buffer=1,
+                 data_source=None,
+                 data=None,
+                 compact=False,
+                 float_dtype='float64'):
         """Constructor for the Bollinger-based strategy
 
         Args:
@@ -36,45 +48,66 @@ class Bollinger_Strategy(strategy.BaseStrategy):
             method (optional): Method to use. Defaults to Method.BAND_CROSSOVER_SIMPLE.
             buffer (int, optional): How many days should a condition hold true for a signal to be
             emitted. Defaults to 1.
+            data_source (DataSourceBase, optional): where the data is retrieved from. Defaults to None
+            (Yahoo Finance).
+            data (pd.DataFrame, optional): already loaded data to use instead of retrieving it
+            (see BaseStrategy.from_data()). Defaults to None.
+            compact (bool, optional): keep only the columns the strategy needs and store the signals
+            and positions as int8 (see BaseStrategy). Defaults to False.
+            float_dtype (str, optional): dtype of the float columns in compact mode. Defaults to 'float64'.
         """        
-        super().__init__(symbol, start, end, period)
+        super().__init__(symbol, start, end, period, data_source, data, compact, float_dtype)
         self.bol_band = bollinger_obj
         self.method = method
         self.buffer = buffer
-        self.data = pd.concat([self.data, self.bol_band.build_df(self.data)], axis=1)
+        self.add_indicators(self.bol_band)
         self.create_conditions()
     
 
     def create_conditions(self):
-        if self.method == self.Method.BAND_CROSSOVER_SIMPLE:
+        buy, sell = self.conditions_from_arrays(self.method,
+                                                self.data['Close'].to_numpy(),
+                                                self.data[self.bol_band.upper_band_name].to_numpy(),
+                                                self.data[self.bol_band.lower_band_name].to_numpy(),
+                                                buffer=self.buffer)
+        self.buy_cond = pd.Series(buy, index=self.data.index)
+        self.sell_cond = pd.Series(sell, index=self.data.index)
+
+
+    @classmethod
+    def conditions_from_arrays(cls, method, close, upper_band, lower_band, buffer=1):
+        """Builds the buy and sell conditions from the price and the bands. The band arrays can be
+        1-D or (bars x columns), in which case buffer can also hold one value per column. A 1-D
+        close is broadcast against 2-D bands.
+
+        Returns:
+            tuple: boolean arrays (buy condition, sell condition)
+        """
+        buffer = np.asarray(buffer)
+        if np.ndim(upper_band) == 2 and np.ndim(close) == 1:
+            close = np.broadcast_to(close[:, None], np.shape(upper_band))
+        shift = cls.shift_rows
+
+        if method == cls.Method.BAND_CROSSOVER_SIMPLE:
             #Sell if the Price breaks the upper band. Buy if it breaks the upper one
-            buy_sig = (self.data['Close'] < self.data[self.bol_band.lower_band_name])\
-                      .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
-            
-            cross_buy_sig = (self.data['Close'].shift(self.buffer) >= 
-                             self.data[self.bol_band.lower_band_name].shift(self.buffer-1))
-            
-            sell_sig = (self.data['Close'] > self.data[self.bol_band.upper_band_name])\
-                      .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
-            
-            cross_sell_sig = (self.data['Close'].shift(self.buffer) <= 
-                             self.data[self.bol_band.upper_band_name].shift(self.buffer-1))
-        
-        if self.method == self.Method.DOUBLE_BAND_TEST:
-            #Sell if the Price breaks the upper band and has also done so in the last self.buffer periods.
-            #Buy if it breaks the lower band and also broke it in the last self.buffer periods
-            buy_sig = ((self.data['Close'] < self.data[self.bol_band.lower_band_name]) &\
-                       (self.data['Close'].shift() >= self.data[self.bol_band.lower_band_name]))\
-                       .rolling(self.buffer).sum() >= 2
+            buy_sig = cls.buffer_all(close < lower_band, buffer)
+            cross_buy_sig = shift(close, buffer) >= shift(lower_band, buffer-1)
+
+            sell_sig = cls.buffer_all(close > upper_band, buffer)
+            cross_sell_sig = shift(close, buffer) <= shift(upper_band, buffer-1)
+
+        if method == cls.Method.DOUBLE_BAND_TEST:
+            #Sell if the Price breaks the upper band and has also done so in the last buffer periods.
+            #Buy if it breaks the lower band and also broke it in the last buffer periods
+            buy_sig = cls.buffer_count((close < lower_band) & (shift(close, 1) >= lower_band),
+                                       buffer) >= 2
             cross_buy_sig = True
 
-            sell_sig = ((self.data['Close'] > self.data[self.bol_band.upper_band_name]) &\
-                       (self.data['Close'].shift() <= self.data[self.bol_band.upper_band_name]))\
-                       .rolling(self.buffer).sum() >= 2
+            sell_sig = cls.buffer_count((close > upper_band) & (shift(close, 1) <= upper_band),
+                                        buffer) >= 2
             cross_sell_sig = True
-        
-        self.buy_cond = buy_sig & cross_buy_sig
-        self.sell_cond = sell_sig & cross_sell_sig
+
+        return buy_sig & cross_buy_sig, sell_sig & cross_sell_sig
 
 
     def backtest_strategy(self):
@@ -83,103 +116,152 @@ class Bollinger_Strategy(strategy.BaseStrategy):
         return self._get_performance(start=start)
 
 
-    def _find_optimum(self,range_to_use,to_modify, max_iterations=5, **kwargs):
-        '''
-        Method to find the optimum value, used in optimize_strat_params(). Not meant to be 
-        called directly
-
-        :param range_to_use: the range_to_use [a,b] over which the optimization will take place. First, it calculates
-        the middle value c = (a+b)/2, then, given a function f, calculates f(a),f(b),f(c). The value whose
-        function output is the lowest is discarded and the process is repeated with the remaining numbers
-        :param to_modify: string which tells the method which variable is the one to be optimized
-        :param max_iterations: the max number of iterations before the loop ends
-        :**kwargs: used to feed custom data (such as variables that have already been optimized) to the 
-        method
-        '''
-        ema_window = kwargs.get('ema',self.bol_band.window_size)
-        std_dev = kwargs.get('std_dev',self.bol_band.std_deviations)
-        buffer = kwargs.get('buffer', self.buffer)
-        round_numbers = kwargs.get('round_numbers', False)
-
-        xlow, xhigh = min(range_to_use), max(range_to_use)
-        for _ in trange(max_iterations):
-            xmid_start = (xlow+xhigh)/2
-            if round_numbers:
-                xmid = int(round(xmid_start))
-            else:
-                xmid = xmid_start
-            xlist = [xlow,xmid,xhigh]
-            xdict = {}
-            for x in xlist:
-                if to_modify == 'ema':
-                    ema_window = x
-                elif to_modify == 'std_dev':
-                    std_dev = x
-                elif to_modify == 'buffer':
-                    buffer = x 
-                else: return
-                
-                b_band = bollinger.BollingerBands(window_size=ema_window,
-                                                  std_deviations=std_dev)
-                strat = strategy.bollinger_strategy.Bollinger_Strategy(self.symbol,
-                                                                       start=self.start,
-                                                                       end=self.end,
-                                                                       period=self.period,
-                                                                       bollinger_obj=b_band,
-                                                                       buffer=buffer,
-                                                                       method=self.method,)
-                perf = strat.backtest_strategy()['strat_returns']
-                xdict[x] = perf
-
-            m = min(xdict.values())
-            if xdict[xmid] == m:
-                print('concavity found, breaking loop')
-                break
-            xdict = {key:value for key,value in xdict.items() if xdict[key] != m}
-            xhigh = max(xdict.keys())
-            xlow = min(xdict.keys())
-        
-        optimum_x = max(xdict, key=xdict.get)
-        return optimum_x
+    @classmethod
+    def panel_conditions(cls, prices, bollinger_obj=bollinger.BollingerBands(),
+                         method=Method.BAND_CROSSOVER_SIMPLE, buffer=1, **kwargs):
+        """Builds the conditions of many symbols at once, one per column (see strategy.panel).
+
+        Args:
+            prices (callable): takes a price point name, returns a (bars x symbols) DataFrame
+            The indicator, buffer, method and threshold arguments are the constructor's. Other
+            constructor arguments are accepted and ignored.
+
+        Returns:
+            tuple: (buy condition, sell condition, first row evaluated by backtest_strategy())
+        """
+        bands = bollinger_obj.build_columns(prices(bollinger_obj.price_point))
+        buy, sell = cls.conditions_from_arrays(method,
+                                               prices('Close').to_numpy(),
+                                               bands[bollinger_obj.upper_band_name].to_numpy(),
+                                               bands[bollinger_obj.lower_band_name].to_numpy(),
+                                               buffer=buffer)
+        return buy, sell, bollinger_obj.window_size
+
+
+    def to_live(self):
+        """Builds the live counterpart of the strategy: an evaluator that picks up where the
+        history ends and returns the signal (1 buy, -1 sell, 0 hold) of every new bar passed
+        to its on_bar() in constant time.
+
+        Returns:
+            live.LiveBollinger
+        """
+        self._base_timeframe_only('to_live', self.bol_band, hint='extend() the strategy with the new bars instead')
+        return live.LiveBollinger(self)
+
+
+    def sweep_strat_params(self, window_sizes=None, std_deviations=None, buffers=None, chunk_size=256):
+        """Evaluates every combination of the given parameters at once. The rolling mean and
+        standard deviation of every window are read off one set of prefix sums
+        (see rolling_moments.RollingMoments), and the conditions,
+        positions and returns of all the combinations are computed together as
+        (bars x combinations) arrays. Parameters left as None keep the value the strategy was built with.
+
+        Args:
+            window_sizes (list[int], optional): band windows to try.
+            std_deviations (list[float], optional): band widths to try.
+            buffers (list[int], optional): buffers to try.
+            chunk_size (int, optional): combinations evaluated per batch. Defaults to 256.
+
+        Returns:
+            pd.DataFrame: one row per combination with the parameters, daily_returns and 
+            strat_returns (the same values backtest_strategy() returns for that combination)
+        """
+        self._base_timeframe_only('sweep_strat_params', self.bol_band)
+        grid = self.param_grid(window_size=window_sizes or [self.bol_band.window_size],
+                               std_deviations=std_deviations or [self.bol_band.std_deviations],
+                               buffer=buffers or [self.buffer])
+
+        close = self.data['Close'].to_numpy()
+        moments = rolling_moments.RollingMoments(self.bol_band.get_price_series(self.data),
+                                                 grid['window_size'].max())
+        means, stdevs = {}, {}
+        for window in set(grid['window_size']):
+            means[window], stdevs[window] = moments.mean_std(window)
+
+        def signal_matrix(chunk):
+            sma = np.column_stack([means[w] for w in chunk['window_size']])
+            stdev = np.column_stack([stdevs[w] for w in chunk['window_size']])
+            width = chunk['std_deviations'].to_numpy(dtype='float64')
+            buy, sell = self.conditions_from_arrays(self.method,
+                                                    close,
+                                                    sma + stdev*width,
+                                                    sma - stdev*width,
+                                                    buffer=chunk['buffer'].to_numpy())
+            return self.get_signal_column(buy, sell)
+
+        def start(chunk):
+            return chunk['window_size'].to_numpy()
+
+        return self._sweep(grid, signal_matrix, start, chunk_size=chunk_size)
+
+
+    def tunable_params(self):
+        """The parameters tune() and optimize_strat_params() search: ema (the band window), std_dev and buffer"""
+        return {'ema': self.bol_band.window_size, 'std_dev': self.bol_band.std_deviations, 'buffer': self.buffer}
+
+
+    def _strategy_kwargs(self, **params):
+        params = {**self.tunable_params(), **params}
+        return dict(self._common_kwargs(),
+                    bollinger_obj=timeframes.same_timeframe(self.bol_band, bollinger.BollingerBands(
+                        window_size=params['ema'], std_deviations=params['std_dev'],
+                        price_point=self.bol_band.price_point)),
+                    buffer=params['buffer'],
+                    method=self.method)
 
 
     def optimize_strat_params(self,
                               ema_range,
                               max_iterations=5,
                               std_range=None,
-                              buffer_range=None):
-        """Optimizes the parameters of the strategy. Uses a greedy approach through 
-        bisection and optimizes in sequence (ema->std->buffer)
+                              buffer_range=None,
+                              executor='serial',
+                              max_workers=None,
+                              budget=None,
+                              patience=None):
+        """Optimizes the parameters of the strategy in sequence (ema->std->buffer), with a
+        golden-section search per parameter over a shared memoized objective (see strategy.optimizer)
 
         Args:
             ema_range (list[int]): the range to be used in the ema optimization
-            max_iterations (int, optional): max number of iteration loops. Defaults to 5.
+            max_iterations (int, optional): max number of golden-section iterations. Defaults to 5.
             std_range (list[int], optional): range for the standard deviations. Defaults to None.
             buffer_range (list[int], optional): range for the buffer. Defaults to None.
+            executor (optional): how the candidates of each iteration are evaluated: 'serial', 'thread',
+            'process' or an Executor instance. The results don't depend on it. Defaults to 'serial'.
+            max_workers (int, optional): worker count for the pools. Defaults to None (one per core).
+            budget (int, optional): the most backtests to run over all the parameters. Defaults to None.
+            patience (int, optional): stop after this many backtests without improvement. Defaults to None.
 
         Returns:
             dictionary: a dictionary with the values of all the optimized values
         """              
         results = {}
-        results['EMA'] = self._find_optimum(ema_range, 
-                                            'ema',
-                                            max_iterations=max_iterations,
-                                            round_numbers=True)
-        
-        if std_range is not None:
-            results['std_dev'] = self._find_optimum(std_range, 
-                                                    'std_dev',
-                                                    ema=results['EMA'],
-                                                    max_iterations=max_iterations,
-                                                    round_numbers=True)
-        
-        if buffer_range is not None:
-            std = results['std_dev'] if 'std_dev' in results.keys() else self.bol_band.std_deviations
-            results['buffer'] = self._find_optimum(buffer_range, 
-                                                   'buffer',
-                                                   ema=results['EMA'],
-                                                   std_dev=std,
-                                                   max_iterations=max_iterations,
-                                                   round_numbers=True)
-
-        return results
\ No newline at end of file
+        with parallel.executor_scope(executor, max_workers) as pool:
+            objective = self.objective(pool, budget, patience)
+            results['EMA'] = self._find_optimum(ema_range, 
+                                                'ema',
+                                                max_iterations=max_iterations,
+                                                round_numbers=True,
+                                                objective=objective)
+            
+            if std_range is not None:
+                results['std_dev'] = self._find_optimum(std_range, 
+                                                        'std_dev',
+                                                        ema=results['EMA'],
+                                                        max_iterations=max_iterations,
+                                                        round_numbers=True,
+                                                        objective=objective)
+            
+            if buffer_range is not None:
+                std = results['std_dev'] if 'std_dev' in results.keys() else self.bol_band.std_deviations
+                results['buffer'] = self._find_optimum(buffer_range, 
+                                                       'buffer',
+                                                       ema=results['EMA'],
+                                                       std_dev=std,
+                                                       max_iterations=max_iterations,
+                                                       round_numbers=True,
+                                                       objective=objective)
+
+        return results
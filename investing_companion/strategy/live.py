@@ -0,0 +1,260 @@
+'''
+Live (on-bar) evaluation of the strategies. A live evaluator is built from a strategy that has
+already been run over the history (see the to_live() method of each strategy) and keeps only the
+state its Method needs: the indicator streams, the last buffer+1 values of the inputs the
+crossover checks look back at, run counters for the "held for buffer bars" checks and the RSI
+trend regime. on_bar() then returns the signal of each new bar (1 buy, -1 sell, 0 hold) in
+constant time, the same value backtest_strategy() would put in the signal column.
+
+Usage:
+    live_strat = macd_strategy.Macd_Strategy('AAPL').to_live()
+    for bar in feed:
+        signal = live_strat.on_bar(bar)    #bar: dict/Series with at least Close
+'''
+from collections import deque
+import numpy as np
+
+
+class _Run():
+    '''Whether a condition has held for the last buffer bars (live counterpart of buffer_all)'''
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.count = 0
+
+    def update(self, cond):
+        self.count = min(self.count + 1, self.buffer) if cond else 0
+        return self.count >= self.buffer
+
+
+class _Lagged():
+    '''The last depth+1 values of an input, so that lag(k) is the value k bars ago (shift(k))'''
+    def __init__(self, depth):
+        self.values = deque([np.nan]*(depth + 1), maxlen=depth + 1)
+
+    def update(self, value):
+        self.values.append(value)
+
+    def lag(self, k):
+        return self.values[-1-k]
+
+
+class LiveStrategy():
+    '''
+    Base class for the live evaluators. Shouldn't be used directly.
+
+    Methods:
+    :on_bar()
+    :indicator_values()
+    :_step() [Abstract]
+    '''
+    def __init__(self, strategy, streams):
+        '''
+        Builds the indicator streams from the strategy's history and warms the signal state up by
+        replaying the last rows of its data (enough to fill every buffer and lag).
+
+        :param strategy(BaseStrategy): a strategy already built over the history
+        :param streams(list): the indicator streams (see indicators.streaming), not yet initialized
+        '''
+        self.strategy = strategy
+        self.method = strategy.method
+        self.buffer = int(strategy.buffer)
+        self.streams = [stream.initialize(strategy.base_data) for stream in streams]
+        self.depth = max(self.buffer, 1)
+        self.signal = 0
+        signals = strategy.get_signal_column(strategy.buy_cond, strategy.sell_cond)
+        self.position = int(strategy.ffill_nonzero(signals)[-1]) if len(signals) else 0
+
+        warmup = min(len(strategy.data), self.depth + 1)
+        self.bars = len(strategy.data) - warmup
+        self._seed(strategy.data.iloc[:len(strategy.data)-warmup])
+        for _, row in strategy.data.iloc[len(strategy.data)-warmup:].iterrows():
+            self._step(row)
+
+    def _seed(self, data):
+        '''Sets the state that depends on the whole history before the warmup rows'''
+        pass
+
+    def indicator_values(self, bar):
+        '''Advances every indicator stream with the bar and returns the new values with the bar's Close'''
+        values = {'Close': float(bar['Close'])}
+        for stream in self.streams:
+            values.update(stream.update(bar))
+        return values
+
+    def on_bar(self, bar):
+        '''
+        Evaluates a new bar.
+
+        :param bar(dict or pd.Series): the OHLCV values of the bar (Close and the indicators' price points)
+        :return: 1 (buy), -1 (sell) or 0 (hold)
+        '''
+        return self._step(self.indicator_values(bar))
+
+    def _decide(self, buy, sell):
+        self.bars += 1
+        self.signal = 1 if buy else -1 if sell else 0
+        if self.signal:
+            self.position = self.signal
+        return self.signal
+
+    def _step(self, values):
+        raise NotImplementedError()
+
+
+class LiveMacd(LiveStrategy):
+    '''Live counterpart of Macd_Strategy.conditions_from_arrays()'''
+    def __init__(self, strategy):
+        self.names = strategy.macd
+        self.use_ppo = strategy.use_ppo
+        self.ppo_threshold = strategy.ppo_threshold
+        self.runs = [_Run(int(strategy.buffer)) for _ in range(2)]
+        depth = max(int(strategy.buffer), 1)
+        self.macd_line, self.signal_line, self.ppo = (_Lagged(depth) for _ in range(3))
+        super().__init__(strategy, [strategy.macd.to_stream()])
+
+    def _step(self, values):
+        Method = self.strategy.Method
+        m, s, ppo = values[self.names.macd_name], values[self.names.signal_name], values[self.names.ppo_name]
+        for lagged, value in ((self.macd_line, m), (self.signal_line, s), (self.ppo, ppo)):
+            lagged.update(value)
+        b, thr = self.buffer, self.ppo_threshold
+
+        if self.method == Method.SIGNAL_CROSSOVER:
+            buy_sig, sell_sig = self.runs[0].update(m > s), self.runs[1].update(m < s)
+            cross_buy, cross_sell = self.macd_line.lag(b) <= self.signal_line.lag(b-1),\
+                                    self.macd_line.lag(b) >= self.signal_line.lag(b-1)
+        elif self.method == Method.ZERO_CROSSOVER:
+            buy_sig, sell_sig = self.runs[0].update(m > 0), self.runs[1].update(m < 0)
+            cross_buy, cross_sell = self.macd_line.lag(b) <= 0, self.macd_line.lag(b) >= 0
+        elif self.method == Method.MIXED_CROSSOVER:
+            buy_sig = self.runs[0].update(m >= s) and m > 0
+            sell_sig = self.runs[1].update(m <= s) and m < 0
+            cross_buy, cross_sell = self.macd_line.lag(1) <= 0, self.macd_line.lag(1) >= 0
+        elif self.method == Method.PPO_ONLY:
+            buy_sig, sell_sig = ppo >= thr, ppo <= -thr
+            cross_buy, cross_sell = self.ppo.lag(b) < thr, self.ppo.lag(b) > -thr
+
+        if self.use_ppo:
+            buy_sig = buy_sig or ppo >= thr
+            sell_sig = sell_sig or ppo <= -thr
+        return self._decide(buy_sig and cross_buy, sell_sig and cross_sell)
+
+
+class LiveBollinger(LiveStrategy):
+    '''Live counterpart of Bollinger_Strategy.conditions_from_arrays()'''
+    def __init__(self, strategy):
+        self.names = strategy.bol_band
+        self.runs = [_Run(int(strategy.buffer)) for _ in range(2)]
+        depth = max(int(strategy.buffer), 1)
+        self.close, self.upper, self.lower = (_Lagged(depth) for _ in range(3))
+        #DOUBLE_BAND_TEST: band breaks over the last buffer bars
+        self.breaks = [deque(maxlen=max(int(strategy.buffer), 1)) for _ in range(2)]
+        super().__init__(strategy, [strategy.bol_band.to_stream()])
+
+    def _step(self, values):
+        Method = self.strategy.Method
+        c = values['Close']
+        upper, lower = values[self.names.upper_band_name], values[self.names.lower_band_name]
+        previous_close = self.close.lag(0)
+        for lagged, value in ((self.close, c), (self.upper, upper), (self.lower, lower)):
+            lagged.update(value)
+        b = self.buffer
+
+        if self.method == Method.BAND_CROSSOVER_SIMPLE:
+            buy = self.runs[0].update(c < lower) and self.close.lag(b) >= self.lower.lag(b-1)
+            sell = self.runs[1].update(c > upper) and self.close.lag(b) <= self.upper.lag(b-1)
+        elif self.method == Method.DOUBLE_BAND_TEST:
+            self.breaks[0].append(c < lower and previous_close >= lower)
+            self.breaks[1].append(c > upper and previous_close <= upper)
+            full_window = self.bars >= b - 1
+            buy = full_window and sum(self.breaks[0]) >= 2
+            sell = full_window and sum(self.breaks[1]) >= 2
+        return self._decide(buy, sell)
+
+
+class LiveRSI(LiveStrategy):
+    '''Live counterpart of RSI_Strategy.conditions_from_arrays(), trend regime included'''
+    def __init__(self, strategy):
+        self.names = strategy.rel_str
+        self.thresholds = strategy
+        self.runs = [_Run(int(strategy.buffer)) for _ in range(3)]
+        depth = max(int(strategy.buffer), 1)
+        self.rsi, self.trend_history = _Lagged(depth), _Lagged(depth)
+        self.trend = 0
+        super().__init__(strategy, [strategy.rel_str.to_stream()])
+
+    def _seed(self, data):
+        if len(data):
+            self.trend = int(self.strategy.trend_from_arrays(data[self.names.rsi_name].to_numpy(),
+                                                             self.strategy.uptrend_start,
+                                                             self.strategy.downtrend_start)[-1])
+
+    def _step(self, values):
+        Method, strat = self.strategy.Method, self.thresholds
+        value = values[self.names.rsi_name]
+        self.rsi.update(value)
+        b = self.buffer
+
+        if self.method == Method.DEFAULT:
+            buy = self.runs[0].update(value < strat.oversold_threshold)\
+                  and self.rsi.lag(b) >= strat.oversold_threshold
+            sell = self.runs[1].update(value > strat.overbought_threshold)\
+                   and self.rsi.lag(b) <= strat.overbought_threshold
+            return self._decide(buy, sell)
+
+        uptrend, downtrend = value >= strat.uptrend_start, value <= strat.downtrend_start
+        if uptrend != downtrend:
+            self.trend = 1 if uptrend else -1
+        self.trend_history.update(self.trend)
+
+        buy_sig = self.runs[0].update(value > strat.uptrend_support_high) and self.trend == 1
+        cross_buy = self.rsi.lag(b) < strat.uptrend_support_high
+        sell = self.runs[1].update(self.trend == -1) and self.trend_history.lag(b) == 1
+        reversal = self.runs[2].update(self.trend == 1)
+        if self.method == Method.TREND_RANGES:
+            buy_sig = buy_sig or reversal
+            cross_buy = cross_buy or self.trend_history.lag(b) == -1
+        return self._decide(buy_sig and cross_buy, sell)
+
+
+class LiveMa(LiveStrategy):
+    '''Live counterpart of the Ma_Strategy conditions'''
+    def __init__(self, strategy):
+        self.names = list(strategy.ma_names)
+        self.runs = [_Run(int(strategy.buffer)) for _ in range(2)]
+        depth = max(int(strategy.buffer), 1)
+        self.rows = _Lagged(depth)
+        super().__init__(strategy, [m.to_stream() for m in strategy.ma_objs])
+
+    @staticmethod
+    def _extremes(row):
+        '''Whether Close is the highest / lowest of the row, ignoring the MAs still warming up'''
+        close, mas = row[0], [m for m in row[1:] if m == m]
+        if close != close:
+            return False, False
+        return all(close >= m for m in mas), all(close <= m for m in mas)
+
+    @staticmethod
+    def _ordered(mas, sign):
+        return all((a - b)*sign > 0 for a, b in zip(mas, mas[1:]))
+
+    def _step(self, values):
+        Method = self.strategy.Method
+        row = (values['Close'], *[values[name] for name in self.names])
+        self.rows.update(row)
+        lagged = self.rows.lag(self.buffer)
+        lagged = (np.nan,)*len(row) if lagged != lagged else lagged
+        not_null = all(m == m for m in row[1:])
+
+        if self.method == Method.PRICE_CROSSOVER:
+            highest, lowest = self._extremes(row)
+            was_highest, was_lowest = self._extremes(lagged)
+            buy = self.runs[0].update(highest) and was_lowest
+            sell = self.runs[1].update(lowest) and was_highest
+        elif self.method == Method.IND_ORDERED:
+            mas, lagged_mas = row[1:], lagged[1:]
+            buy = self.runs[0].update(self._ordered(mas, 1))\
+                  and len(mas) > 1 and not self._ordered(lagged_mas, 1)
+            sell = self.runs[1].update(self._ordered(mas, -1))\
+                   and len(mas) > 1 and not self._ordered(lagged_mas, -1)
+        return self._decide(buy and not_null, sell and not_null)
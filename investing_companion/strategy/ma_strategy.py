@@ -1,16 +1,27 @@
 from investing_companion.indicators import moving_averages
+from investing_companion.indicators import rolling_moments
+from investing_companion.indicators import price_points
 from investing_companion import strategy
+from investing_companion.strategy import live
+from investing_companion.strategy import parallel
 from enum import Enum, auto
 import pandas as pd 
 import numpy as np
+import hashlib
+from tqdm import trange
 
 class Ma_Strategy(strategy.BaseStrategy):
     """MA-based strategy. Inherits from BaseStrategy
 
     Methods:
     create_conditions()
+    conditions_from_arrays() [class]
     backtest_strategy()
-    optimize_strat_params() [raises NotImplementedError. see docstring]
+    panel_conditions() [class]
+    to_live()
+    _candidate_mas()
+    _extend_combos()
+    optimize_strat_params()
     """    
     class Method(Enum):
         PRICE_CROSSOVER = auto()
@@ -19,7 +30,11 @@ class Ma_Strategy(strategy.BaseStrategy):
     def __init__(self, symbol, start=None, end=None,
                  period='max', ma_objs=None,
                  method=Method.PRICE_CROSSOVER,
-                 buffer=1):
+                 buffer=1,
+                 data_source=None,
+                 data=None,
+                 compact=False,
+                 float_dtype='float64'):
         """Constructor for the MA-based strategy
 
         Args:
@@ -33,53 +48,82 @@ class Ma_Strategy(strategy.BaseStrategy):
             method (Method(enum), optional): Method to use. Defaults to Method.PRICE_CROSSOVER.
             buffer (int, optional): How many days should a condition hold true for a signal to be
             emitted. Defaults to 1.
+            data_source (DataSourceBase, optional): where the data is retrieved from. Defaults to None
+            (Yahoo Finance).
+            data (pd.DataFrame, optional): already loaded data to use instead of retrieving it
+            (see BaseStrategy.from_data()). Defaults to None.
+            compact (bool, optional): keep only the columns the strategy needs and store the signals
+            and positions as int8 (see BaseStrategy). Defaults to False.
+            float_dtype (str, optional): dtype of the float columns in compact mode. Defaults to 'float64'.
         """        
-        super().__init__(symbol,start,end,period)
+        super().__init__(symbol,start,end,period,data_source,data,compact,float_dtype)
         self.ma_objs = [moving_averages.SimpleMovingAverage()] if ma_objs is None else ma_objs
         self.ma_objs.sort(key=lambda x: x.window_size)
         self.ma_names = [m.ma_name for m in self.ma_objs]
         self.buffer = buffer
         self.method = method
-        self.data = pd.concat([self.data, *[m.build_df(self.data) for m in self.ma_objs]], axis=1)
+        self.add_indicators(*self.ma_objs)
         self.create_conditions()
 
 
     def create_conditions(self):
-        if self.method == self.Method.IND_ORDERED:
-            #buy when the MAs become ordered in such a way that the faster MAs are above and
-            #the slower ones below. Sell when this stops being True
-            dif = np.sign(self.data[self.ma_names].diff(-1, axis='columns')).iloc[:,:-1]
-
-            buy_sig = dif.eq(1).all(axis='columns').rolling(self.buffer).apply(self.buffer_all)\
-                      .fillna(0).astype(bool)
-            cross_buy_sig = dif.shift(self.buffer).ne(1).any(axis='columns').fillna(0).astype(bool)
-
-            sell_sig = dif.eq(-1).all(axis='columns').rolling(self.buffer).apply(self.buffer_all)\
-                       .fillna(0).astype(bool)
-            cross_sell_sig = dif.shift(self.buffer).ne(-1).any(axis='columns').fillna(0).astype(bool)
-        
-        if self.method == self.Method.PRICE_CROSSOVER:
-            not_null_cond = (self.data[[*self.ma_names]].notnull()).all(axis=1)
+        buy, sell = self.conditions_from_arrays(self.method,
+                                                self.data['Close'].to_numpy(),
+                                                [self.data[name].to_numpy() for name in self.ma_names],
+                                                buffer=self.buffer)
+        self.buy_cond = pd.Series(buy, index=self.data.index)
+        self.sell_cond = pd.Series(sell, index=self.data.index)
+
+
+    @classmethod
+    def conditions_from_arrays(cls, method, close, mas, buffer=1):
+        """Builds the buy and sell conditions from the price and the moving averages, comparing
+        them numerically on one contiguous float array. close can be 1-D or (bars x columns),
+        in which case buffer can also hold one value per column.
+
+        Args:
+            method (Method(enum)): Method to use.
+            close (array): the closing prices.
+            mas (list[array]): the moving averages, with the same shape as close, from the
+            smallest window to the largest one.
+            buffer (int or array, optional): Defaults to 1.
+
+        Returns:
+            tuple: boolean arrays (buy condition, sell condition)
+        """
+        close = np.asarray(close, dtype='float64')
+        values = np.stack([np.asarray(m, dtype='float64') for m in mas], axis=-1)
+        buffer = np.asarray(buffer)
+        shift = cls.shift_rows
+        not_null_cond = ~np.isnan(values).any(axis=-1)
+
+        if method == cls.Method.PRICE_CROSSOVER:
             #buy the moment the price is above all the provided indicators. Sell otherwise
-            buy_sig = (self.data[['Close', *self.ma_names]].idxmax(axis=1) == 'Close')\
-                      .rolling(self.buffer)\
-                      .apply(self.buffer_all)\
-                      .astype(bool)
-                      
+            #The MAs still warming up (NaN) are left out of the comparison
+            has_close = ~np.isnan(close)
+            highest = has_close & ~(values > close[..., None]).any(axis=-1)
+            lowest = has_close & ~(values < close[..., None]).any(axis=-1)
 
-            cross_buy_sig = (self.data[['Close', *self.ma_names]].shift(self.buffer).idxmin(axis=1) == 'Close')\
-                            .astype(bool)
+            buy_sig = cls.buffer_all(highest, buffer)
+            cross_buy_sig = shift(lowest, buffer, fill_value=False)
 
-            sell_sig = (self.data[['Close', *self.ma_names]].idxmin(axis=1) == 'Close')\
-                       .rolling(self.buffer)\
-                       .apply(self.buffer_all)\
-                       .astype(bool)
+            sell_sig = cls.buffer_all(lowest, buffer)
+            cross_sell_sig = shift(highest, buffer, fill_value=False)
 
-            cross_sell_sig = (self.data[['Close', *self.ma_names]].shift(self.buffer).idxmax(axis=1) == 'Close')\
-                             .astype(bool)
+        elif method == cls.Method.IND_ORDERED:
+            #buy when the MAs become ordered in such a way that the faster MAs are above and
+            #the slower ones below. Sell when this stops being True
+            ascending = (values[..., :-1] > values[..., 1:]).all(axis=-1)
+            descending = (values[..., :-1] < values[..., 1:]).all(axis=-1)
+            can_cross = values.shape[-1] > 1
 
-        self.buy_cond = buy_sig & cross_buy_sig & not_null_cond
-        self.sell_cond = sell_sig & cross_sell_sig & not_null_cond
+            buy_sig = cls.buffer_all(ascending, buffer)
+            cross_buy_sig = ~shift(ascending, buffer, fill_value=False) & can_cross
+
+            sell_sig = cls.buffer_all(descending, buffer)
+            cross_sell_sig = ~shift(descending, buffer, fill_value=False) & can_cross
+
+        return buy_sig & cross_buy_sig & not_null_cond, sell_sig & cross_sell_sig & not_null_cond
 
 
     def backtest_strategy(self):
@@ -88,6 +132,202 @@ class Ma_Strategy(strategy.BaseStrategy):
         return self._get_performance(start=start.window_size)
 
 
-    def optimize_strat_params(self):
-        '''Probably too complex to implement efficiently'''
-        raise NotImplementedError()
\ No newline at end of file
+    @classmethod
+    def panel_conditions(cls, prices, ma_objs=None, method=Method.PRICE_CROSSOVER, buffer=1, **kwargs):
+        """Builds the conditions of many symbols at once, one per column (see strategy.panel).
+
+        Args:
+            prices (callable): takes a price point name, returns a (bars x symbols) DataFrame
+            The MA objects, method and buffer arguments are the constructor's. Other
+            constructor arguments are accepted and ignored.
+
+        Returns:
+            tuple: (buy condition, sell condition, first row evaluated by backtest_strategy())
+        """
+        ma_objs = sorted([moving_averages.SimpleMovingAverage()] if ma_objs is None else ma_objs,
+                         key=lambda x: x.window_size)
+        mas = [m.build_columns(prices(m.price_point))[m.ma_name].to_numpy() for m in ma_objs]
+        buy, sell = cls.conditions_from_arrays(method, prices('Close').to_numpy(), mas, buffer=buffer)
+        return buy, sell, ma_objs[-1].window_size
+
+
+    def to_live(self):
+        """Builds the live counterpart of the strategy: an evaluator that picks up where the
+        history ends and returns the signal (1 buy, -1 sell, 0 hold) of every new bar passed
+        to its on_bar() in constant time.
+
+        Returns:
+            live.LiveMa
+        """
+        self._base_timeframe_only('to_live', *self.ma_objs, hint='extend() the strategy with the new bars instead')
+        return live.LiveMa(self)
+
+
+    def _candidate_mas(self, window_range, ma_types, window_step, price_point):
+        """Computes every candidate MA a single time, as columns of one (bars x candidates) array,
+        sorted by window size and then by type"""
+        windows = range(min(window_range), max(window_range) + 1, window_step)
+        candidates = sorted(((w, kind) for w in windows for kind in ma_types), key=lambda c: (c[0], c[1]))
+        price = price_points.get(self.data, price_point)
+        values = np.empty((len(price), len(candidates)))
+        if 'SMA' in ma_types:
+            moments = rolling_moments.RollingMoments(price, max(windows))
+        for i, (window, kind) in enumerate(candidates):
+            if kind == 'SMA':
+                values[:, i] = moments.mean(window)
+            else:
+                values[:, i] = price.ewm(span=window, min_periods=window, adjust=False).mean().to_numpy()
+        return candidates, values
+
+
+    def _extend_combos(self, method, values, close, prefix, new):
+        """Evaluates a batch of combinations, each one a kept combination (prefix) plus a new MA
+        with a larger window. The state of the combinations (running max/min of the MAs for
+        PRICE_CROSSOVER, ordering for IND_ORDERED, availability) is built from the state of the
+        prefixes instead of from all their MAs.
+
+        Returns:
+            tuple: (state of the new combinations, (bars x batch) signals)
+        """
+        added = values[:, new]
+        if prefix is None:
+            state = {'high': added, 'low': added, 'ascending': np.ones(added.shape, dtype=bool),
+                     'descending': np.ones(added.shape, dtype=bool), 'valid': ~np.isnan(added),
+                     'last': new, 'size': 1}
+        else:
+            last = values[:, prefix['last']]
+            state = {'high': np.fmax(prefix['high'], added), 'low': np.fmin(prefix['low'], added),
+                     'ascending': prefix['ascending'] & (last > added),
+                     'descending': prefix['descending'] & (last < added),
+                     'valid': prefix['valid'] & ~np.isnan(added),
+                     'last': new, 'size': prefix['size'] + 1}
+
+        shift = self.shift_rows
+        if method == self.Method.PRICE_CROSSOVER:
+            has_close = ~np.isnan(close)[:, None]
+            highest = has_close & ~(state['high'] > close[:, None])
+            lowest = has_close & ~(state['low'] < close[:, None])
+            buy = self.buffer_all(highest, self.buffer) & shift(lowest, self.buffer, fill_value=False)
+            sell = self.buffer_all(lowest, self.buffer) & shift(highest, self.buffer, fill_value=False)
+        else:
+            can_cross = state['size'] > 1
+            buy = self.buffer_all(state['ascending'], self.buffer)\
+                  & ~shift(state['ascending'], self.buffer, fill_value=False) & can_cross
+            sell = self.buffer_all(state['descending'], self.buffer)\
+                   & ~shift(state['descending'], self.buffer, fill_value=False) & can_cross
+        signal = self.get_signal_column(buy & state['valid'], sell & state['valid']).astype('int8')
+        return state, signal
+
+
+    @staticmethod
+    def _take(state, columns):
+        return {key: (value[..., columns] if isinstance(value, np.ndarray) else value)
+                for key, value in state.items()}
+
+
+    def optimize_strat_params(self,
+                              window_range=(5, 200),
+                              max_mas=3,
+                              ma_types=('SMA', 'EMA'),
+                              methods=None,
+                              beam_width=32,
+                              window_step=1,
+                              chunk_size=256,
+                              executor='serial',
+                              max_workers=None):
+        """Searches the number of MAs, their window sizes and their types (SMA/EMA).
+
+        Every candidate MA is computed once and shared by all the combinations that contain it.
+        Combinations are grown one MA at a time, always adding a larger window, and only the
+        beam_width best ones of each size are extended further. A combination is dropped as
+        dominated when a combination already evaluated gives exactly the same signals with
+        returns at least as high. IND_ORDERED needs two MAs to emit any signal, so for that
+        method all the pairs are evaluated before the beam starts pruning.
+        The buffer is the strategy's.
+
+        Args:
+            window_range (tuple, optional): smallest and largest window size. Defaults to (5, 200).
+            max_mas (int, optional): largest number of MAs in a combination. Defaults to 3.
+            ma_types (tuple, optional): MA types to try, among 'SMA' and 'EMA'. Defaults to both.
+            methods (list[Method], optional): Methods to try. Defaults to None (the strategy's).
+            beam_width (int, optional): combinations of each size kept for the next one. Defaults to 32.
+            window_step (int, optional): step between the window sizes tried. Defaults to 1.
+            chunk_size (int, optional): combinations evaluated per batch. Defaults to 256.
+            executor (optional): how the batches are evaluated: 'serial', 'thread' or a thread
+            pool instance (see parallel.executor_scope()). Defaults to 'serial'.
+            max_workers (int, optional): worker count for the pools. Defaults to None.
+
+        Returns:
+            dict: the best combination found: 'Method', 'MAs' (objects to pass as ma_objs),
+            'strat_returns' (from backtest_strategy() with them) and 'Evaluated' (combinations evaluated)
+        """
+        self._base_timeframe_only('optimize_strat_params', *self.ma_objs)
+        methods = [self.method] if methods is None else methods
+        price_point = self.ma_objs[0].price_point
+        candidates, values = self._candidate_mas(window_range, ma_types, window_step, price_point)
+        windows = np.array([window for window, _ in candidates])
+        close = self.data['Close'].to_numpy(dtype='float64')
+        seen = {}
+        best = (-np.inf, None, None)
+        evaluated = 0
+
+        def evaluate(task):
+            method, beam_state, prefix_ids, new = task
+            prefix = None if beam_state is None else self._take(beam_state, prefix_ids)
+            _, signal = self._extend_combos(method, values, close, prefix, new)
+            _, strat = self.performance_matrix(signal, windows[new])
+            keys = [hashlib.blake2b(column.tobytes(), digest_size=16).digest()
+                    for column in np.ascontiguousarray(signal.T)]
+            return strat, keys
+
+        if executor == 'process':
+            raise ValueError('The MA search shares its arrays between workers: use a thread pool')
+        with parallel.executor_scope(executor, max_workers) as pool:
+            for method in methods:
+                #Every combination is a tuple of candidate indices, in increasing order
+                beam, beam_state = [()], None
+                for size in trange(1, max_mas + 1, desc=method.name):
+                    pairs = np.array([(b, j) for b, combo in enumerate(beam)
+                                      for j in range((combo[-1] + 1) if combo else 0, len(candidates))],
+                                     dtype='int64').reshape(-1, 2)
+                    chunks = [pairs[i:i+chunk_size] for i in range(0, len(pairs), chunk_size)]
+                    tasks = [(method, beam_state, chunk[:, 0], chunk[:, 1]) for chunk in chunks]
+
+                    kept = []
+                    #Single MAs never emit an IND_ORDERED signal: all of them go on to the pairs
+                    signals_only = method == self.Method.IND_ORDERED and size == 1
+                    for chunk, (strat, keys) in zip(chunks, pool.map(evaluate, tasks)):
+                        evaluated += len(chunk)
+                        for (b, j), score, key in zip(chunk, strat, keys):
+                            if not signals_only and key in seen and seen[key] >= score:
+                                continue
+                            seen[key] = score
+                            combo = beam[b] + (int(j),)
+                            if score > best[0]:
+                                best = (score, method, combo)
+                            kept.append((score, combo, b, j))
+
+                    if signals_only:
+                        kept.sort(key=lambda k: k[1])
+                    else:
+                        kept.sort(key=lambda k: -k[0])
+                        kept = kept[:beam_width]
+                    if not kept:
+                        break
+                    prefix_ids = np.array([k[2] for k in kept])
+                    beam_state, _ = self._extend_combos(method, values, close,
+                                                        None if beam_state is None
+                                                        else self._take(beam_state, prefix_ids),
+                                                        np.array([k[3] for k in kept]))
+                    beam = [combo for _, combo, _, _ in kept]
+
+        _, method, combo = best
+        if combo is None:
+            return {'Method': None, 'MAs': [], 'strat_returns': np.nan, 'Evaluated': evaluated}
+        ma_classes = {'SMA': moving_averages.SimpleMovingAverage, 'EMA': moving_averages.ExponentialMovingAverage}
+        ma_objs = [ma_classes[candidates[i][1]](candidates[i][0], price_point=price_point) for i in combo]
+        check = Ma_Strategy.from_data(self.base_data, self.symbol, ma_objs=list(ma_objs),
+                                      method=method, buffer=self.buffer, compact=self.compact,
+                                      float_dtype=self.float_dtype)
+        return {'Method': method, 'MAs': ma_objs,
+                'strat_returns': check.backtest_strategy()['strat_returns'], 'Evaluated': evaluated}
@@ -1,16 +1,22 @@
-from investing_companion.indicators import macd
+from investing_companion.indicators import macd, timeframes
 from investing_companion import strategy
+from investing_companion.strategy import live
+from investing_companion.strategy import parallel
 import pandas as pd
 import numpy as np
 from enum import Enum, auto
-from tqdm import tqdm, trange
 
 class Macd_Strategy(strategy.BaseStrategy):
     '''MACD-based strategy class. Inherits from BaseStrategy
     Methods:
     :create_conditions()
+    :conditions_from_arrays() [class]
     :backtest_strategy()
-    :_find_optimum()
+    :panel_conditions() [class]
+    :to_live()
+    :sweep_strat_params()
+    :tunable_params()
+    :_strategy_kwargs()
     :optimize_indic_params()
     '''
     class Method(Enum):
@@ -35,7 +41,8 @@ class Macd_Strategy(strategy.BaseStrategy):
 
     def __init__(self, symbol, start=None, end=None, period='max', 
                 macd_object = macd.MACD(), buffer=1, method = Method.SIGNAL_CROSSOVER,
-                use_ppo=False, ppo_threshold=2.5):
+                use_ppo=False, ppo_threshold=2.5, data_source=None, data=None,
+                compact=False, float_dtype='float64'):
         """Class constructor
 
         Args:
@@ -52,82 +59,88 @@ class Macd_Strategy(strategy.BaseStrategy):
             and sell signals. Defaults to False.
             ppo_threshold (float, optional): the ppo value to take into account. Does 
             nothing if use_ppo is False and the method is not PPO_ONLY. Defaults to 2.5.
+            data_source (DataSourceBase, optional): where the data is retrieved from. Defaults to None
+            (Yahoo Finance).
+            data (pd.DataFrame, optional): already loaded data to use instead of retrieving it
+            (see BaseStrategy.from_data()). Defaults to None.
+            compact (bool, optional): keep only the columns the strategy needs and store the signals
+            and positions as int8 (see BaseStrategy). Defaults to False.
+            float_dtype (str, optional): dtype of the float columns in compact mode. Defaults to 'float64'.
         """        
-        super().__init__(symbol, start, end, period)
+        super().__init__(symbol, start, end, period, data_source, data, compact, float_dtype)
         self.macd = macd_object
         self.use_ppo = use_ppo
         self.ppo_threshold = ppo_threshold
         self.buffer = buffer
         self.method = method
-        self.data = pd.concat([self.data, self.macd.build_df(self.data)], axis=1)
+        self.add_indicators(self.macd)
         self.create_conditions()
 
-    def create_conditions(self):    
-        if self.method == self.Method.SIGNAL_CROSSOVER:
-        #buy if macd>signal for self.buffer periods. Sell if the opposite happens
-        #In all cases we check if a crossing has happened with .shift()
-            buy_sig = (self.data[self.macd.macd_name] > 
-                      self.data[self.macd.signal_name])\
-                      .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
+    def create_conditions(self):
+        buy, sell = self.conditions_from_arrays(self.method,
+                                                self.data[self.macd.macd_name].to_numpy(),
+                                                self.data[self.macd.signal_name].to_numpy(),
+                                                self.data[self.macd.ppo_name].to_numpy(),
+                                                buffer=self.buffer,
+                                                use_ppo=self.use_ppo,
+                                                ppo_threshold=self.ppo_threshold)
+        self.buy_cond = pd.Series(buy, index=self.data.index)
+        self.sell_cond = pd.Series(sell, index=self.data.index)
 
-            cross_buy_sig = (self.data[self.macd.macd_name].shift(self.buffer) <= 
-                             self.data[self.macd.signal_name].shift(self.buffer-1))
-           
-            sell_sig = (self.data[self.macd.macd_name] < 
-                        self.data[self.macd.signal_name])\
-                        .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
-                       
-            cross_sell_sig = (self.data[self.macd.macd_name].shift(self.buffer) >=
-                              self.data[self.macd.signal_name].shift(self.buffer-1))
 
+    @classmethod
+    def conditions_from_arrays(cls, method, macd_line, signal_line, ppo,
+                               buffer=1, use_ppo=False, ppo_threshold=2.5):
+        """Builds the buy and sell conditions from the indicator values. The arrays can be 1-D
+        or (bars x columns), in which case buffer and ppo_threshold can also hold one value per column.
+        create_conditions() and sweep_strat_params() both go through here.
+
+        Returns:
+            tuple: boolean arrays (buy condition, sell condition)
+        """
+        buffer = np.asarray(buffer)
+        ppo_threshold = np.asarray(ppo_threshold)
+        shift = cls.shift_rows
+
+        if method == cls.Method.SIGNAL_CROSSOVER:
+        #buy if macd>signal for buffer periods. Sell if the opposite happens
+        #In all cases we check if a crossing has happened with a shift
+            buy_sig = cls.buffer_all(macd_line > signal_line, buffer)
+            cross_buy_sig = shift(macd_line, buffer) <= shift(signal_line, buffer-1)
 
-        elif self.method == self.Method.ZERO_CROSSOVER:
+            sell_sig = cls.buffer_all(macd_line < signal_line, buffer)
+            cross_sell_sig = shift(macd_line, buffer) >= shift(signal_line, buffer-1)
+
+        elif method == cls.Method.ZERO_CROSSOVER:
             #Buy if MACD goes from negative to postive. Sell otherwise
-            buy_sig = (self.data[self.macd.macd_name] > 0)\
-                       .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
-            
-            cross_buy_sig = (self.data[self.macd.macd_name].shift(self.buffer) <= 0)
+            buy_sig = cls.buffer_all(macd_line > 0, buffer)
+            cross_buy_sig = shift(macd_line, buffer) <= 0
 
-            sell_sig = (self.data[self.macd.macd_name] < 0)\
-                        .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
-            
-            cross_sell_sig = (self.data[self.macd.macd_name].shift(self.buffer) >= 0)
-        
-        elif self.method == self.Method.MIXED_CROSSOVER:
+            sell_sig = cls.buffer_all(macd_line < 0, buffer)
+            cross_sell_sig = shift(macd_line, buffer) >= 0
+
+        elif method == cls.Method.MIXED_CROSSOVER:
             #Buy if MACD goes from negative to positive and it has remained greater than the signal
-            #for self.buffer periods. Sell otherwise
-            buy_sig = (self.data[self.macd.macd_name] > 0)
+            #for buffer periods. Sell otherwise
+            buy_sig = (macd_line > 0) & cls.buffer_all(macd_line >= signal_line, buffer)
+            cross_buy_sig = shift(macd_line, 1) <= 0
 
-            buy_sig&= (self.data[self.macd.macd_name] >= 
-                      self.data[self.macd.signal_name])\
-                      .rolling(self.buffer).apply(self.buffer_all).fillna(0)
-            
-            cross_buy_sig = (self.data[self.macd.macd_name].shift() <= 0)
-            
-            sell_sig = (self.data[self.macd.macd_name] < 0)
-            
-            sell_sig &= (self.data[self.macd.macd_name] <= 
-                        self.data[self.macd.signal_name])\
-                        .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
-            
-            cross_sell_sig = (self.data[self.macd.macd_name].shift() >= 0)
-        
-        elif self.method == self.Method.PPO_ONLY:
+            sell_sig = (macd_line < 0) & cls.buffer_all(macd_line <= signal_line, buffer)
+            cross_sell_sig = shift(macd_line, 1) >= 0
+
+        elif method == cls.Method.PPO_ONLY:
             #Buy if the price reaches the upper PPO Threshold. Sell if it reaches the lower one.
-            buy_sig = (self.data[self.macd.ppo_name]) >= self.ppo_threshold
-            cross_buy_sig = (self.data[self.macd.ppo_name].shift(self.buffer) <
-                            self.ppo_threshold)
-            
-            sell_sig = (self.data[self.macd.ppo_name]) <= np.negative(self.ppo_threshold)
-            cross_sell_sig = (self.data[self.macd.ppo_name].shift(self.buffer) >
-                              np.negative(self.ppo_threshold))
-        
-        if self.use_ppo:
-                buy_sig |= (self.data[self.macd.ppo_name]) >= self.ppo_threshold
-                sell_sig |= (self.data[self.macd.ppo_name]) <= np.negative(self.ppo_threshold)
+            buy_sig = ppo >= ppo_threshold
+            cross_buy_sig = shift(ppo, buffer) < ppo_threshold
+
+            sell_sig = ppo <= np.negative(ppo_threshold)
+            cross_sell_sig = shift(ppo, buffer) > np.negative(ppo_threshold)
+
+        if use_ppo:
+            buy_sig = buy_sig | (ppo >= ppo_threshold)
+            sell_sig = sell_sig | (ppo <= np.negative(ppo_threshold))
 
-        self.buy_cond = buy_sig & cross_buy_sig
-        self.sell_cond = sell_sig & cross_sell_sig
+        return buy_sig & cross_buy_sig, sell_sig & cross_sell_sig
 
 
     def backtest_strategy(self):
@@ -136,72 +149,129 @@ class Macd_Strategy(strategy.BaseStrategy):
         return self._get_performance(start=start)
         
 
-    def _find_optimum(self,range_to_use,to_modify, max_iterations=5, **kwargs):
-        '''
-        Method to find the optimum value, used in optimize_strat_params(). Not meant to be 
-        called directly
-
-        :param range_to_use: the range_to_use [a,b] over which the optimization will take place. First, it calculates
-        the middle value c = (a+b)/2, then, given a function f, calculates f(a),f(b),f(c). The value whose
-        function output is the lowest is discarded and the process is repeated with the remaining numbers
-        :param to_modify: string which tells the method which variable is the one to be optimized
-        :param max_iterations: the max number of iterations before the loop ends
-        :**kwargs: used to feed custom data (such as variables that have already been optimized) to the 
-        method
-        '''
-        f_ema = kwargs.get('fast_ema',self.macd.fastema_window)
-        s_ema = kwargs.get('slow_ema',self.macd.slowema_window)
-        signal = kwargs.get('signal', self.macd.signal_window)
-        buffer = kwargs.get('buffer', self.buffer)
-        round_numbers = kwargs.get('round_numbers', False)
-        ppo_threshold = kwargs.get('ppo_threshold', self.ppo_threshold)
-        fast_slow_ratio = (26/12)
-
-        xlow, xhigh = min(range_to_use), max(range_to_use)
-        for _ in trange(max_iterations):
-            xmid_start = (xlow+xhigh)/2
-            if round_numbers:
-                xmid = int(round(xmid_start))
-            else:
-                xmid = xmid_start
-            xlist = [xlow,xmid,xhigh]
-            xdict = {}
-            for x in xlist:
-                if to_modify == 'fast_ema':
-                    f_ema = x
-                    s_ema = int(round(f_ema*fast_slow_ratio))
-                elif to_modify == 'signal':
-                    signal = x
-                elif to_modify == 'buffer':
-                    buffer = x
-                elif to_modify == 'ppo':
-                    ppo_threshold = x   
-                elif to_modify is None:
-                    return
-                
-                mcd = macd.MACD(s_ema,f_ema,signal)
-                strat = strategy.macd_strategy.Macd_Strategy(self.symbol,
-                                                             start=self.start,
-                                                             end=self.end,
-                                                             period=self.period,
-                                                             macd_object=mcd,
-                                                             buffer=buffer,
-                                                             method=self.method,
-                                                             use_ppo=self.use_ppo,
-                                                             ppo_threshold=ppo_threshold)  
-                perf = strat.backtest_strategy()['strat_returns']
-                xdict[x] = perf
-
-            m = min(xdict.values())
-            if xdict[xmid] == m:
-                print('concavity found, breaking loop')
-                break
-            xdict = {key:value for key,value in xdict.items() if xdict[key] != m}
-            xhigh = max(xdict.keys())
-            xlow = min(xdict.keys())
-        
-        optimum_x = max(xdict, key=xdict.get)
-        return optimum_x
+    @classmethod
+    def panel_conditions(cls, prices, macd_object=macd.MACD(), buffer=1,
+                         method=Method.SIGNAL_CROSSOVER, use_ppo=False, ppo_threshold=2.5, **kwargs):
+        """Builds the conditions of many symbols at once, one per column (see strategy.panel).
+
+        Args:
+            prices (callable): takes a price point name, returns a (bars x symbols) DataFrame
+            The indicator, buffer, method and threshold arguments are the constructor's. Other
+            constructor arguments are accepted and ignored.
+
+        Returns:
+            tuple: (buy condition, sell condition, first row evaluated by backtest_strategy())
+        """
+        lines = macd_object.build_columns(prices(macd_object.price_point))
+        buy, sell = cls.conditions_from_arrays(method,
+                                               lines[macd_object.macd_name].to_numpy(),
+                                               lines[macd_object.signal_name].to_numpy(),
+                                               lines[macd_object.ppo_name].to_numpy(),
+                                               buffer=buffer,
+                                               use_ppo=use_ppo,
+                                               ppo_threshold=ppo_threshold)
+        return buy, sell, max([macd_object.slowema_window, macd_object.signal_window])
+
+
+    def to_live(self):
+        """Builds the live counterpart of the strategy: an evaluator that picks up where the
+        history ends and returns the signal (1 buy, -1 sell, 0 hold) of every new bar passed
+        to its on_bar() in constant time.
+
+        Returns:
+            live.LiveMacd
+        """
+        self._base_timeframe_only('to_live', self.macd, hint='extend() the strategy with the new bars instead')
+        return live.LiveMacd(self)
+
+
+    def sweep_strat_params(self,
+                           fastema_windows=None,
+                           slowema_windows=None,
+                           signal_windows=None,
+                           buffers=None,
+                           ppo_thresholds=None,
+                           chunk_size=256):
+        """Evaluates every combination of the given parameters at once. Each distinct EMA,
+        MACD line and signal line is computed a single time, and the conditions, positions and
+        returns of all the combinations are computed together as (bars x combinations) arrays.
+        Parameters left as None keep the value the strategy was built with.
+
+        Args:
+            fastema_windows (list[int], optional): fast EMA windows to try.
+            slowema_windows (list[int], optional): slow EMA windows to try.
+            signal_windows (list[int], optional): signal windows to try.
+            buffers (list[int], optional): buffers to try.
+            ppo_thresholds (list[float], optional): ppo thresholds to try. Only meaningful with
+            use_ppo or Method.PPO_ONLY.
+            chunk_size (int, optional): combinations evaluated per batch. Defaults to 256.
+
+        Returns:
+            pd.DataFrame: one row per combination with the parameters, daily_returns and 
+            strat_returns (the same values backtest_strategy() returns for that combination)
+        """
+        self._base_timeframe_only('sweep_strat_params', self.macd)
+        grid = self.param_grid(fastema_window=fastema_windows or [self.macd.fastema_window],
+                               slowema_window=slowema_windows or [self.macd.slowema_window],
+                               signal_window=signal_windows or [self.macd.signal_window],
+                               buffer=buffers or [self.buffer],
+                               ppo_threshold=ppo_thresholds or [self.ppo_threshold])
+
+        price = self.macd.get_price_series(self.data)
+        spans = set(grid['fastema_window']) | set(grid['slowema_window'])
+        emas = {span: price.ewm(span=span, min_periods=span, adjust=False).mean().to_numpy()
+                for span in spans}
+
+        def signal_matrix(chunk):
+            lines = list(dict.fromkeys(zip(chunk['fastema_window'], chunk['slowema_window'],
+                                           chunk['signal_window'])))
+            macd_lines = np.column_stack([emas[f] - emas[s] for f, s, _ in lines])
+            ppos = np.column_stack([(emas[f] - emas[s])/emas[s]*100 for f, s, _ in lines])
+            signal_lines = np.empty_like(macd_lines)
+            for window in set(w for _, _, w in lines):
+                cols = [i for i, line in enumerate(lines) if line[2] == window]
+                signal_lines[:, cols] = pd.DataFrame(macd_lines[:, cols])\
+                                          .ewm(span=window, min_periods=window, adjust=False)\
+                                          .mean().to_numpy()
+
+            position = {line: i for i, line in enumerate(lines)}
+            cols = [position[line] for line in zip(chunk['fastema_window'], chunk['slowema_window'],
+                                                   chunk['signal_window'])]
+            buy, sell = self.conditions_from_arrays(self.method,
+                                                    macd_lines[:, cols],
+                                                    signal_lines[:, cols],
+                                                    ppos[:, cols],
+                                                    buffer=chunk['buffer'].to_numpy(),
+                                                    use_ppo=self.use_ppo,
+                                                    ppo_threshold=chunk['ppo_threshold'].to_numpy())
+            return self.get_signal_column(buy, sell)
+
+        def start(chunk):
+            return np.maximum(chunk['slowema_window'], chunk['signal_window']).to_numpy()
+
+        return self._sweep(grid, signal_matrix, start, chunk_size=chunk_size)
+
+
+    def tunable_params(self):
+        """
+        The parameters tune() and optimize_strat_params() search: fast_ema, signal, buffer and ppo.
+        slow_ema can also be searched; when it isn't given it follows fast_ema with the ratio between
+        the default windows (26/12)
+        """
+        return {'fast_ema': self.macd.fastema_window, 'signal': self.macd.signal_window,
+                'buffer': self.buffer, 'ppo': self.ppo_threshold}
+
+
+    def _strategy_kwargs(self, **params):
+        params = {**self.tunable_params(), **params}
+        slow_ema = params.get('slow_ema', int(round(params['fast_ema']*(26/12))))
+        return dict(self._common_kwargs(),
+                    macd_object=timeframes.same_timeframe(self.macd, macd.MACD(
+                        slow_ema, params['fast_ema'], params['signal'], price_point=self.macd.price_point)),
+                    buffer=params['buffer'],
+                    method=self.method,
+                    use_ppo=self.use_ppo,
+                    ppo_threshold=params['ppo'])
             
 
     def optimize_strat_params(self,
@@ -209,49 +279,63 @@ class Macd_Strategy(strategy.BaseStrategy):
                               signal_range_to_use,
                               buffer_range_to_use=None,
                               ppo_range_to_use=None,
-                              max_iterations=5 ):
+                              max_iterations=5,
+                              executor='serial',
+                              max_workers=None,
+                              budget=None,
+                              patience=None):
         '''
-        Optimization method for the strategy. Uses a greedy approach through bisection.
-        Optimizes the parameters in the following sequence: Slow and Fast EMA, Signal, Buffer, PPO.
-        Quite a few concessions are made to make the method finish in a reasonable amount of time, so 
-        it is not likely at all to find the global optimum.
+        Optimization method for the strategy. Optimizes the parameters in the following sequence:
+        Slow and Fast EMA, Signal, Buffer, PPO, with a golden-section search per parameter over a shared
+        memoized objective (see strategy.optimizer). Being a search one parameter at a time, it is not
+        likely at all to find the global optimum: tune() searches them together.
 
         :param fastema_range_to_use: Mandatory range_to_use to be used for the Fast EMA optimization. The slow EMA
         will be calculated keeping the ratio that exists between the default values (12 and 26)
         :param signal_range_to_use: Mandatory. range_to_use over which the signal will be optimized
         :param buffer_range_to_use: Optional. range_to_use for the buffer
         :param ppo_range_to_use: Optional. range_to_use for the ppo threshold. Does nothing if self.use_ppo is False
-        :param max_iterations: Optional. How many times to iterate through bisection. The 
-        iteration loop is coded to exit if the middle value is lower than both of the extremes regardless of this
-        value. Default=5
+        :param max_iterations: Optional. How many golden-section iterations to run per parameter. Default=5
+        :param executor: Optional. How the candidates of each iteration are evaluated: 'serial', 'thread',
+        'process' or an Executor instance. The results don't depend on it. Default='serial'
+        :param max_workers: Optional. Worker count for the thread/process pools. Default=None (one per core)
+        :param budget: Optional. The most backtests to run over all the parameters. Default=None
+        :param patience: Optional. Stop after this many backtests without improvement. Default=None
         '''
         results = {}
-        results['Fast EMA'] = self._find_optimum(fastema_range_to_use, 
-                                                 to_modify='fast_ema')
-        results['Slow EMA'] = int(round(results['Fast EMA']*(26/12)))
-       
-        results['Signal'] = self._find_optimum(signal_range_to_use,
-                                               to_modify='signal',
-                                               max_iterations = max_iterations,
-                                               fast_ema=results['Fast EMA'],
-                                               slow_ema= results['Slow EMA'],)
-
-        if buffer_range_to_use is not None:
-            results['Buffer'] = self._find_optimum(buffer_range_to_use,
-                                                   to_modify='buffer',
+        with parallel.executor_scope(executor, max_workers) as pool:
+            objective = self.objective(pool, budget, patience)
+            results['Fast EMA'] = self._find_optimum(fastema_range_to_use, 
+                                                     to_modify='fast_ema',
+                                                     max_iterations=max_iterations,
+                                                     round_numbers=True,
+                                                     objective=objective)
+            results['Slow EMA'] = int(round(results['Fast EMA']*(26/12)))
+           
+            results['Signal'] = self._find_optimum(signal_range_to_use,
+                                                   to_modify='signal',
                                                    max_iterations = max_iterations,
+                                                   round_numbers=True,
                                                    fast_ema=results['Fast EMA'],
-                                                   slow_ema=results['Slow EMA'],
-                                                   signal=results['Signal'])              
-        
-        if ppo_range_to_use is not None and self.use_ppo:
-            use_buffer = results['Buffer'] if 'Buffer' in results.keys() else self.buffer
-            results['PPO'] = self._find_optimum(ppo_range_to_use,
-                                                to_modify='ppo',
-                                                max_iterations = max_iterations,
-                                                fast_ema=results['Fast EMA'],
-                                                slow_ema=results['Slow EMA'],
-                                                signal=results['Signal'],
-                                                buffer=use_buffer)
+                                                   objective=objective)
+
+            if buffer_range_to_use is not None:
+                results['Buffer'] = self._find_optimum(buffer_range_to_use,
+                                                       to_modify='buffer',
+                                                       max_iterations = max_iterations,
+                                                       round_numbers=True,
+                                                       fast_ema=results['Fast EMA'],
+                                                       signal=results['Signal'],
+                                                       objective=objective)
+            
+            if ppo_range_to_use is not None and self.use_ppo:
+                use_buffer = results['Buffer'] if 'Buffer' in results.keys() else self.buffer
+                results['PPO'] = self._find_optimum(ppo_range_to_use,
+                                                    to_modify='ppo',
+                                                    max_iterations = max_iterations,
+                                                    fast_ema=results['Fast EMA'],
+                                                    signal=results['Signal'],
+                                                    buffer=use_buffer,
+                                                    objective=objective)
            
         return results
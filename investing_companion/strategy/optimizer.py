@@ -0,0 +1,280 @@
+'''
+Shared parameter search for the strategies. A search runs over an Objective, which memoizes every
+point it has already evaluated (so a search never pays twice for the same backtest), evaluates the
+new points of each step as one batch (so they can go to a pool), and enforces the evaluation budget
+and the early stopping. The search methods are:
+- 'golden': golden-section search over one parameter
+- 'coordinate': coordinate descent, a golden-section search per parameter in turn, repeated while
+  it keeps improving
+- 'halving': successive halving, many sampled candidates backtested on the most recent part of the
+  history first, the best 1/eta of them moving on to a longer part each round
+- 'random' and 'lhs': random and Latin hypercube sampling
+
+The objective is maximized. Strategies expose it through BaseStrategy.tune().
+
+Usage:
+    result = optimizer.optimize(objective, {'window_size': (5, 60), 'buffer': (1, 4)}, method='coordinate')
+'''
+import math
+import numpy as np
+
+METHODS = ('golden', 'coordinate', 'halving', 'random', 'lhs')
+
+_GOLDEN = (math.sqrt(5) - 1)/2
+
+
+class StopSearch(Exception):
+    '''Raised by the Objective when the budget is used up or the search stopped improving'''
+    pass
+
+
+class Dimension():
+    '''
+    One parameter of the search space: a (low, high) range, integer when both bounds are
+    integers, or a list of choices.
+
+    Methods:
+    :value()
+    :sample()
+    '''
+    def __init__(self, name, bounds, integer=None):
+        '''
+        :param name(str): the parameter name
+        :param bounds: (low, high) tuple or list of choices
+        :param integer(bool): whether the range only takes integers. Default=None (when both bounds are)
+        '''
+        self.name = name
+        self.choices = list(bounds) if isinstance(bounds, list) else None
+        if self.choices is not None:
+            self.low, self.high, self.integer = 0, len(self.choices) - 1, True
+        else:
+            self.low, self.high = min(bounds), max(bounds)
+            self.integer = all(isinstance(b, (int, np.integer)) for b in bounds) if integer is None else integer
+
+    def value(self, x):
+        '''Parameter value at coordinate x (rounded for integers, the choice for lists)'''
+        if self.integer:
+            x = int(round(min(max(x, self.low), self.high)))
+        return self.choices[x] if self.choices is not None else x
+
+    def sample(self, u):
+        '''Coordinate at u in [0, 1), with every integer equally likely'''
+        if self.integer:
+            return int(self.low + math.floor(u*(self.high - self.low + 1)))
+        return self.low + u*(self.high - self.low)
+
+
+def search_space(space):
+    '''List of Dimension from a {name: bounds} dict (Dimension instances are kept as they are)'''
+    if not isinstance(space, dict):
+        return list(space)
+    return [bounds if isinstance(bounds, Dimension) else Dimension(name, bounds) for name, bounds in space.items()]
+
+
+class Objective():
+    '''
+    Memoized, budgeted objective.
+
+    Methods:
+    :__call__()
+    :best()
+    '''
+    def __init__(self, evaluate, budget=None, patience=None, min_improvement=0.):
+        '''
+        Class constructor.
+        :param evaluate(callable): takes a list of parameter dicts and a fidelity (the fraction of the
+        history to backtest, 1 for all of it) and returns their scores
+        :param budget(int): the most evaluations the search can make. Default=None (no limit)
+        :param patience(int): stop after this many full-fidelity evaluations without improving the
+        best score by more than min_improvement. Default=None (never)
+        :param min_improvement(float): the improvement patience waits for. Default=0
+        '''
+        self.evaluate = evaluate
+        self.budget = budget
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.memo = {}
+        self.history = []
+        self.evaluations = 0
+        self.since_improvement = 0
+        self.best_params, self.best_score = None, -np.inf
+
+    @staticmethod
+    def _key(params, fidelity):
+        return (fidelity, tuple(sorted(params.items())))
+
+    def __call__(self, points, fidelity=1.):
+        '''
+        Scores of the parameter dicts in points, evaluating the ones not seen before in one batch.
+        NaN scores count as -inf. Raises StopSearch when the budget runs out or patience is exceeded
+        (after recording what could be evaluated).
+        '''
+        keys = [self._key(p, fidelity) for p in points]
+        missing = {}
+        for key, params in zip(keys, points):
+            if key not in self.memo and key not in missing:
+                missing[key] = params
+
+        truncated = False
+        if self.budget is not None and len(missing) > self.budget - self.evaluations:
+            missing = dict(list(missing.items())[:max(self.budget - self.evaluations, 0)])
+            truncated = True
+
+        if missing:
+            scores = self.evaluate(list(missing.values()), fidelity)
+            self.evaluations += len(missing)
+            for (key, params), score in zip(missing.items(), scores):
+                score = -np.inf if score is None or score != score else float(score)
+                self.memo[key] = score
+                self.history.append((params, fidelity, score))
+                if fidelity == 1:
+                    self._track(params, score)
+
+        if truncated:
+            raise StopSearch('budget')
+        if self.patience is not None and self.since_improvement >= self.patience:
+            raise StopSearch('patience')
+        return [self.memo[key] for key in keys]
+
+    def _track(self, params, score):
+        if score > self.best_score + self.min_improvement or self.best_params is None:
+            self.since_improvement = 0
+        else:
+            self.since_improvement += 1
+        if score > self.best_score or self.best_params is None:
+            self.best_params, self.best_score = dict(params), score
+
+    def best(self):
+        '''(params, score) of the best full-fidelity point evaluated so far'''
+        return self.best_params, self.best_score
+
+
+def golden_section(objective, dimension, fixed=None, max_iterations=20, tolerance=None):
+    '''
+    Golden-section search over one dimension, the others held at fixed. Each iteration shrinks
+    the bracket by the golden ratio and needs a single new evaluation: the interior point it
+    keeps is carried over with its score (not recomputed from the bracket, which could land an
+    ulp off and miss the memo). On integers, once the bracket is within tolerance, the search ends
+    by scoring what is left of it.
+
+    :param tolerance(float): stop when the bracket is narrower. Default=None (1e-3 of the range for
+    floats, 2 for integers)
+    '''
+    fixed = dict(fixed or {})
+    score = lambda xs: objective([{**fixed, dimension.name: dimension.value(x)} for x in xs])
+    low, high = dimension.low, dimension.high
+    tolerance = (2 if dimension.integer else 1e-3*(high - low)) if tolerance is None else tolerance
+
+    def point(x):
+        return int(round(x)) if dimension.integer else x
+
+    c, d = point(high - _GOLDEN*(high - low)), point(low + _GOLDEN*(high - low))
+    fc, fd = score([c, d])
+    for _ in range(max_iterations):
+        if high - low <= tolerance:
+            break
+        if fc >= fd:
+            high, d, fd = d, c, fc
+            c = point(high - _GOLDEN*(high - low))
+            fc, = score([c])
+        else:
+            low, c, fc = c, d, fd
+            d = point(low + _GOLDEN*(high - low))
+            fd, = score([d])
+
+    if dimension.integer and high - low <= tolerance:
+        score(range(int(low), int(high) + 1))
+
+
+def coordinate_descent(objective, space, start=None, max_rounds=3, max_iterations=20):
+    '''
+    Golden-section search on each dimension in turn, from the best point so far. The rounds
+    repeat until one of them doesn't improve the best score.
+
+    :param start(dict): the initial parameters. Default=None (the middle of every range)
+    '''
+    start = start or {}
+    objective([{dim.name: start.get(dim.name, dim.value((dim.low + dim.high)/2)) for dim in space}])
+    for _ in range(max_rounds):
+        before = objective.best()[1]
+        for dim in space:
+            fixed = {k: v for k, v in objective.best()[0].items() if k != dim.name}
+            golden_section(objective, dim, fixed, max_iterations=max_iterations)
+        if objective.best()[1] <= before:
+            break
+
+
+def sample_points(space, n_samples, seed=0, latin=False):
+    '''
+    n_samples parameter dicts sampled uniformly, or with Latin hypercube sampling (every
+    dimension split in n_samples strata with one sample each)
+    '''
+    rng = np.random.default_rng(seed)
+    if latin:
+        units = (rng.permuted(np.tile(np.arange(n_samples), (len(space), 1)), axis=1).T
+                 + rng.random((n_samples, len(space))))/n_samples
+    else:
+        units = rng.random((n_samples, len(space)))
+    return [{dim.name: dim.value(dim.sample(u)) for dim, u in zip(space, row)} for row in units]
+
+
+def sampled_search(objective, space, n_samples=32, seed=0, latin=False, batch_size=8):
+    '''Random or Latin hypercube search, evaluated in batches so early stopping can cut it short'''
+    points = sample_points(space, n_samples, seed, latin)
+    for i in range(0, len(points), batch_size):
+        objective(points[i:i+batch_size])
+
+
+def successive_halving(objective, space, n_candidates=27, eta=3, min_fidelity=1/9, seed=0, latin=True):
+    '''
+    Successive halving: the sampled candidates are scored on the last min_fidelity of the history,
+    the best 1/eta of them are kept and scored on eta times more, and so on up to the full
+    history. Cheap short backtests weed out the bad candidates first.
+    '''
+    candidates = list({tuple(sorted(p.items())): p
+                       for p in sample_points(space, n_candidates, seed, latin)}.values())
+    fidelity = min_fidelity
+    while True:
+        fidelity = min(fidelity, 1.)
+        scores = objective(candidates, fidelity)
+        if fidelity >= 1 or len(candidates) == 1:
+            break
+        order = np.argsort(scores, kind='stable')[::-1]
+        candidates = [candidates[i] for i in order[:max(len(candidates)//eta, 1)]]
+        fidelity *= eta
+    if fidelity < 1:
+        objective(candidates)
+
+
+def optimize(objective, space, method='coordinate', **method_kwargs):
+    '''
+    Runs a search over the space.
+
+    :param objective(Objective): the memoized objective
+    :param space(dict): {name: (low, high) or list of choices}, or a list of Dimension
+    :param method(str): 'golden' (single parameter), 'coordinate', 'halving', 'random' or 'lhs'
+    :param method_kwargs: the search's own arguments (max_iterations, n_samples, eta, seed...)
+    :return: dict with the best 'params', their 'score', the 'evaluations' made and why the search
+    'stopped' early ('budget', 'patience' or None)
+    '''
+    space = search_space(space)
+    if method not in METHODS:
+        raise ValueError(f'Unknown search method {method}. Expected one of {METHODS}')
+    if method == 'golden' and len(space) != 1:
+        raise ValueError('The golden-section search takes a single parameter: use coordinate')
+
+    stopped = None
+    try:
+        if method == 'golden':
+            golden_section(objective, space[0], method_kwargs.pop('fixed', None), **method_kwargs)
+        elif method == 'coordinate':
+            coordinate_descent(objective, space, **method_kwargs)
+        elif method == 'halving':
+            successive_halving(objective, space, **method_kwargs)
+        else:
+            sampled_search(objective, space, latin=method == 'lhs', **method_kwargs)
+    except StopSearch as reason:
+        stopped = str(reason)
+
+    params, score = objective.best()
+    return {'params': params, 'score': score, 'evaluations': objective.evaluations, 'stopped': stopped}
@@ -0,0 +1,137 @@
+'''
+Backtests one strategy over many symbols at once. Each symbol is kept on its own trading calendar
+and the histories are left-aligned into (bars x symbols) arrays: row i holds the i-th bar of every
+symbol, and the rows past the end of a shorter history are padding. That way the indicator warmups
+and the backtest start rows line up across symbols, so the indicators, conditions and the
+_get_performance() logic run once over the whole panel. The results are mapped back to each
+symbol's dates afterwards.
+
+Usage:
+    panel = PanelBacktest.from_source(macd_strategy.Macd_Strategy, ['AAPL', 'MSFT'], buffer=2)
+    per_symbol = panel.run()
+    totals = panel.aggregate()
+'''
+import numpy as np
+import pandas as pd
+from investing_companion import strategy
+from investing_companion.strategy import parallel
+from investing_companion.data import yahoo_source
+from investing_companion.indicators import price_points
+
+
+class PanelBacktest():
+    '''
+    Methods:
+    :from_source() [class]
+    :prices()
+    :run()
+    :returns_frame()
+    :portfolio_returns()
+    :aggregate()
+    '''
+    def __init__(self, strategy_cls, frames, **strategy_kwargs):
+        '''
+        Class constructor.
+
+        :param strategy_cls: the strategy class. It has to implement panel_conditions()
+        :param frames(dict): symbol -> OHLCV frame, raw or already prepared (see BaseStrategy.prepare_frame())
+        :param strategy_kwargs: the strategy's constructor arguments (indicator objects, buffer, method...)
+        '''
+        self.strategy_cls = strategy_cls
+        self.strategy_kwargs = strategy_kwargs
+        self.symbols = list(frames)
+        self.frames = []
+        for frame in frames.values():
+            if 'daily_returns' not in frame.columns:
+                frame = frame.copy()
+                strategy.BaseStrategy.prepare_frame(frame)
+            self.frames.append(frame)
+        self.lengths = np.array([len(frame) for frame in self.frames], dtype='int64')
+        self.n_bars = int(self.lengths.max()) if len(self.frames) else 0
+        self.valid = np.arange(self.n_bars)[:, None] < self.lengths[None, :]
+        self._prices = {}
+        self.results = None
+
+    @classmethod
+    def from_source(cls, strategy_cls, symbols, data_source=None, period='max', start=None, end=None,
+                    executor='thread', max_workers=None, **strategy_kwargs):
+        '''
+        Alternate constructor: retrieves the history of every symbol (concurrently by default).
+
+        :param symbols(list): the ticker symbols
+        :param data_source(DataSourceBase): where the data is retrieved from. Default=None (Yahoo Finance)
+        :param period, start, end: same as in BaseStrategy
+        :param executor: how the histories are retrieved (see parallel.executor_scope()). Default='thread'
+        :param max_workers(int): worker count for the pool. Default=None
+        '''
+        data_source = yahoo_source.YahooSource() if data_source is None else data_source
+
+        def retrieve(symbol):
+            if start is not None and end is not None:
+                return data_source.history(symbol, start=start, end=end)
+            return data_source.history(symbol, period=period)
+
+        with parallel.executor_scope(executor, max_workers) as pool:
+            frames = dict(zip(symbols, pool.map(retrieve, symbols)))
+        return cls(strategy_cls, frames, **strategy_kwargs)
+
+    def prices(self, column):
+        '''
+        Left-aligned (bars x symbols) DataFrame of one column of the histories, NaN past the
+        end of the shorter ones. Built once per column.
+        '''
+        if column not in self._prices:
+            values = np.full((self.n_bars, len(self.frames)), np.nan)
+            for j, frame in enumerate(self.frames):
+                values[:len(frame), j] = price_points.get(frame, column).to_numpy(dtype='float64')
+            self._prices[column] = pd.DataFrame(values, columns=self.symbols)
+        return self._prices[column]
+
+    def run(self):
+        '''
+        Runs the backtest over every symbol at once.
+
+        :return: DataFrame indexed by symbol with the daily_returns and strat_returns sums
+        (the values backtest_strategy() returns for each symbol) and the number of bars
+        '''
+        buy, sell, start = self.strategy_cls.panel_conditions(self.prices, **self.strategy_kwargs)
+        signal = np.where(self.valid, np.select([buy, sell], [1, -1], 0), 0)
+
+        returns = self.prices('daily_returns').to_numpy()
+        position = strategy.BaseStrategy.shift_rows(strategy.BaseStrategy.ffill_nonzero(signal), 1,
+                                                    fill_value=0)
+        in_range = self.valid & (np.arange(self.n_bars)[:, None] >= start)
+        self.signal = signal
+        self.start = start
+        self.daily_returns = np.where(in_range, returns, np.nan)
+        self.strat_returns = np.where(in_range, position*returns, np.nan)
+
+        self.results = pd.DataFrame({'daily_returns': np.nansum(self.daily_returns, axis=0),
+                                     'strat_returns': np.nansum(self.strat_returns, axis=0),
+                                     'bars': self.lengths},
+                                    index=pd.Index(self.symbols, name='symbol'))
+        return self.results
+
+    def returns_frame(self, which='strat_returns'):
+        '''
+        The per-bar returns mapped back to the dates, as a (dates x symbols) DataFrame over the
+        union of the calendars. NaN where a symbol didn't trade or before the backtest start.
+
+        :param which(str): 'strat_returns' or 'daily_returns'. Default='strat_returns'
+        '''
+        if self.results is None:
+            self.run()
+        values = getattr(self, which)
+        return pd.concat({symbol: pd.Series(values[:len(frame), j], index=frame.index)
+                          for j, (symbol, frame) in enumerate(zip(self.symbols, self.frames))}, axis=1)
+
+    def portfolio_returns(self):
+        '''Per-date returns of an equal-weight portfolio of the symbols trading that date'''
+        return pd.DataFrame({which: self.returns_frame(which).mean(axis=1)
+                             for which in ('daily_returns', 'strat_returns')})
+
+    def aggregate(self):
+        '''Equal-weight average of the per-symbol daily_returns and strat_returns'''
+        if self.results is None:
+            self.run()
+        return self.results[['daily_returns', 'strat_returns']].mean()
@@ -0,0 +1,92 @@
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from investing_companion import instrumentation
+
+EXECUTORS = ('serial', 'thread', 'process')
+
+
+class SerialExecutor(Executor):
+    '''
+    Executor that runs every task right away in the calling thread. Lets the optimizers
+    go through the same code path whether they run on one core or on a pool.
+    '''
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+@contextmanager
+def executor_scope(executor='serial', max_workers=None):
+    '''
+    Yields an Executor for the given option. Pools created here are shut down on exit;
+    an Executor instance passed in is reused as is and left running for its owner.
+
+    :param executor: 'serial', 'thread', 'process' or a concurrent.futures.Executor instance
+    :param max_workers(int): worker count for the pools. Default=None (one per core)
+    '''
+    if isinstance(executor, Executor):
+        yield executor
+        return
+
+    if executor == 'serial':
+        pool = SerialExecutor()
+    elif executor == 'thread':
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+    elif executor == 'process':
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f'Unknown executor {executor}. Expected one of {EXECUTORS} or an Executor')
+
+    with pool:
+        yield pool
+
+
+def evaluate_strategy(task):
+    '''
+    Builds a strategy and returns its backtested strat_returns.
+    Module level so it can be sent to a process pool.
+
+    :param task(tuple): (strategy class, dict with the constructor keyword arguments)
+    '''
+    strategy_cls, kwargs = task
+    return strategy_cls(**kwargs).backtest_strategy()['strat_returns']
+
+
+def evaluate_strategies(pool, tasks):
+    '''
+    Runs evaluate_strategy() over the tasks on the pool, counting them as optimizer evaluations
+    (see investing_companion.instrumentation)
+
+    :return: list with the strat_returns of each task
+    '''
+    instrumentation.count('optimizer_evaluations', len(tasks))
+    return list(pool.map(evaluate_strategy, tasks))
+
+
+def _optimize_symbol(task):
+    strategy_cls, symbol, strategy_kwargs, optimize_kwargs = task
+    return strategy_cls(symbol, **strategy_kwargs).optimize_strat_params(**optimize_kwargs)
+
+
+def optimize_symbols(strategy_cls, symbols, optimize_kwargs, executor='process', max_workers=None,
+                     **strategy_kwargs):
+    '''
+    Runs optimize_strat_params() for many symbols, spreading the symbols over a pool.
+    Each symbol is optimized serially inside its worker, so there's no nesting of pools.
+
+    :param strategy_cls: the strategy class (Macd_Strategy, RSI_Strategy...)
+    :param symbols(list[str]): the symbols to optimize
+    :param optimize_kwargs(dict): keyword arguments for optimize_strat_params()
+    :param executor: 'serial', 'thread', 'process' or an Executor instance. Default='process'
+    :param max_workers(int): worker count for the pool. Default=None (one per core)
+    :param strategy_kwargs: keyword arguments for the strategy constructor (method, buffer, data_source...)
+    :return: dict symbol -> optimization results, in the order of symbols
+    '''
+    tasks = [(strategy_cls, symbol, strategy_kwargs, optimize_kwargs) for symbol in symbols]
+    with executor_scope(executor, max_workers) as pool:
+        results = list(pool.map(_optimize_symbol, tasks))
+    return dict(zip(symbols, results))
@@ -1,5 +1,7 @@
-from investing_companion.indicators import rsi
+from investing_companion.indicators import rsi, timeframes
 from investing_companion import strategy
+from investing_companion.strategy import live
+from investing_companion.strategy import parallel
 import pandas as pd
 import numpy as np
 from enum import Enum, auto
@@ -10,10 +12,16 @@ class RSI_Strategy(strategy.BaseStrategy):
 
     :Methods:
     create_conditions()
+    conditions_from_arrays() [class]
     backtest_strategy()
-    _find_optimum()
+    panel_conditions() [class]
+    to_live()
+    sweep_strat_params()
+    tunable_params()
+    _strategy_kwargs()
     optimize_strat_params()
     create_trend_columns()
+    trend_from_arrays() [class]
     '''
     class Method(Enum):
         DEFAULT = auto()
@@ -26,7 +34,11 @@ class RSI_Strategy(strategy.BaseStrategy):
                  overbought_threshold=70, oversold_threshold=30,
                  uptrend_start=40, downtrend_start=60,
                  uptrend_support_high=50,
-                 downtrend_resist_low=50,):
+                 downtrend_resist_low=50,
+                 data_source=None,
+                 data=None,
+                 compact=False,
+                 float_dtype='float64'):
         """Class constructor
 
         Args:
@@ -52,8 +64,15 @@ class RSI_Strategy(strategy.BaseStrategy):
             downtrend_resist_low (int, optional): the lower value for the resistance
             band for a downtrend (the upper one is the start point. This value is expected
             to be lower than that). Defaults to 50.
+            data_source (DataSourceBase, optional): where the data is retrieved from. Defaults to None
+            (Yahoo Finance).
+            data (pd.DataFrame, optional): already loaded data to use instead of retrieving it
+            (see BaseStrategy.from_data()). Defaults to None.
+            compact (bool, optional): keep only the columns the strategy needs and store the signals
+            and positions as int8 (see BaseStrategy). Defaults to False.
+            float_dtype (str, optional): dtype of the float columns in compact mode. Defaults to 'float64'.
         """        
-        super().__init__(symbol, start, end, period)
+        super().__init__(symbol, start, end, period, data_source, data, compact, float_dtype)
         self.rel_str = rsi_obj
         self.buffer = buffer
         self.method = method
@@ -63,7 +82,7 @@ class RSI_Strategy(strategy.BaseStrategy):
         self.downtrend_start = downtrend_start
         self.uptrend_support_high = uptrend_support_high
         self.downtrend_resist_low = downtrend_resist_low
-        self.data = pd.concat([self.data, self.rel_str.build_df(self.data)], axis=1)
+        self.add_indicators(self.rel_str)
         self.create_conditions()
 
 
@@ -75,59 +94,82 @@ class RSI_Strategy(strategy.BaseStrategy):
         Returns:
             Pandas Series
         """        
-        df = pd.DataFame()
-        uptrend = self.data[self.rel_str.rsi_name] >= self.uptrend_start
-        downtrend = self.data[self.rel_str.rsi_name] <= self.downtrend_start
-        df['zone'] = np.select([uptrend&downtrend, uptrend, downtrend],[0,1,-1], 0)
-        df['trend'] = df['zone'].replace(to_replace=0, method='ffill')
+        trend = self.trend_from_arrays(self.data[self.rel_str.rsi_name].to_numpy(),
+                                       self.uptrend_start, self.downtrend_start)
+        return pd.Series(trend, index=self.data.index, name='trend')
 
-        return df['trend']
+
+    @classmethod
+    def trend_from_arrays(cls, rsi_values, uptrend_start, downtrend_start):
+        """Array counterpart of create_trend_columns(). rsi_values can be (bars x columns), in which
+        case the thresholds can hold one value per column.
+        """
+        uptrend = rsi_values >= uptrend_start
+        downtrend = rsi_values <= downtrend_start
+        zone = np.select([uptrend&downtrend, uptrend, downtrend],[0,1,-1], 0)
+        return cls.ffill_nonzero(zone)
 
 
     def create_conditions(self):
-        if self.method == self.Method.DEFAULT:
-            #Buy when rsi reaches the oversold threshold and remains oversold for self.buffer periods
-            #Sell when the rsi reaches the overbought threshold and remains overbought for self.buffer periods
-            buy_sig = (self.data[self.rel_str.rsi_name] < self.oversold_threshold)\
-                      .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
+        if self.method == self.Method.TREND_RANGES or self.method == self.Method.TREND_RANGES_SAFE:
+            trend = self.create_trend_columns()
+            self.data['trend'] = trend.astype('int8') if self.compact else trend
 
-            cross_buy_sig = (self.data[self.rel_str.rsi_name].shift(self.buffer) >= self.oversold_threshold)
+        buy, sell = self.conditions_from_arrays(self.method,
+                                                self.data[self.rel_str.rsi_name].to_numpy(),
+                                                buffer=self.buffer,
+                                                overbought_threshold=self.overbought_threshold,
+                                                oversold_threshold=self.oversold_threshold,
+                                                uptrend_start=self.uptrend_start,
+                                                downtrend_start=self.downtrend_start,
+                                                uptrend_support_high=self.uptrend_support_high)
+        self.buy_cond = pd.Series(buy, index=self.data.index)
+        self.sell_cond = pd.Series(sell, index=self.data.index)
 
-            sell_sig = (self.data[self.rel_str.rsi_name] > self.overbought_threshold)\
-                      .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool)
 
-            cross_sell_sig = (self.data[self.rel_str.rsi_name].shift(self.buffer) <= 
-                              self.overbought_threshold)
+    @classmethod
+    def conditions_from_arrays(cls, method, rsi_values, buffer=1,
+                               overbought_threshold=70, oversold_threshold=30,
+                               uptrend_start=40, downtrend_start=60,
+                               uptrend_support_high=50):
+        """Builds the buy and sell conditions from the RSI values. rsi_values can be 1-D or
+        (bars x columns), in which case buffer and the thresholds can also hold one value per column.
+        create_conditions() and sweep_strat_params() both go through here.
 
-        if self.method == self.Method.TREND_RANGES or self.method == self.Method.TREND_RANGES_SAFE:
-            #Buy when the RSI, being in an uptrend (as determined by the DataFrame returned by 
-            # create_trend_columns()) recognizes the resistance band defined by 
-            # [self.uptrend_start, self.uptrend_support_high]
-            #Sell when this resistance is broken (trend reversal)
-            self.data['trend'] = self.create_trend_columns()
+        Returns:
+            tuple: boolean arrays (buy condition, sell condition)
+        """
+        buffer = np.asarray(buffer)
+        shift = cls.shift_rows
 
-            buy_sig=(self.data[self.rel_str.rsi_name] > self.uptrend_support_high)\
-                    .rolling(self.buffer).apply(self.buffer_all).fillna(0).astype(bool) &\
-                    (self.data['trend'].eq(1))
+        if method == cls.Method.DEFAULT:
+            #Buy when rsi reaches the oversold threshold and remains oversold for buffer periods
+            #Sell when the rsi reaches the overbought threshold and remains overbought for buffer periods
+            buy_sig = cls.buffer_all(rsi_values < oversold_threshold, buffer)
+            cross_buy_sig = shift(rsi_values, buffer) >= oversold_threshold
 
-            cross_buy_sig = (self.data[self.rel_str.rsi_name].shift(self.buffer) <
-                             self.uptrend_support_high)
-            
-            sell_sig = (self.data['trend'].eq(-1)).rolling(self.buffer).apply(self.buffer_all).fillna(0)\
-                       .astype(bool)
-            
-            cross_sell_sig = (self.data['trend'].shift(self.buffer).eq(1))
+            sell_sig = cls.buffer_all(rsi_values > overbought_threshold, buffer)
+            cross_sell_sig = shift(rsi_values, buffer) <= overbought_threshold
 
-            if self.method == self.Method.TREND_RANGES:
-                #We also consider a buy signal if there is a trend reversal (self.data['trend']
-                # goes from -1 to 1)
-                buy_sig |= (self.data['trend'].eq(1)).rolling(self.buffer).apply(self.buffer_all).fillna(0)\
-                           .astype(bool)
+        if method == cls.Method.TREND_RANGES or method == cls.Method.TREND_RANGES_SAFE:
+            #Buy when the RSI, being in an uptrend (as determined by trend_from_arrays()) 
+            # recognizes the resistance band defined by [uptrend_start, uptrend_support_high]
+            #Sell when this resistance is broken (trend reversal)
+            trend = cls.trend_from_arrays(rsi_values, uptrend_start, downtrend_start)
+            shifted_trend = shift(trend, buffer)
+
+            buy_sig = cls.buffer_all(rsi_values > uptrend_support_high, buffer) & (trend == 1)
+            cross_buy_sig = shift(rsi_values, buffer) < uptrend_support_high
 
-                cross_buy_sig |= (self.data['trend'].shift(self.buffer)).eq(-1)
+            sell_sig = cls.buffer_all(trend == -1, buffer)
+            cross_sell_sig = shifted_trend == 1
 
-        self.buy_cond = buy_sig & cross_buy_sig
-        self.sell_cond = sell_sig & cross_sell_sig
+            if method == cls.Method.TREND_RANGES:
+                #We also consider a buy signal if there is a trend reversal (trend goes from -1 to 1)
+                buy_sig = buy_sig | cls.buffer_all(trend == 1, buffer)
+                cross_buy_sig = cross_buy_sig | (shifted_trend == -1)
+
+        return buy_sig & cross_buy_sig, sell_sig & cross_sell_sig
 
 
     def backtest_strategy(self):
@@ -136,79 +178,160 @@ class RSI_Strategy(strategy.BaseStrategy):
         return self._get_performance(start=start)
 
 
-    def _find_optimum(self,range_to_use,to_modify, max_iterations=5, **kwargs):
-        '''
-        Method to find the optimum value, used in optimize_strat_params(). Not meant to be 
-        called directly
-
-        :param range_to_use: the range_to_use [a,b] over which the optimization will take place. First, it calculates
-        the middle value c = (a+b)/2, then, given a function f, calculates f(a),f(b),f(c). The value whose
-        function output is the lowest is discarded and the process is repeated with the remaining numbers
-        :param to_modify: string which tells the method which variable is the one to be optimized
-        :param max_iterations: the max number of iterations before the loop ends
-        :**kwargs: used to feed custom data (such as variables that have already been optimized) to the 
-        method
-        '''
-        rsi_window = kwargs.get('rsi_window',self.rel_str.window_size)
-        buffer = kwargs.get('buffer', self.buffer)
-        round_numbers = kwargs.get('round_numbers', False)
-
-        xlow, xhigh = min(range_to_use), max(range_to_use)
-        for _ in trange(max_iterations):
-            xmid_start = (xlow+xhigh)/2
-            if round_numbers:
-                xmid = int(round(xmid_start))
-            else:
-                xmid = xmid_start
-            xlist = [xlow,xmid,xhigh]
-            xdict = {}
-            for x in xlist:
-                if to_modify == 'rsi_window':
-                    rsi_window = x
-                elif to_modify == 'buffer':
-                    buffer = x 
-                elif to_modify is None:
-                    return
-                
-                relstr = rsi.RelativeStrengthIndex(rsi_window)
-                strat = strategy.rsi_strategy.RSI_Strategy(self.symbol,
-                                                           start=self.start,
-                                                           end=self.end,
-                                                           period=self.period,
-                                                           rsi_obj=relstr,
-                                                           buffer=buffer,
-                                                           method=self.method,
-                                                           overbought_threshold=self.overbought_threshold,
-                                                           oversold_threshold=self.oversold_threshold,
-                                                           uptrend_start=self.uptrend_start,
-                                                           downtrend_start=self.downtrend_start,
-                                                           uptrend_support_high=self.uptrend_support_high,
-                                                           downtrend_resist_low=self.downtrend_resist_low)  
-                perf = strat.backtest_strategy()['strat_returns']
-                xdict[x] = perf
-
-            m = min(xdict.values())
-            if xdict[xmid] == m:
-                print('concavity found, breaking loop')
-                break
-            xdict = {key:value for key,value in xdict.items() if xdict[key] != m}
-            xhigh = max(xdict.keys())
-            xlow = min(xdict.keys())
-        
-        optimum_x = max(xdict, key=xdict.get)
-        return optimum_x
+    @classmethod
+    def panel_conditions(cls, prices, rsi_obj=rsi.RelativeStrengthIndex(), buffer=1, method=Method.DEFAULT,
+                         overbought_threshold=70, oversold_threshold=30,
+                         uptrend_start=40, downtrend_start=60,
+                         uptrend_support_high=50, **kwargs):
+        """Builds the conditions of many symbols at once, one per column (see strategy.panel).
+
+        Args:
+            prices (callable): takes a price point name, returns a (bars x symbols) DataFrame
+            The indicator, buffer, method and threshold arguments are the constructor's. Other
+            constructor arguments are accepted and ignored.
+
+        Returns:
+            tuple: (buy condition, sell condition, first row evaluated by backtest_strategy())
+        """
+        rsi_values = rsi_obj.build_columns(prices(rsi_obj.price_point))[rsi_obj.rsi_name].to_numpy()
+        buy, sell = cls.conditions_from_arrays(method, rsi_values,
+                                               buffer=buffer,
+                                               overbought_threshold=overbought_threshold,
+                                               oversold_threshold=oversold_threshold,
+                                               uptrend_start=uptrend_start,
+                                               downtrend_start=downtrend_start,
+                                               uptrend_support_high=uptrend_support_high)
+        return buy, sell, rsi_obj.window_size
+
+
+    def to_live(self):
+        """Builds the live counterpart of the strategy: an evaluator that picks up where the
+        history ends and returns the signal (1 buy, -1 sell, 0 hold) of every new bar passed
+        to its on_bar() in constant time.
+
+        Returns:
+            live.LiveRSI
+        """
+        self._base_timeframe_only('to_live', self.rel_str, hint='extend() the strategy with the new bars instead')
+        return live.LiveRSI(self)
+
+
+    def sweep_strat_params(self,
+                           window_sizes=None,
+                           buffers=None,
+                           oversold_thresholds=None,
+                           overbought_thresholds=None,
+                           uptrend_starts=None,
+                           downtrend_starts=None,
+                           uptrend_support_highs=None,
+                           chunk_size=256):
+        """Evaluates every combination of the given parameters at once. The RSI of each window is
+        computed a single time, and the conditions, positions and returns of all the combinations
+        are computed together as (bars x combinations) arrays. Parameters left as None keep the 
+        value the strategy was built with.
+
+        Args:
+            window_sizes (list[int], optional): RSI windows to try.
+            buffers (list[int], optional): buffers to try.
+            oversold_thresholds (list[float], optional): used by Method.DEFAULT.
+            overbought_thresholds (list[float], optional): used by Method.DEFAULT.
+            uptrend_starts (list[float], optional): used by the TREND_RANGES methods.
+            downtrend_starts (list[float], optional): used by the TREND_RANGES methods.
+            uptrend_support_highs (list[float], optional): used by the TREND_RANGES methods.
+            chunk_size (int, optional): combinations evaluated per batch. Defaults to 256.
+
+        Returns:
+            pd.DataFrame: one row per combination with the parameters, daily_returns and 
+            strat_returns (the same values backtest_strategy() returns for that combination)
+        """
+        self._base_timeframe_only('sweep_strat_params', self.rel_str)
+        grid = self.param_grid(window_size=window_sizes or [self.rel_str.window_size],
+                               buffer=buffers or [self.buffer],
+                               oversold_threshold=oversold_thresholds or [self.oversold_threshold],
+                               overbought_threshold=overbought_thresholds or [self.overbought_threshold],
+                               uptrend_start=uptrend_starts or [self.uptrend_start],
+                               downtrend_start=downtrend_starts or [self.downtrend_start],
+                               uptrend_support_high=uptrend_support_highs or [self.uptrend_support_high])
+
+        rsis = {}
+        for window in set(grid['window_size']):
+            relstr = rsi.RelativeStrengthIndex(window, price_point=self.rel_str.price_point)
+            rsis[window] = relstr.build_df(self.data)[relstr.rsi_name].to_numpy()
+
+        def signal_matrix(chunk):
+            values = {name: chunk[name].to_numpy() for name in chunk.columns}
+            buy, sell = self.conditions_from_arrays(self.method,
+                                                    np.column_stack([rsis[w] for w in values['window_size']]),
+                                                    buffer=values['buffer'],
+                                                    overbought_threshold=values['overbought_threshold'],
+                                                    oversold_threshold=values['oversold_threshold'],
+                                                    uptrend_start=values['uptrend_start'],
+                                                    downtrend_start=values['downtrend_start'],
+                                                    uptrend_support_high=values['uptrend_support_high'])
+            return self.get_signal_column(buy, sell)
+
+        def start(chunk):
+            return chunk['window_size'].to_numpy()
+
+        return self._sweep(grid, signal_matrix, start, chunk_size=chunk_size)
+
+
+    def tunable_params(self):
+        """The parameters tune() and optimize_strat_params() search: rsi_window and buffer"""
+        return {'rsi_window': self.rel_str.window_size, 'buffer': self.buffer}
+
+
+    def _strategy_kwargs(self, **params):
+        params = {**self.tunable_params(), **params}
+        return dict(self._common_kwargs(),
+                    rsi_obj=timeframes.same_timeframe(self.rel_str, rsi.RelativeStrengthIndex(
+                        params['rsi_window'], price_point=self.rel_str.price_point)),
+                    buffer=params['buffer'],
+                    method=self.method,
+                    overbought_threshold=self.overbought_threshold,
+                    oversold_threshold=self.oversold_threshold,
+                    uptrend_start=self.uptrend_start,
+                    downtrend_start=self.downtrend_start,
+                    uptrend_support_high=self.uptrend_support_high,
+                    downtrend_resist_low=self.downtrend_resist_low)
 
 
     def optimize_strat_params(self,
                               rsi_range,
                               buffer_range=None,
-                              max_iterations=5):
-        results = {}
+                              max_iterations=5,
+                              executor='serial',
+                              max_workers=None,
+                              budget=None,
+                              patience=None):
+        """Optimizes the parameters of the strategy in sequence (window->buffer), with a 
+        golden-section search per parameter over a shared memoized objective (see strategy.optimizer)
 
-        results['Window'] = self._find_optimum(rsi_range, 'rsi_window', round_numbers=True)
-        if buffer_range is not None:
-            results['buffer'] = self._find_optimum(buffer_range, 
-                                                   'buffer', 
-                                                   rsi_window=results['Window'],
-                                                   round_numbers=False)
-        return results
\ No newline at end of file
+        Args:
+            rsi_range (list[int]): the range to be used in the RSI window optimization
+            buffer_range (list[int], optional): range for the buffer. Defaults to None.
+            max_iterations (int, optional): max number of golden-section iterations. Defaults to 5.
+            executor (optional): how the candidates of each iteration are evaluated: 'serial', 'thread',
+            'process' or an Executor instance. The results don't depend on it. Defaults to 'serial'.
+            max_workers (int, optional): worker count for the pools. Defaults to None (one per core).
+            budget (int, optional): the most backtests to run over all the parameters. Defaults to None.
+            patience (int, optional): stop after this many backtests without improvement. Defaults to None.
+
+        Returns:
+            dictionary: a dictionary with the values of all the optimized values
+        """
+        results = {}
+        with parallel.executor_scope(executor, max_workers) as pool:
+            objective = self.objective(pool, budget, patience)
+            results['Window'] = self._find_optimum(rsi_range, 'rsi_window',
+                                                   max_iterations=max_iterations,
+                                                   round_numbers=True,
+                                                   objective=objective)
+            if buffer_range is not None:
+                results['buffer'] = self._find_optimum(buffer_range, 
+                                                       'buffer', 
+                                                       rsi_window=results['Window'],
+                                                       max_iterations=max_iterations,
+                                                       round_numbers=True,
+                                                       objective=objective)
+        return results
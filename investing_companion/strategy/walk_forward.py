@@ -0,0 +1,213 @@
+'''
+Walk-forward (rolling origin) validation of the strategies. The history is split in folds of a
+train window followed by a test window; the parameters are optimized on each train window
+(see strategy.optimizer) and then backtested, unchanged, on the test window that follows it.
+The report gives the in-sample and out-of-sample returns of every fold, and summary() aggregates
+the out-of-sample ones.
+
+Each parameter set is backtested a single time over the full history: its indicators are built
+once, and the returns of every fold (train or test) are slices of its per-bar strategy returns.
+The indicators only look back, so a fold's slice is what a backtest starting earlier and
+stopping at the end of the fold would give, with the warm-up taken from the bars before it.
+
+Usage:
+    strat = rsi_strategy.RSI_Strategy('AAPL')
+    wf = walk_forward.WalkForward(strat, {'rsi_window': (5, 40), 'buffer': (1, 3)},
+                                  train_size=750, test_size=250).run(executor='thread')
+    wf.report
+    wf.summary()
+'''
+from collections import namedtuple
+from investing_companion import instrumentation
+from investing_companion.strategy import optimizer, parallel
+import threading
+import numpy as np
+import pandas as pd
+
+Fold = namedtuple('Fold', ['train', 'test'])
+
+
+def make_folds(n_bars, train_size, test_size, step=None, anchored=False, gap=0):
+    '''
+    Train/test folds over n_bars, as slices of row positions.
+
+    :param train_size(int): bars in each train window (the first one's, if anchored)
+    :param test_size(int): bars in each test window
+    :param step(int): bars between the starts of consecutive folds. Default=None (test_size, so the
+    test windows follow each other without overlapping)
+    :param anchored(bool): the train windows all start at the first bar and grow. Default=False (rolling)
+    :param gap(int): bars left out between each train window and its test window. Default=0
+    :return: list of Fold(train, test)
+    '''
+    step = test_size if step is None else step
+    if min(train_size, test_size, step) < 1 or gap < 0:
+        raise ValueError('train_size, test_size and step must be positive and gap not negative')
+
+    folds = []
+    train_end = train_size
+    while train_end + gap + test_size <= n_bars:
+        train_start = 0 if anchored else train_end - train_size
+        test_start = train_end + gap
+        folds.append(Fold(slice(train_start, train_end), slice(test_start, test_start + test_size)))
+        train_end += step
+    if not folds:
+        raise ValueError(f'{n_bars} bars are not enough for a {train_size} bar train and {test_size} bar test window')
+    return folds
+
+
+def bar_returns(task):
+    '''
+    Builds a strategy, backtests it and returns its per-bar strategy returns (float64).
+    Module level so it can be sent to a process pool.
+
+    :param task(tuple): (strategy class, dict with the constructor keyword arguments)
+    '''
+    strategy_cls, kwargs = task
+    strat = strategy_cls(**kwargs)
+    strat.backtest_strategy()
+    returns = strat.data['position'].to_numpy(dtype='float64')*strat.data['daily_returns'].to_numpy(dtype='float64')
+    return np.nan_to_num(returns)
+
+
+class WalkForward():
+    '''
+    Walk-forward optimization of a strategy.
+
+    Methods:
+    :bar_returns()
+    :optimize_fold()
+    :run()
+    :oos_returns()
+    :summary()
+    '''
+    def __init__(self, strategy, space, train_size, test_size, step=None, anchored=False, gap=0,
+                 method='coordinate', budget=None, patience=None, **method_kwargs):
+        '''
+        Class constructor.
+        :param strategy(BaseStrategy): the strategy to validate. Its history is the one split in
+        folds, and the parameters not in space keep its values
+        :param space(dict): the parameters optimized on each fold (see BaseStrategy.tune())
+        :param train_size, test_size, step, anchored, gap: the folds (see make_folds())
+        :param method(str): the search method (see strategy.optimizer). Default='coordinate'
+        :param budget(int): the most evaluations per fold, at least 1. Default=None (no limit)
+        :param patience(int): stop a fold's search after this many evaluations without improvement.
+        Default=None (never)
+        :param method_kwargs: the search's own arguments
+        '''
+        if budget is not None and budget < 1:
+            raise ValueError('Every fold needs a budget of at least one evaluation')
+        self.strategy = strategy
+        self.space = space
+        self.folds = make_folds(len(strategy.base_data), train_size, test_size, step, anchored, gap)
+        self.method = method
+        self.budget = budget
+        self.patience = patience
+        self.method_kwargs = method_kwargs
+        #Parameter key -> per-bar returns over the full history, shared by all the folds
+        self._returns = {}
+        #One lock per parameter key, so the folds of a thread pool don't backtest a set twice
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.report = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_locks'], state['_locks_guard']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def bar_returns(self, params):
+        '''Per-bar strategy returns of the parameters over the full history, computed once per parameter set'''
+        key = tuple(sorted(params.items()))
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._returns:
+                instrumentation.count('optimizer_evaluations')
+                self._returns[key] = bar_returns((type(self.strategy), self.strategy._strategy_kwargs(**params)))
+        return self._returns[key]
+
+    def optimize_fold(self, fold):
+        '''
+        Optimizes the parameters on the fold's train window and backtests them on its test window.
+
+        :param fold(Fold): the fold
+        :return: dict with the dates of the windows, the parameters, the in_sample and out_of_sample
+        strategy returns, the buy-and-hold returns (bnh) of the test window and the evaluations made
+        '''
+        def evaluate(points, fidelity):
+            train = fold.train
+            if fidelity < 1:
+                length = train.stop - train.start
+                train = slice(train.stop - max(int(round(length*fidelity)), 1), train.stop)
+            return [self.bar_returns(params)[train].sum() for params in points]
+
+        method_kwargs = dict(self.method_kwargs)
+        if self.method == 'coordinate':
+            current = self.strategy.tunable_params()
+            method_kwargs.setdefault('start', {name: current[name] for name in self.space if name in current} or None)
+        objective = optimizer.Objective(evaluate, self.budget, self.patience)
+        result = optimizer.optimize(objective, self.space, self.method, **method_kwargs)
+
+        index = self.strategy.base_data.index
+        daily_returns = self.strategy.base_data['daily_returns'].to_numpy(dtype='float64')
+        return {'train_start': index[fold.train.start], 'train_end': index[fold.train.stop - 1],
+                'test_start': index[fold.test.start], 'test_end': index[fold.test.stop - 1],
+                **result['params'],
+                'in_sample': result['score'],
+                'out_of_sample': self.bar_returns(result['params'])[fold.test].sum(),
+                'bnh': daily_returns[fold.test].sum(),
+                'evaluations': result['evaluations']}
+
+    def run(self, executor='serial', max_workers=None):
+        '''
+        Optimizes the folds, spread over a pool. On 'serial' and 'thread' executors the folds
+        share the per-bar returns of the parameter sets they have in common; a process pool
+        shares them within each fold only.
+
+        :param executor: 'serial', 'thread', 'process' or an Executor instance. Default='serial'
+        :param max_workers(int): worker count for the pools. Default=None (one per core)
+        :return: self, with the report DataFrame (one row per fold) in self.report
+        '''
+        with parallel.executor_scope(executor, max_workers) as pool:
+            rows = list(pool.map(self.optimize_fold, self.folds))
+        self.report = pd.DataFrame(rows)
+        return self
+
+    def oos_returns(self):
+        '''Per-bar out-of-sample returns of the test windows (each with its fold's parameters), stitched together'''
+        index = self.strategy.base_data.index
+        pieces = []
+        for fold, (_, row) in zip(self.folds, self.report.iterrows()):
+            params = {name: row[name] for name in self.space}
+            pieces.append(pd.Series(self.bar_returns(params)[fold.test], index=index[fold.test]))
+        returns = pd.concat(pieces)
+        #Overlapping test windows (step < test_size) keep the latest fold's returns
+        return returns[~returns.index.duplicated(keep='last')]
+
+    def summary(self):
+        '''
+        Aggregates the out-of-sample results of run().
+
+        :return: dict with the folds, the summed out_of_sample and bnh returns, the mean in_sample
+        and out_of_sample returns per bar, their ratio (efficiency: near 1 means the in-sample
+        returns carry over, near 0 or negative that they were overfitted), the share of folds with
+        positive out-of-sample returns and the total evaluations
+        '''
+        report = self.report
+        train_bars = np.array([fold.train.stop - fold.train.start for fold in self.folds])
+        test_bars = np.array([fold.test.stop - fold.test.start for fold in self.folds])
+        in_sample = (report['in_sample']/train_bars).mean()
+        out_of_sample = (report['out_of_sample']/test_bars).mean()
+        return {'folds': len(report),
+                'out_of_sample': report['out_of_sample'].sum(),
+                'bnh': report['bnh'].sum(),
+                'in_sample_per_bar': in_sample,
+                'out_of_sample_per_bar': out_of_sample,
+                'efficiency': out_of_sample/in_sample if in_sample else np.nan,
+                'positive_folds': (report['out_of_sample'] > 0).mean(),
+                'evaluations': report['evaluations'].sum()}
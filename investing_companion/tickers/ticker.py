@@ -1,40 +1,38 @@
 import yfinance as yf
-import pandas as pd
+from investing_companion.indicators import price_points
 
 class TickerAdditionalPricepoints(yf.Ticker):
     """
-    Child class of the yf.Ticker class. Extends its history() method to include
-    additional pricepoints that are commonly used (HL2, HLC3, HLCC4, OHLC 4)
+    Child class of the yf.Ticker class. Extends its history() method with the additional
+    pricepoints that are commonly used (HL2, HLC3, HLCC4, OHLC 4) and any custom one registered
+    in indicators.price_points. They are derived lazily: an indicator whose price_point is one of
+    them computes it from the frame on first use, so they are only added as columns on request.
 
     Methods:
     history()
     """
-    def __init__(self, ticker, session=None):
+    def __init__(self, ticker, session=None, data_source=None):
+        """
+        :param data_source(DataSourceBase): where history() gets the OHLCV data from instead of
+        Yahoo Finance (see investing_companion.data). Default=None
+        """
         super().__init__(ticker, session)
+        self.data_source = data_source
 
     
-    def history(self, *args, **kwargs):
-        """
-        Returns a Pandas dataframe with additional pricepoints, calculated from the 
-        more commonly used Open, High, Low, and Close. Extends yf.Ticker.history()
+    def history(self, *args, derived=None, **kwargs):
         """
-        df = super().history(*args, **kwargs)
-        
-        price_open = df['Open']
-        price_close = df['Close']
-        price_high = df['High']
-        price_low = df['Low']
+        Returns the Pandas dataframe of yf.Ticker.history() (or of the data source). The derived
+        pricepoints are available to the indicators without being stored in it.
 
-        HL2 = (price_high+price_low)/2
-        HLC3 = (price_high+price_low+price_close)/3
-        HLCC4 = (price_high+price_low+price_close*2)/4
-        OHLC4 = (price_high+price_low+price_close+price_open)/4
-
-        df = pd.concat([df,
-                        HL2.rename('HL2'),
-                        HLC3.rename('HLC3'),
-                        HLCC4.rename('HLCC4'),
-                        OHLC4.rename('OHLC4')],
-        axis=1)
+        :param derived: the derived pricepoints to add as columns: a list of names, or True for
+        every registered one. Default=None (none)
+        """
+        if self.data_source is not None:
+            df = self.data_source.history(self.ticker, *args, **kwargs)
+        else:
+            df = super().history(*args, **kwargs)
 
+        if derived:
+            price_points.add_columns(df, None if derived is True else derived)
         return df
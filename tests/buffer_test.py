@@ -0,0 +1,38 @@
+from investing_companion.strategy import BaseStrategy
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def random_cond(n=500, p=0.7, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.random(n) < p, index=pd.date_range('2020-01-01', periods=n))
+
+
+@pytest.mark.parametrize('buffer', [1, 2, 3, 7, 20])
+def test_buffer_all_matches_rolling_apply(buffer):
+    cond = random_cond()
+    expected = cond.rolling(buffer).apply(lambda i: i.all()).fillna(0).astype(bool)
+    pd.testing.assert_series_equal(BaseStrategy.buffer_all(cond, buffer), expected)
+
+
+@pytest.mark.parametrize('buffer', [1, 2, 3, 7, 20])
+def test_buffer_any_matches_rolling_apply(buffer):
+    cond = random_cond(p=0.1)
+    expected = cond.rolling(buffer).apply(lambda i: i.any()).fillna(0).astype(bool)
+    pd.testing.assert_series_equal(BaseStrategy.buffer_any(cond, buffer), expected)
+
+
+def test_nan_counts_as_false():
+    cond = pd.Series([1.0, 1.0, np.nan, 1.0, 1.0])
+    assert BaseStrategy.buffer_all(cond, 2).tolist() == [False, True, False, False, True]
+
+
+def test_per_column_buffers_on_2d_arrays():
+    conds = np.column_stack([random_cond(seed=s).to_numpy() for s in range(4)])
+    buffers = np.array([1, 2, 5, 9])
+    held = BaseStrategy.buffer_all(conds, buffers)
+    seen = BaseStrategy.buffer_any(~conds, buffers)
+    for j, b in enumerate(buffers):
+        np.testing.assert_array_equal(held[:, j], BaseStrategy.buffer_all(conds[:, j], b))
+        np.testing.assert_array_equal(seen[:, j], BaseStrategy.buffer_any(~conds[:, j], b))
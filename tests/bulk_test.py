@@ -0,0 +1,105 @@
+from investing_companion import instrumentation
+from investing_companion.data import bulk
+from conftest import make_ohlcv
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import pandas as pd
+import pytest
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    '''Serves <symbol>.csv with keep-alive. RATE is limited and FLAKY fails, the first times only'''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        symbol = self.path.strip('/').removesuffix('.csv')
+        with server.lock:
+            server.hits[symbol] = server.hits.get(symbol, 0) + 1
+            server.ports.add(self.client_address[1])
+            hits = server.hits[symbol]
+
+        if symbol == 'RATE' and hits == 1:
+            self.respond(429, b'', {'Retry-After': '0'})
+        elif symbol == 'FLAKY' and hits <= 2:
+            self.respond(503, b'')
+        elif symbol == 'DOWN':
+            self.respond(503, b'')
+        elif symbol not in server.frames:
+            self.respond(404, b'')
+        else:
+            self.respond(200, server.frames[symbol].to_csv().encode())
+
+    def respond(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.frames = {symbol: make_ohlcv(300, seed=seed) for seed, symbol in
+                     enumerate(['AAA', 'BBB', 'CCC', 'DDD', 'RATE', 'FLAKY'])}
+    server.hits, server.ports, server.lock = {}, set(), threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def test_loads_concurrently_over_pooled_connections(server):
+    loader = bulk.BulkLoader(bulk.HttpCsvSource(url(server), pool_size=4), max_workers=4)
+    symbols = ['AAA', 'BBB', 'CCC', 'DDD']*3
+    for _ in range(3):
+        frames = loader.load(symbols)
+    assert list(frames) == ['AAA', 'BBB', 'CCC', 'DDD']
+    expected = server.frames['BBB']
+    pd.testing.assert_frame_equal(frames['BBB'], expected.set_axis(expected.index.tz_convert('UTC')),
+                                  check_freq=False, check_names=False)
+    #12 requests, but the connections are kept alive and reused
+    assert sum(server.hits.values()) == 12
+    assert len(server.ports) <= 4
+
+
+def test_retries_rate_limits_and_transient_failures(server):
+    waits = []
+    loader = bulk.BulkLoader(bulk.HttpCsvSource(url(server)), retries=3, backoff=0.1, sleep=waits.append)
+    with instrumentation.profile() as prof:
+        frames = loader.load(['RATE', 'FLAKY', 'AAA', 'MISSING', 'DOWN'])
+    assert list(frames) == ['RATE', 'FLAKY', 'AAA']
+    assert isinstance(loader.errors['MISSING'], KeyError)
+    assert isinstance(loader.errors['DOWN'], bulk.TransientError)
+    assert server.hits == {'RATE': 2, 'FLAKY': 3, 'AAA': 1, 'MISSING': 1, 'DOWN': 4}
+    assert prof.to_dict()['counters'] == {'bulk.requests': 11, 'bulk.retries': 6}
+    assert len(waits) == 6 and max(waits) <= 0.4
+
+    with pytest.raises(bulk.TransientError):
+        bulk.BulkLoader(bulk.HttpCsvSource(url(server)), retries=0).load(['DOWN'], raise_errors=True)
+
+
+def test_rate_limiter_and_panel(server):
+    clock = [0.]
+    def sleep(seconds):
+        clock[0] += seconds
+    limiter = bulk.RateLimiter(2, burst=2, clock=lambda: clock[0], sleep=sleep)
+    for _ in range(6):
+        limiter.acquire()
+    assert clock[0] == pytest.approx(2.)
+
+    closes = bulk.BulkLoader(bulk.HttpCsvSource(url(server)), rate_limit=1000)\
+        .panel(['AAA', 'CCC'], start='2015-03-02', end='2015-04-01')
+    assert list(closes.columns) == ['AAA', 'CCC']
+    assert len(closes) == 22
+    assert closes['CCC'].to_numpy() == pytest.approx(server.frames['CCC']['Close'].loc['2015-03-02':'2015-03-31'])
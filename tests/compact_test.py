@@ -0,0 +1,52 @@
+from investing_companion.indicators import moving_averages
+from investing_companion.strategy import macd_strategy, bollinger_strategy, rsi_strategy, ma_strategy
+from conftest import make_ohlcv
+import numpy as np
+import pandas as pd
+import pytest
+
+STRATEGIES = [
+    (macd_strategy.Macd_Strategy, dict(method=macd_strategy.Macd_Strategy.Method.MIXED_CROSSOVER, use_ppo=True)),
+    (bollinger_strategy.Bollinger_Strategy, dict(buffer=2)),
+    (rsi_strategy.RSI_Strategy, dict(method=rsi_strategy.RSI_Strategy.Method.TREND_RANGES)),
+    (ma_strategy.Ma_Strategy, dict(ma_objs=[moving_averages.SimpleMovingAverage(10),
+                                            moving_averages.ExponentialMovingAverage(30, price_point='High')])),
+]
+
+
+@pytest.mark.parametrize('strategy_cls, kwargs', STRATEGIES)
+def test_compact_mode_matches_the_default_one(strategy_cls, kwargs):
+    df = make_ohlcv(1500)
+    full = strategy_cls.from_data(df, 'AAA', **kwargs)
+    full_perf = full.backtest_strategy()
+
+    compact = strategy_cls.from_data(df, 'AAA', compact=True, **kwargs)
+    perf = compact.backtest_strategy()
+    np.testing.assert_allclose(perf.to_numpy(), full_perf.to_numpy(), rtol=1e-12)
+    np.testing.assert_array_equal(compact.data['signal'], full.data['signal'])
+    np.testing.assert_array_equal(compact.data['position'].iloc[1:], full.data['position'].iloc[1:])
+    assert compact.data['signal'].dtype == compact.data['position'].dtype == np.int8
+    assert {'Volume', 'Dividends', 'Stock Splits', 'bnh_returns'}.isdisjoint(compact.data.columns)
+
+    small = strategy_cls.from_data(df, 'AAA', compact=True, float_dtype='float32', **kwargs)
+    np.testing.assert_allclose(small.backtest_strategy().to_numpy(), full_perf.to_numpy(), rtol=1e-5)
+    assert (small.data.dtypes[small.data.dtypes.apply(lambda d: d.kind == 'f')] == np.float32).all()
+
+
+def test_compact_frames_share_the_prices():
+    df = make_ohlcv(1000)
+    strat = macd_strategy.Macd_Strategy.from_data(df, 'AAA', compact=True)
+    strat.backtest_strategy()
+    before = strat.base_data.copy()
+    assert np.shares_memory(strat.data['Close'].to_numpy(), strat.base_data['Close'].to_numpy())
+    pd.testing.assert_frame_equal(strat.base_data, before)
+
+    usage = strat.memory_usage()
+    assert usage['total'] == usage['data']
+    assert usage['base_data'] < usage['data']
+
+
+def test_memory_savings_are_reported():
+    savings = rsi_strategy.RSI_Strategy.memory_savings(make_ohlcv(2000), 'AAA')
+    assert savings['saved'] == savings['full'] - savings['compact']
+    assert savings['compact'] < savings['full']/4
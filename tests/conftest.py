@@ -0,0 +1,41 @@
+from investing_companion import data
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_ohlcv(n_bars=600, seed=0, start='2015-01-02'):
+    rng = np.random.default_rng(seed)
+    close = 100*np.exp(np.cumsum(rng.normal(0.0003, 0.02, n_bars)))
+    open_ = close*np.exp(rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close)*np.exp(np.abs(rng.normal(0, 0.01, n_bars)))
+    low = np.minimum(open_, close)*np.exp(-np.abs(rng.normal(0, 0.01, n_bars)))
+    index = pd.bdate_range(start, periods=n_bars, tz='America/New_York', name='Date')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close,
+                         'Volume': rng.integers(1e5, 1e6, n_bars).astype(float),
+                         'Dividends': 0.0, 'Stock Splits': 0.0}, index=index)
+
+
+@pytest.fixture
+def ohlcv():
+    return make_ohlcv()
+
+
+class MemorySource(data.DataSourceBase):
+    '''Serves synthetic histories from memory, generating one per symbol on first use'''
+    def __init__(self, n_bars=600):
+        super().__init__()
+        self.n_bars = n_bars
+        self.frames = {}
+        self.calls = 0
+
+    def history(self, symbol, period='max', start=None, end=None):
+        self.calls += 1
+        if symbol not in self.frames:
+            self.frames[symbol] = make_ohlcv(self.n_bars, seed=sum(map(ord, symbol)))
+        return self.slice_history(self.frames[symbol], period, start=start, end=end).copy()
+
+
+@pytest.fixture
+def source():
+    return MemorySource()
@@ -0,0 +1,63 @@
+from investing_companion import data
+from investing_companion.data import cache, file_source
+from investing_companion.strategy import macd_strategy
+from conftest import make_ohlcv
+import pandas as pd
+
+
+class CountingSource(data.DataSourceBase):
+    def __init__(self, frames):
+        super().__init__()
+        self.frames = frames
+        self.calls = 0
+
+    def history(self, symbol, period='max', start=None, end=None):
+        self.calls += 1
+        return self.slice_history(self.frames[symbol], period, start=start, end=end).copy()
+
+
+def test_file_source_round_trip(tmp_path):
+    df = make_ohlcv()
+    df.to_parquet(tmp_path / 'AAA.parquet')
+    src = file_source.FileSource(str(tmp_path))
+    pd.testing.assert_frame_equal(src.history('AAA'), df, check_freq=False)
+
+
+def test_cache_serves_repeats_and_slices_locally(tmp_path):
+    df = make_ohlcv()
+    upstream = CountingSource({'AAA': df})
+    src = cache.CachedSource(upstream, str(tmp_path))
+
+    full = src.history('AAA')
+    sliced = src.history('AAA', start='2015-06-01', end='2015-07-01')
+    recent = src.history('AAA', period='1mo')
+    assert upstream.calls == 1
+    pd.testing.assert_frame_equal(full, df, check_freq=False)
+    pd.testing.assert_frame_equal(sliced, upstream.history('AAA', start='2015-06-01', end='2015-07-01'),
+                                  check_freq=False)
+    assert sliced.index.min() >= pd.Timestamp('2015-06-01', tz='America/New_York')
+    assert sliced.index.max() < pd.Timestamp('2015-07-01', tz='America/New_York')
+    assert recent.index[-1] == df.index[-1] and len(recent) < 30
+
+    #A new cache over the same directory reads from disk without downloading
+    upstream.calls = 0
+    reopened = cache.CachedSource(upstream, str(tmp_path))
+    pd.testing.assert_frame_equal(reopened.history('AAA'), df, check_freq=False)
+    assert upstream.calls == 0
+
+
+def test_cache_key_includes_interval_and_adjustment(tmp_path):
+    upstream = CountingSource({'AAA': make_ohlcv()})
+    src = cache.CachedSource(upstream, str(tmp_path))
+    raw = cache.CachedSource(CountingSource({'AAA': make_ohlcv()}), str(tmp_path))
+    raw.auto_adjust = False
+    assert src.path('AAA') != raw.path('AAA')
+
+
+def test_strategy_uses_data_source(tmp_path):
+    upstream = CountingSource({'AAA': make_ohlcv()})
+    src = cache.CachedSource(upstream, str(tmp_path))
+    strat = macd_strategy.Macd_Strategy('AAA', data_source=src)
+    macd_strategy.Macd_Strategy('AAA', data_source=src)
+    assert upstream.calls == 1
+    assert 'daily_returns' in strat.data.columns
@@ -0,0 +1,43 @@
+from investing_companion.strategy import macd_strategy, bollinger_strategy, rsi_strategy, ma_strategy
+from investing_companion.indicators import moving_averages
+from conftest import make_ohlcv
+import pandas as pd
+import pytest
+
+
+def test_from_data_matches_retrieved(source):
+    strat = macd_strategy.Macd_Strategy('AAA', buffer=2, data_source=source)
+    rebuilt = macd_strategy.Macd_Strategy.from_data(strat.base_data, 'AAA', buffer=2)
+    pd.testing.assert_series_equal(rebuilt.backtest_strategy(), strat.backtest_strategy())
+
+
+def test_from_data_prepares_raw_frames():
+    raw = make_ohlcv()
+    strat = rsi_strategy.RSI_Strategy.from_data(raw, 'AAA')
+    assert 'daily_returns' in strat.data.columns
+    assert 'daily_returns' not in raw.columns
+
+
+def test_base_data_is_shared_and_untouched(source):
+    strat = ma_strategy.Ma_Strategy('AAA', ma_objs=[moving_averages.SimpleMovingAverage(20)],
+                                    data_source=source)
+    columns = list(strat.base_data.columns)
+    other = ma_strategy.Ma_Strategy.from_data(strat.base_data, 'AAA',
+                                              ma_objs=[moving_averages.SimpleMovingAverage(50)])
+    other.backtest_strategy()
+    assert other.base_data is strat.base_data
+    assert list(strat.base_data.columns) == columns
+
+
+@pytest.mark.parametrize('build, kwargs', [
+    (lambda src: macd_strategy.Macd_Strategy('AAA', data_source=src),
+     dict(fastema_range_to_use=[6, 20], signal_range_to_use=[5, 12], max_iterations=3)),
+    (lambda src: bollinger_strategy.Bollinger_Strategy('AAA', data_source=src),
+     dict(ema_range=[10, 40], std_range=[1, 3], max_iterations=3)),
+    (lambda src: rsi_strategy.RSI_Strategy('AAA', data_source=src),
+     dict(rsi_range=[7, 28], buffer_range=[1, 3], max_iterations=3)),
+])
+def test_optimizers_do_no_io_after_first_load(source, build, kwargs):
+    strat = build(source)
+    strat.optimize_strat_params(**kwargs)
+    assert source.calls == 1
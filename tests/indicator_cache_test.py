@@ -0,0 +1,68 @@
+from investing_companion import indicators
+from investing_companion.indicators import cache, macd, rsi, bollinger, moving_averages
+from conftest import make_ohlcv
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = cache.IndicatorCache()
+    monkeypatch.setattr(indicators.IndicatorBase, 'cache', store)
+    return store
+
+
+@pytest.mark.parametrize('ind', [macd.MACD(), rsi.RelativeStrengthIndex(), bollinger.BollingerBands(),
+                                 moving_averages.SimpleMovingAverage(), 
+                                 moving_averages.ExponentialMovingAverage()])
+def test_every_indicator_is_cached(store, ind):
+    df = make_ohlcv()
+    first = ind.build_df(df)
+    second = ind.build_df(df.copy())
+    pd.testing.assert_frame_equal(first, second)
+    assert store.stats()['misses'] == 1 and store.stats()['hits'] == 1
+
+
+def test_key_depends_on_parameters_price_point_and_data(store):
+    df = make_ohlcv()
+    moving_averages.SimpleMovingAverage(20).build_df(df)
+    moving_averages.SimpleMovingAverage(30).build_df(df)
+    moving_averages.SimpleMovingAverage(20, price_point='Open').build_df(df)
+    moving_averages.ExponentialMovingAverage(20).build_df(df)
+    moving_averages.SimpleMovingAverage(20).build_df(make_ohlcv(seed=1))
+    assert store.stats()['misses'] == 5 and store.stats()['hits'] == 0
+
+
+def test_returned_frames_can_be_modified(store):
+    df = make_ohlcv()
+    ind = moving_averages.SimpleMovingAverage(20)
+    ind.build_df(df)[ind.ma_name] = 0
+    assert (ind.build_df(df)[ind.ma_name].dropna() != 0).all()
+
+
+def test_lru_eviction_and_spill(monkeypatch, tmp_path):
+    df = make_ohlcv()
+    size = int(moving_averages.SimpleMovingAverage(5).build_df(df).memory_usage(index=True).sum())
+    store = cache.IndicatorCache(max_bytes=2*size, spill_dir=str(tmp_path))
+    monkeypatch.setattr(indicators.IndicatorBase, 'cache', store)
+
+    for window in (5, 10, 15):
+        moving_averages.SimpleMovingAverage(window).build_df(df)
+    assert store.stats()['evictions'] == 1 and store.stats()['entries'] == 2
+
+    moving_averages.SimpleMovingAverage(5).build_df(df)
+    assert store.stats()['spill_hits'] == 1 and store.stats()['misses'] == 3
+
+    #clear() deletes the spilled entries too, and nothing else in the directory
+    (tmp_path / 'notes.txt').write_text('kept')
+    store.clear()
+    assert [p.name for p in tmp_path.iterdir()] == ['notes.txt']
+    for window in (10, 5):
+        moving_averages.SimpleMovingAverage(window).build_df(df)
+    assert store.stats()['spill_hits'] == 0 and store.stats()['misses'] == 2
+
+
+def test_cache_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(indicators.IndicatorBase, 'cache', None)
+    ind = rsi.RelativeStrengthIndex()
+    assert ind.build_df(make_ohlcv())[ind.rsi_name].notna().any()
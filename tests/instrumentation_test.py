@@ -0,0 +1,78 @@
+from investing_companion import instrumentation, indicators
+from investing_companion.indicators import cache
+from investing_companion.strategy import macd_strategy, rsi_strategy
+from conftest import make_ohlcv
+import json
+import pytest
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(indicators.IndicatorBase, 'cache', cache.IndicatorCache())
+
+
+def test_backtest_stages_and_cache_counters(source, fresh_cache):
+    with instrumentation.profile() as prof:
+        strat = macd_strategy.Macd_Strategy('AAA', data_source=source)
+        strat.backtest_strategy()
+        macd_strategy.Macd_Strategy('AAA', data_source=source).create_conditions()
+    report = prof.to_dict()
+    stages = report['stages']
+    for stage in ('retrieve_data', 'prepare_data', 'create_conditions', 'get_signal_column',
+                  '_get_performance', 'backtest_strategy'):
+        assert f'Macd_Strategy.{stage}' in stages
+    assert stages['MACD.build_df']['calls'] == 2
+    assert stages['Macd_Strategy.retrieve_data']['rows'] == 2*600
+    assert stages['Macd_Strategy._get_performance']['rows'] == len(strat.data)
+    assert stages['Macd_Strategy.backtest_strategy']['seconds']\
+        >= stages['Macd_Strategy._get_performance']['seconds']
+    assert all(stats['peak_bytes'] is None for stats in stages.values())
+    assert report['counters'] == {'indicator_cache.misses': 1, 'indicator_cache.hits': 1}
+    assert json.loads(prof.to_json()) == report
+
+
+def test_nothing_is_recorded_when_off(source):
+    assert instrumentation.active() is None
+    prof = instrumentation.enable()
+    instrumentation.disable()
+    macd_strategy.Macd_Strategy('AAA', data_source=source).backtest_strategy()
+    assert prof.to_dict() == {'stages': {}, 'counters': {}}
+    assert instrumentation.active() is None
+
+
+def test_profiles_nest_and_track_memory(source):
+    with instrumentation.profile() as outer:
+        with instrumentation.profile(track_memory=True) as inner:
+            rsi_strategy.RSI_Strategy('AAA', data_source=source).backtest_strategy()
+        assert instrumentation.active() is outer
+    assert instrumentation.active() is None
+    assert outer.to_dict()['stages'] == {}
+
+    stages = inner.to_dict()['stages']
+    assert all(stats['peak_bytes'] is not None for stats in stages.values())
+    assert stages['RSI_Strategy.backtest_strategy']['peak_bytes']\
+        >= stages['RSI_Strategy._get_performance']['peak_bytes'] > 0
+
+
+def test_optimizer_evaluations_are_counted():
+    strat = macd_strategy.Macd_Strategy.from_data(make_ohlcv(400), 'AAA')
+    with instrumentation.profile() as prof:
+        strat.sweep_strat_params(fastema_windows=[8, 12], slowema_windows=[26], signal_windows=[9], buffers=[1, 2])
+        strat.optimize_strat_params([6, 20], [5, 12], max_iterations=2)
+    counters = prof.to_dict()['counters']
+    stages = prof.to_dict()['stages']
+    assert counters['optimizer_evaluations'] == 4 + stages['Macd_Strategy.backtest_strategy']['calls']
+    assert stages['Macd_Strategy.sweep_strat_params']['calls'] == 1
+    assert stages['Macd_Strategy.optimize_strat_params']['calls'] == 1
+
+
+def test_merge_aggregates_reports():
+    first = {'stages': {'a': {'calls': 1, 'seconds': 1., 'rows': 10, 'peak_bytes': 5}},
+             'counters': {'n': 2}}
+    second = {'stages': {'a': {'calls': 2, 'seconds': .5, 'rows': 5, 'peak_bytes': 7},
+                         'b': {'calls': 1, 'seconds': .1, 'rows': 0, 'peak_bytes': None}},
+              'counters': {'n': 1, 'm': 1}}
+    merged = instrumentation.Profiler.merge([first, second])
+    assert merged['stages']['a'] == {'calls': 3, 'seconds': 1.5, 'rows': 15, 'peak_bytes': 7}
+    assert merged['stages']['b']['peak_bytes'] is None
+    assert merged['counters'] == {'n': 3, 'm': 1}
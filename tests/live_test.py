@@ -0,0 +1,48 @@
+from investing_companion.strategy import macd_strategy, bollinger_strategy, rsi_strategy, ma_strategy
+from investing_companion.indicators import moving_averages
+from conftest import make_ohlcv
+import numpy as np
+import pytest
+
+
+CASES = [
+    (macd_strategy.Macd_Strategy, dict(method=m, buffer=b))
+    for m in list(macd_strategy.Macd_Strategy.Method) for b in (1, 3)
+] + [
+    (macd_strategy.Macd_Strategy, dict(use_ppo=True, ppo_threshold=1.5, buffer=2)),
+] + [
+    (bollinger_strategy.Bollinger_Strategy, dict(method=m, buffer=b))
+    for m in bollinger_strategy.Bollinger_Strategy.Method for b in (1, 3)
+] + [
+    (rsi_strategy.RSI_Strategy, dict(method=m, buffer=b))
+    for m in rsi_strategy.RSI_Strategy.Method for b in (1, 2)
+] + [
+    (ma_strategy.Ma_Strategy, dict(ma_objs=[moving_averages.SimpleMovingAverage(10),
+                                            moving_averages.ExponentialMovingAverage(30)], method=m, buffer=b))
+    for m in ma_strategy.Ma_Strategy.Method for b in (1, 2)
+]
+
+
+@pytest.mark.parametrize('strategy_cls, kwargs', CASES, ids=lambda x: str(x))
+def test_live_signals_match_backtest(strategy_cls, kwargs):
+    df = make_ohlcv(n_bars=900, seed=7)
+    n_history = 400
+    full = strategy_cls.from_data(df, 'AAA', **kwargs)
+    full.backtest_strategy()
+
+    live_strat = strategy_cls.from_data(df.iloc[:n_history], 'AAA', **kwargs).to_live()
+    signals = [live_strat.on_bar(bar) for _, bar in df.iloc[n_history:].iterrows()]
+
+    np.testing.assert_array_equal(signals, full.data['signal'].to_numpy()[-len(signals):])
+    assert live_strat.position == full.ffill_nonzero(full.data['signal'].to_numpy())[-1]
+
+
+def test_live_from_short_history():
+    df = make_ohlcv(n_bars=200, seed=8)
+    full = rsi_strategy.RSI_Strategy.from_data(df, 'AAA', method=rsi_strategy.RSI_Strategy.Method.TREND_RANGES)
+    full.backtest_strategy()
+
+    live_strat = rsi_strategy.RSI_Strategy.from_data(df.iloc[:3], 'AAA',
+                                                     method=rsi_strategy.RSI_Strategy.Method.TREND_RANGES).to_live()
+    signals = [live_strat.on_bar(bar) for _, bar in df.iloc[3:].iterrows()]
+    np.testing.assert_array_equal(signals, full.data['signal'].to_numpy()[-len(signals):])
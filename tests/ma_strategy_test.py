@@ -0,0 +1,65 @@
+from investing_companion.strategy import ma_strategy
+from investing_companion.indicators import moving_averages
+from investing_companion import strategy
+from conftest import make_ohlcv
+import numpy as np
+import pytest
+
+Method = ma_strategy.Ma_Strategy.Method
+MA_SETS = [
+    [moving_averages.SimpleMovingAverage(10)],
+    [moving_averages.ExponentialMovingAverage(8), moving_averages.SimpleMovingAverage(30)],
+    [moving_averages.SimpleMovingAverage(5), moving_averages.ExponentialMovingAverage(20),
+     moving_averages.SimpleMovingAverage(50)],
+]
+
+
+def legacy_conditions(strat):
+    '''The label-based conditions create_conditions used to build (IND_ORDERED with its not_null_cond)'''
+    data, names, buffer = strat.data, strat.ma_names, strat.buffer
+    not_null_cond = data[names].notnull().all(axis=1)
+    if strat.method == Method.IND_ORDERED:
+        dif = np.sign(data[names].diff(-1, axis='columns')).iloc[:, :-1]
+        buy_sig = strategy.BaseStrategy.buffer_all(dif.eq(1).all(axis='columns'), buffer)
+        cross_buy_sig = dif.shift(buffer).ne(1).any(axis='columns').fillna(0).astype(bool)
+        sell_sig = strategy.BaseStrategy.buffer_all(dif.eq(-1).all(axis='columns'), buffer)
+        cross_sell_sig = dif.shift(buffer).ne(-1).any(axis='columns').fillna(0).astype(bool)
+    else:
+        columns = data[['Close', *names]]
+        buy_sig = strategy.BaseStrategy.buffer_all(columns.idxmax(axis=1) == 'Close', buffer)
+        cross_buy_sig = (columns.shift(buffer).idxmin(axis=1) == 'Close').astype(bool)
+        sell_sig = strategy.BaseStrategy.buffer_all(columns.idxmin(axis=1) == 'Close', buffer)
+        cross_sell_sig = (columns.shift(buffer).idxmax(axis=1) == 'Close').astype(bool)
+    return buy_sig & cross_buy_sig & not_null_cond, sell_sig & cross_sell_sig & not_null_cond
+
+
+@pytest.mark.parametrize('method', list(Method))
+@pytest.mark.parametrize('mas', MA_SETS, ids=len)
+@pytest.mark.parametrize('buffer', [1, 3])
+def test_conditions_match_label_based_version(method, mas, buffer):
+    strat = ma_strategy.Ma_Strategy.from_data(make_ohlcv(n_bars=1200, seed=buffer), 'AAA',
+                                              ma_objs=list(mas), method=method, buffer=buffer)
+    buy, sell = legacy_conditions(strat)
+    np.testing.assert_array_equal(strat.buy_cond.to_numpy(), buy.to_numpy())
+    np.testing.assert_array_equal(strat.sell_cond.to_numpy(), sell.to_numpy())
+    if len(mas) > 1:
+        assert strat.buy_cond.any() and strat.sell_cond.any()
+
+
+@pytest.mark.parametrize('method', list(Method))
+def test_optimizer_matches_exhaustive_search(method):
+    data = make_ohlcv(n_bars=800, seed=4)
+    strat = ma_strategy.Ma_Strategy.from_data(data, 'AAA', method=method, buffer=2)
+    result = strat.optimize_strat_params(window_range=(5, 30), window_step=5, max_mas=2,
+                                         beam_width=1000, chunk_size=16)
+
+    kinds = {'SMA': moving_averages.SimpleMovingAverage, 'EMA': moving_averages.ExponentialMovingAverage}
+    candidates = [kinds[k](w) for w in range(5, 31, 5) for k in ('EMA', 'SMA')]
+    combos = [[c] for c in candidates] + [[a, b] for i, a in enumerate(candidates) for b in candidates[i+1:]]
+    best = max(ma_strategy.Ma_Strategy.from_data(strat.base_data, 'AAA', ma_objs=list(combo), method=method,
+                                                 buffer=2).backtest_strategy()['strat_returns']
+               for combo in combos)
+
+    assert result['Method'] == method
+    assert np.isclose(result['strat_returns'], best)
+    assert result['Evaluated'] <= len(combos)
@@ -0,0 +1,60 @@
+from investing_companion import data
+from investing_companion.data import mmap_store, synthetic
+from investing_companion.strategy import rsi_strategy, macd_strategy
+from conftest import make_ohlcv
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_chunks_round_trip(tmp_path):
+    src = synthetic.SyntheticSource(n_bars=5000, interval='1m', tz='America/New_York')
+    store = mmap_store.MmapStore(str(tmp_path))
+    store.write_chunks('SYN', src.iter_chunks('SYN', chunk_size=1500))
+    assert store.symbols() == ['SYN']
+    assert store.meta('SYN')['rows'] == 5000
+    pd.testing.assert_frame_equal(store.frame('SYN'), src.history('SYN'), check_freq=False, check_names=False)
+
+    with pytest.raises(ValueError):
+        store.append('SYN', src.history('SYN').iloc[-10:])
+    with pytest.raises(ValueError):
+        store.append('SYN', make_ohlcv(10, start='2030-01-01')[['Close']])
+    with pytest.raises(KeyError):
+        store.frame('MISSING')
+
+
+def test_frames_are_views_of_any_date_range(tmp_path):
+    df = make_ohlcv(600)
+    store = mmap_store.MmapStore(str(tmp_path))
+    store.write('AAA', df.iloc[:300])
+    store.append('AAA', df.iloc[300:])
+
+    view = store.frame('AAA', '2015-06-01', '2016-01-01')
+    pd.testing.assert_frame_equal(view, data.DataSourceBase.slice_history(df, start='2015-06-01', end='2016-01-01'),
+                                  check_freq=False)
+    mapped = store.columns('AAA')
+    assert all(np.shares_memory(view[name].to_numpy(), mapped[name]) for name in view.columns)
+    assert store.frame('AAA', columns=['Close']).columns.tolist() == ['Close']
+
+    source = mmap_store.MmapSource(store, interval='1d')
+    for period in ('max', '1y', '3mo', 'ytd'):
+        pd.testing.assert_frame_equal(source.history('AAA', period=period),
+                                      data.DataSourceBase.slice_history(df, period), check_freq=False)
+
+
+def test_compact_strategies_run_on_the_mapped_columns(tmp_path):
+    store = mmap_store.MmapStore(str(tmp_path), float_dtype='float32')
+    store.write('AAA', make_ohlcv(800))
+    source = mmap_store.MmapSource(store, interval='1d')
+    strat = rsi_strategy.RSI_Strategy('AAA', start='2015-03-01', end='2017-06-01', data_source=source,
+                                      compact=True, float_dtype='float32')
+    assert np.shares_memory(strat.base_data['Close'].to_numpy(), store.columns('AAA')['Close'])
+    assert np.shares_memory(strat.data['Close'].to_numpy(), store.columns('AAA')['Close'])
+
+    in_memory = store.frame('AAA', '2015-03-01', '2017-06-01').copy()
+    expected = rsi_strategy.RSI_Strategy.from_data(in_memory, 'AAA', compact=True, float_dtype='float32')
+    pd.testing.assert_series_equal(strat.backtest_strategy(), expected.backtest_strategy())
+
+    full = macd_strategy.Macd_Strategy('AAA', data_source=source)
+    assert full.backtest_strategy()['strat_returns'] == pytest.approx(
+        macd_strategy.Macd_Strategy.from_data(store.frame('AAA').copy(), 'AAA').backtest_strategy()['strat_returns'])
@@ -0,0 +1,97 @@
+from investing_companion import instrumentation
+from investing_companion.strategy import optimizer, parallel, rsi_strategy, bollinger_strategy, macd_strategy
+from conftest import make_ohlcv
+import pytest
+
+
+def quadratic(calls):
+    '''Objective peaking at x=17, y=0.6, recording the batches it is called with'''
+    def evaluate(points, fidelity):
+        calls.append((len(points), fidelity))
+        return [-(p['x'] - 17)**2 - 10*(p.get('y', .6) - .6)**2 - (1 - fidelity) for p in points]
+    return evaluate
+
+
+def test_objective_memoizes_and_enforces_the_budget():
+    calls = []
+    objective = optimizer.Objective(quadratic(calls), budget=5)
+    assert objective([{'x': 1}, {'x': 2}, {'x': 1}]) == [-256, -225, -256]
+    objective([{'x': 2}, {'x': 3}])
+    assert calls == [(2, 1.), (1, 1.)]
+    with pytest.raises(optimizer.StopSearch, match='budget'):
+        objective([{'x': 4}, {'x': 5}, {'x': 6}])
+    assert objective.evaluations == 5
+    assert objective.best() == ({'x': 5}, -144)
+
+
+def test_golden_section_needs_one_evaluation_per_iteration():
+    calls = []
+    result = optimizer.optimize(optimizer.Objective(quadratic(calls)), {'x': (1, 200)}, 'golden', max_iterations=30)
+    assert result['params'] == {'x': 17}
+    assert result['stopped'] is None
+    #The first batch has both interior points, then each iteration reuses one of them
+    assert calls[0][0] == 2 and all(n <= 1 for n, _ in calls[1:-1])
+    assert result['evaluations'] < 20
+
+    #On floats too: the kept point is carried over, not recomputed an ulp off the memoized one
+    calls = []
+    result = optimizer.optimize(optimizer.Objective(quadratic(calls)), {'y': (0., 1.)}, 'golden',
+                                fixed={'x': 17}, max_iterations=20, tolerance=0)
+    assert [n for n, _ in calls] == [2] + [1]*20
+    assert result['evaluations'] == 22
+    assert result['params']['y'] == pytest.approx(.6, abs=1e-3)
+
+
+@pytest.mark.parametrize('method, kwargs', [('coordinate', {}),
+                                            ('random', dict(n_samples=64, seed=1)),
+                                            ('lhs', dict(n_samples=64, seed=1)),
+                                            ('halving', dict(n_candidates=81, eta=3, min_fidelity=1/9))])
+def test_search_methods(method, kwargs):
+    calls = []
+    result = optimizer.optimize(optimizer.Objective(quadratic(calls)), {'x': (1, 40), 'y': (0., 2.)},
+                                method, **kwargs)
+    assert abs(result['params']['x'] - 17) <= (0 if method == 'coordinate' else 3)
+    assert result['score'] > -10
+    if method == 'halving':
+        assert [fidelity for _, fidelity in calls] == pytest.approx([1/9, 1/3, 1.])
+        assert [n for n, _ in calls] == [81, 27, 9]
+
+
+def test_latin_hypercube_covers_every_stratum_and_patience_stops():
+    points = optimizer.sample_points(optimizer.search_space({'a': (0., 1.), 'b': (0., 1.)}), 10, seed=3, latin=True)
+    for name in 'ab':
+        assert sorted(int(p[name]*10) for p in points) == list(range(10))
+
+    objective = optimizer.Objective(lambda points, fidelity: [0.]*len(points), patience=4)
+    result = optimizer.optimize(objective, {'x': (0, 1000)}, 'random', n_samples=100, batch_size=2)
+    assert result['stopped'] == 'patience'
+    assert result['evaluations'] == 6
+
+
+def test_strategies_tune_through_the_shared_optimizer():
+    data = make_ohlcv(800)
+    strat = rsi_strategy.RSI_Strategy.from_data(data, 'AAA')
+    with instrumentation.profile() as prof:
+        result = strat.tune({'rsi_window': (5, 40), 'buffer': (1, 3)}, budget=25)
+    assert result['evaluations'] <= 25
+    assert prof.to_dict()['counters']['optimizer_evaluations'] == result['evaluations']
+    expected = rsi_strategy.RSI_Strategy(**strat._strategy_kwargs(**result['params']))
+    assert expected.backtest_strategy()['strat_returns'] == pytest.approx(result['score'])
+
+    bollinger = bollinger_strategy.Bollinger_Strategy.from_data(data, 'AAA')
+    limited = bollinger.optimize_strat_params([5, 60], std_range=[1, 3], buffer_range=[1, 4], budget=6)
+    assert set(limited) == {'EMA', 'std_dev', 'buffer'}
+    with pytest.raises(ValueError):
+        strat.tune({'rsi_window': (5, 40)}, method='annealing')
+
+
+def test_find_optimum_only_rounds_when_asked():
+    strat = macd_strategy.Macd_Strategy.from_data(make_ohlcv(600), 'AAA', use_ppo=True)
+    with parallel.executor_scope('serial') as pool:
+        objective = strat.objective(pool)
+        strat._find_optimum([1, 5], 'ppo', objective=objective)
+        assert any(params['ppo'] != int(params['ppo']) for params, _, _ in objective.history)
+
+        objective = strat.objective(pool)
+        strat._find_optimum([1, 5], 'ppo', round_numbers=True, objective=objective)
+        assert all(params['ppo'] == int(params['ppo']) for params, _, _ in objective.history)
@@ -0,0 +1,59 @@
+from investing_companion.strategy import macd_strategy, bollinger_strategy, rsi_strategy, ma_strategy, panel
+from investing_companion.indicators import moving_averages
+from conftest import make_ohlcv
+import numpy as np
+import pytest
+
+
+def universe():
+    '''Histories with different listing dates, lengths and missing sessions'''
+    frames = {}
+    for i, (n_bars, start) in enumerate([(700, '2015-01-02'), (450, '2016-03-01'),
+                                         (40, '2017-06-01'), (600, '2015-01-02')]):
+        frame = make_ohlcv(n_bars, seed=10+i, start=start)
+        frames[f'S{i}'] = frame.drop(frame.index[5::17]) if i == 3 else frame
+    return frames
+
+
+@pytest.mark.parametrize('strategy_cls, kwargs', [
+    (macd_strategy.Macd_Strategy, dict(buffer=2)),
+    (macd_strategy.Macd_Strategy, dict(method=macd_strategy.Macd_Strategy.Method.ZERO_CROSSOVER,
+                                       use_ppo=True, ppo_threshold=1.0)),
+    (bollinger_strategy.Bollinger_Strategy, dict(method=bollinger_strategy.Bollinger_Strategy.Method.DOUBLE_BAND_TEST,
+                                                 buffer=3)),
+    (rsi_strategy.RSI_Strategy, dict(method=rsi_strategy.RSI_Strategy.Method.TREND_RANGES, buffer=2)),
+    (ma_strategy.Ma_Strategy, dict(ma_objs=[moving_averages.SimpleMovingAverage(10),
+                                            moving_averages.ExponentialMovingAverage(30)])),
+    (ma_strategy.Ma_Strategy, dict(ma_objs=[moving_averages.SimpleMovingAverage(10),
+                                            moving_averages.SimpleMovingAverage(30)],
+                                   method=ma_strategy.Ma_Strategy.Method.IND_ORDERED, buffer=2)),
+])
+def test_panel_matches_single_symbol_backtests(strategy_cls, kwargs):
+    frames = universe()
+    results = panel.PanelBacktest(strategy_cls, frames, **kwargs).run()
+
+    for symbol, frame in frames.items():
+        expected = strategy_cls.from_data(frame, symbol, **kwargs).backtest_strategy()
+        assert np.isclose(results.loc[symbol, 'daily_returns'], expected['daily_returns'])
+        assert np.isclose(results.loc[symbol, 'strat_returns'], expected['strat_returns'])
+
+
+def test_returns_frame_maps_back_to_dates():
+    frames = universe()
+    bt = panel.PanelBacktest(rsi_strategy.RSI_Strategy, frames)
+    bt.run()
+    returns = bt.returns_frame()
+
+    strat = rsi_strategy.RSI_Strategy.from_data(frames['S3'], 'S3')
+    strat.backtest_strategy()
+    expected = strat.data['strat_returns'].diff().fillna(strat.data['strat_returns'])
+    np.testing.assert_allclose(returns['S3'].dropna().to_numpy(),
+                               expected.iloc[strat.rel_str.window_size:].to_numpy(), atol=1e-12)
+    assert np.isclose(bt.aggregate()['strat_returns'], bt.results['strat_returns'].mean())
+    assert len(bt.portfolio_returns()) == len(returns)
+
+
+def test_from_source(source):
+    bt = panel.PanelBacktest.from_source(macd_strategy.Macd_Strategy, ['AAA', 'BBB'], data_source=source)
+    assert list(bt.run().index) == ['AAA', 'BBB']
+    assert source.calls == 2
@@ -0,0 +1,33 @@
+from investing_companion.strategy import macd_strategy, bollinger_strategy, rsi_strategy, parallel
+import pytest
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_optimizers_give_serial_results(source, executor):
+    macd = macd_strategy.Macd_Strategy('AAA', data_source=source)
+    bol = bollinger_strategy.Bollinger_Strategy('AAA', data_source=source)
+    rel = rsi_strategy.RSI_Strategy('AAA', data_source=source)
+    runs = [(macd, dict(fastema_range_to_use=[6, 20], signal_range_to_use=[5, 12],
+                        buffer_range_to_use=[1, 4], max_iterations=3)),
+            (bol, dict(ema_range=[10, 40], std_range=[1, 3], max_iterations=3)),
+            (rel, dict(rsi_range=[7, 28], max_iterations=3))]
+    for strat, kwargs in runs:
+        expected = strat.optimize_strat_params(**kwargs)
+        assert strat.optimize_strat_params(executor=executor, max_workers=2, **kwargs) == expected
+
+
+def test_optimize_symbols_keeps_symbol_order(source):
+    symbols = ['CCC', 'AAA', 'BBB']
+    kwargs = dict(rsi_range=[7, 28], max_iterations=2)
+    results = parallel.optimize_symbols(rsi_strategy.RSI_Strategy, symbols, kwargs,
+                                        executor='process', max_workers=2, data_source=source)
+    assert list(results) == symbols
+    for symbol in symbols:
+        strat = rsi_strategy.RSI_Strategy(symbol, data_source=source)
+        assert results[symbol] == strat.optimize_strat_params(**kwargs)
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        with parallel.executor_scope('gpu'):
+            pass
@@ -0,0 +1,50 @@
+from investing_companion import indicators
+from investing_companion.indicators import pipeline, moving_averages, bollinger, macd, rsi
+from conftest import make_ohlcv
+import pandas as pd
+
+INDICATORS = [
+    moving_averages.ExponentialMovingAverage(12),
+    moving_averages.ExponentialMovingAverage(26),
+    macd.MACD(),
+    moving_averages.SimpleMovingAverage(20),
+    bollinger.BollingerBands(20, 2),
+    bollinger.BollingerBands(20, 1.5),
+    rsi.RelativeStrengthIndex(14),
+    moving_averages.SimpleMovingAverage(10, price_point='HLC3'),
+]
+
+
+def test_pipeline_matches_each_indicator():
+    df = make_ohlcv(800)
+    pipe = pipeline.Pipeline(INDICATORS)
+    built = pipe.build_df(df)
+    expected = pd.concat([ind.build_df(df) for ind in INDICATORS], axis=1)
+    expected = expected.loc[:, ~expected.columns.duplicated()]
+    pd.testing.assert_frame_equal(built, expected, check_names=False)
+
+
+def test_intermediate_series_are_shared():
+    pipe = pipeline.Pipeline(INDICATORS)
+    pipe.build_columns(make_ohlcv(300))
+    nodes = pipe.nodes
+    close = ('price', 'Close')
+    assert nodes.requests > len(nodes.values)
+    assert [key for key in nodes.values if key[0] == 'ema' and key[1] == close]\
+        == [('ema', close, 12), ('ema', close, 26)]
+    assert [key for key in nodes.values if key[0] == 'sma' and key[1] == close] == [('sma', close, 20)]
+    assert len([key for key in nodes.values if key[0] == 'std']) == 1
+
+
+def test_panels_and_indicators_without_nodes():
+    class Range(indicators.IndicatorBase):
+        def build_columns(self, prices):
+            return {'range': prices.rolling(5).max() - prices.rolling(5).min()}
+
+    frames = {symbol: make_ohlcv(400, seed=seed) for seed, symbol in enumerate(['AAA', 'BBB'])}
+    prices = lambda column: pd.DataFrame({s: f[column].to_numpy() for s, f in frames.items()})
+    panel_indicators = [macd.MACD(), rsi.RelativeStrengthIndex(14), Range()]
+    columns = pipeline.Pipeline(panel_indicators).build_columns(prices)
+    for ind in panel_indicators:
+        for name, values in ind.build_columns(prices('Close')).items():
+            pd.testing.assert_frame_equal(columns[name], values)
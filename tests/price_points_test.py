@@ -0,0 +1,73 @@
+from investing_companion.indicators import price_points, moving_averages, macd
+from investing_companion.strategy import macd_strategy, ma_strategy, panel
+from investing_companion.data import synthetic
+from investing_companion.tickers import ticker
+from conftest import make_ohlcv
+import gc
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_indicators_use_derived_price_points_on_any_frame():
+    df = make_ohlcv()
+    sma = moving_averages.SimpleMovingAverage(10, price_point='HLC3')
+    expected = ((df['High'] + df['Low'] + df['Close'])/3).rolling(10).mean()
+    np.testing.assert_allclose(sma.build_df(df)['SMA(10)'], expected)
+    assert 'HLC3' not in df.columns
+
+    materialized = price_points.add_columns(df.copy(), ['HLC3'])
+    pd.testing.assert_frame_equal(sma.build_df(materialized), sma.build_df(df))
+
+
+def test_derived_series_are_cached_per_frame():
+    df = make_ohlcv()
+    first = price_points.get(df, 'OHLC4')
+    assert price_points.get(df, 'OHLC4') is first
+    assert id(df) in price_points._frame_cache
+
+    #A new index (in-place dropna, etc) invalidates the cached series
+    df.drop(df.index[:5], inplace=True)
+    assert len(price_points.get(df, 'OHLC4')) == len(df)
+
+    key = id(df)
+    del df
+    gc.collect()
+    assert key not in price_points._frame_cache
+
+
+def test_custom_price_points():
+    price_points.register('HC2', lambda p: (p['High'] + p['Close'])/2, ('High', 'Close'))
+    try:
+        df = make_ohlcv(800)
+        ema = moving_averages.ExponentialMovingAverage(20, price_point='HC2')
+        strat = ma_strategy.Ma_Strategy.from_data(df, 'AAA', ma_objs=[ema], compact=True)
+        assert list(strat.base_data.columns) == ['Close', 'daily_returns', 'High']
+        full = ma_strategy.Ma_Strategy.from_data(df, 'AAA', ma_objs=[ema])
+        pd.testing.assert_series_equal(strat.backtest_strategy(), full.backtest_strategy())
+    finally:
+        price_points.unregister('HC2')
+    with pytest.raises(KeyError):
+        price_points.get(make_ohlcv(), 'HC2')
+
+
+def test_streams_and_panels_derive_price_points():
+    df = make_ohlcv(500)
+    indicator = macd.MACD(price_point='HL2')
+    stream = indicator.to_stream().initialize(df.iloc[:400])
+    streamed = [stream.update(bar)[indicator.macd_name] for _, bar in df.iloc[400:].iterrows()]
+    np.testing.assert_allclose(streamed, indicator.build_df(df)[indicator.macd_name].iloc[400:])
+
+    src = synthetic.SyntheticSource(n_bars=500)
+    results = panel.PanelBacktest.from_source(macd_strategy.Macd_Strategy, ['AAA', 'BBB'], data_source=src,
+                                              macd_object=indicator).run()
+    single = macd_strategy.Macd_Strategy('BBB', data_source=src, macd_object=indicator).backtest_strategy()
+    assert results.loc['BBB', 'strat_returns'] == pytest.approx(single['strat_returns'])
+
+
+def test_ticker_history_is_lazy():
+    src = synthetic.SyntheticSource(n_bars=300)
+    df = ticker.TickerAdditionalPricepoints('AAA', data_source=src).history()
+    assert not {'HL2', 'HLC3', 'HLCC4', 'OHLC4'} & set(df.columns)
+    some = ticker.TickerAdditionalPricepoints('AAA', data_source=src).history(derived=['HL2'])
+    np.testing.assert_allclose(some['HL2'], (df['High'] + df['Low'])/2)
@@ -0,0 +1,89 @@
+from investing_companion import data
+from investing_companion.data import cache
+from investing_companion.strategy import macd_strategy, rsi_strategy, bollinger_strategy
+from conftest import make_ohlcv
+import numpy as np
+import pandas as pd
+import pytest
+
+
+class GrowingSource(data.DataSourceBase):
+    '''Serves the first `visible` bars of a history, recording the rows of every request'''
+    def __init__(self, df, visible):
+        super().__init__()
+        self.df = df
+        self.visible = visible
+        self.rows = []
+
+    def history(self, symbol, period='max', start=None, end=None):
+        df = self.slice_history(self.df.iloc[:self.visible], period, start=start, end=end).copy()
+        self.rows.append(len(df))
+        return df
+
+
+def split(source, at, ratio=2.):
+    '''Adjusts the history for a split at bar `at`, the way an adjusted feed does'''
+    df = source.df.copy()
+    df.iloc[:at, :4] = df.iloc[:at, :4]/ratio
+    df.iloc[at, df.columns.get_loc('Stock Splits')] = ratio
+    source.df = df
+
+
+def test_refresh_fetches_only_the_new_bars(tmp_path):
+    upstream = GrowingSource(make_ohlcv(600), 500)
+    src = cache.CachedSource(upstream, str(tmp_path))
+    assert src.refresh('AAA') == ('downloaded', 500)
+    assert src.refresh('AAA') == ('unchanged', 0)
+
+    upstream.visible = 510
+    assert src.refresh('AAA') == ('appended', 10)
+    assert upstream.rows[-1] == 13
+    assert src.last_timestamp('AAA') == upstream.df.index[509]
+    reloaded = cache.CachedSource(upstream, str(tmp_path), file_format='parquet')
+    pd.testing.assert_frame_equal(reloaded.history('AAA'), upstream.df.iloc[:510], check_freq=False)
+
+
+def test_adjustments_rewrite_the_history(tmp_path):
+    upstream = GrowingSource(make_ohlcv(600), 500)
+    src = cache.CachedSource(upstream, str(tmp_path))
+    src.load('AAA')
+    upstream.visible = 505
+    split(upstream, 502)
+    assert src.refresh('AAA') == ('rewritten', 5)
+    assert upstream.rows[-1] == 505
+    pd.testing.assert_frame_equal(src.history('AAA'), upstream.df.iloc[:505], check_freq=False)
+
+
+@pytest.mark.parametrize('strategy_cls, kwargs', [(macd_strategy.Macd_Strategy, {}),
+                                                  (rsi_strategy.RSI_Strategy,
+                                                   dict(method=rsi_strategy.RSI_Strategy.Method.TREND_RANGES)),
+                                                  (bollinger_strategy.Bollinger_Strategy, dict(buffer=2)),
+                                                  (macd_strategy.Macd_Strategy, dict(compact=True))])
+def test_extend_matches_a_full_rebuild(strategy_cls, kwargs):
+    df = make_ohlcv(700)
+    strat = strategy_cls.from_data(df.iloc[:600], 'AAA', **kwargs)
+    strat.backtest_strategy()
+    assert strat.extend(df.iloc[590:650]) == 50
+    assert strat.extend(df.iloc[650:]) == 50
+    full = strategy_cls.from_data(df, 'AAA', **kwargs)
+    pd.testing.assert_series_equal(strat.backtest_strategy(), full.backtest_strategy())
+    pd.testing.assert_frame_equal(strat.data, full.data, check_freq=False)
+    assert strat.extend(df.iloc[:10]) == 0
+
+
+def test_strategies_refresh_from_the_cache(tmp_path):
+    upstream = GrowingSource(make_ohlcv(600), 550)
+    src = cache.CachedSource(upstream, str(tmp_path))
+    strat = rsi_strategy.RSI_Strategy('AAA', data_source=src)
+
+    upstream.visible = 560
+    assert strat.refresh() == 10
+    assert max(upstream.rows[1:]) <= 13
+    expected = rsi_strategy.RSI_Strategy('AAA', data_source=GrowingSource(upstream.df, 560))
+    assert strat.backtest_strategy().to_numpy() == pytest.approx(expected.backtest_strategy().to_numpy())
+
+    upstream.visible = 570
+    split(upstream, 565)
+    assert strat.refresh() is None
+    assert len(strat.data) == 569
+    np.testing.assert_allclose(strat.base_data['Close'], upstream.df['Close'].iloc[1:570])
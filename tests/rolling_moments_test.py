@@ -0,0 +1,48 @@
+from investing_companion.indicators import rolling_moments, bollinger, moving_averages
+from conftest import make_ohlcv
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import pandas as pd
+import pytest
+
+
+def test_matches_pandas_rolling():
+    values = make_ohlcv(n_bars=3000, seed=1)['Close'].to_numpy().copy()
+    values[700] = np.nan
+    moments = rolling_moments.RollingMoments(values, 200)
+    for window in (3, 20, 64, 65, 200):
+        mean, std = moments.mean_std(window)
+        rolling = pd.Series(values).rolling(window, min_periods=window)
+        np.testing.assert_allclose(mean, rolling.mean(), rtol=1e-12, equal_nan=True)
+        np.testing.assert_allclose(std, rolling.std(ddof=0), rtol=1e-7, equal_nan=True)
+
+
+def test_compensated_error_does_not_grow_with_length():
+    rng = np.random.default_rng(0)
+    values = 1e6 + np.cumsum(rng.normal(0, 1, 200_000))
+    expected = sliding_window_view(values[-1019:], 20).std(axis=1)
+
+    def error(compensated):
+        _, std = rolling_moments.RollingMoments(values, 20, compensated=compensated).mean_std(20)
+        return np.max(np.abs(std[-1000:] - expected)/expected)
+
+    assert error(True) < 1e-12
+    assert error(True) < error(False)
+
+
+def test_window_larger_than_max_window():
+    with pytest.raises(ValueError):
+        rolling_moments.RollingMoments(np.arange(100.), 10).mean(11)
+
+
+def test_build_multi_df_matches_build_df():
+    df = make_ohlcv(n_bars=1000, seed=2)
+    multi = bollinger.BollingerBands().build_multi_df(df, [10, 20, 50], std_deviations=[1, 2.5])
+    for window in (10, 20, 50):
+        for width in (1, 2.5):
+            single = bollinger.BollingerBands(window, width).build_df(df)
+            pd.testing.assert_frame_equal(multi[single.columns], single, check_exact=False, rtol=1e-9)
+
+    sma = moving_averages.SimpleMovingAverage().build_multi_df(df, [5, 50, 200])
+    single = moving_averages.SimpleMovingAverage(200).build_df(df)
+    pd.testing.assert_frame_equal(sma[single.columns], single, check_exact=False, rtol=1e-12)
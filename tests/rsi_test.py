@@ -0,0 +1,49 @@
+from investing_companion.indicators import rsi
+from conftest import make_ohlcv
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def legacy_rsi(base_df, window_size, price_point='Close'):
+    '''The loop-based Wilder smoothing that RelativeStrengthIndex.build_df used to run'''
+    diff = base_df[price_point].diff(1)
+    upward = diff.clip(lower=0).round(2).to_numpy()
+    downward = diff.clip(upper=0).abs().round(2).to_numpy()
+
+    def smooth(values):
+        avg = pd.Series(values).rolling(window_size, min_periods=window_size)\
+                .mean()[:window_size+1].reindex(range(len(values))).to_numpy()
+        for i in range(window_size+1, len(values)):
+            avg[i] = (avg[i-1]*(window_size-1) + values[i])/window_size
+        return avg
+
+    rs = pd.Series(smooth(upward))/pd.Series(smooth(downward))
+    return pd.Series((100 - (100/(1.0+rs))).to_numpy(), index=base_df.index)
+
+
+@pytest.mark.parametrize('window_size', [2, 5, 14, 50])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_build_df_matches_legacy_loop(window_size, seed):
+    df = make_ohlcv(n_bars=2000, seed=seed)
+    ind = rsi.RelativeStrengthIndex(window_size)
+    result = ind.build_df(df)[ind.rsi_name]
+    expected = legacy_rsi(df, window_size)
+    assert list(result.index) == list(df.index)
+    np.testing.assert_array_equal(np.isnan(result.to_numpy()), np.isnan(expected.to_numpy()))
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-10, atol=1e-10)
+
+
+def test_build_df_short_history():
+    df = make_ohlcv(n_bars=10)
+    ind = rsi.RelativeStrengthIndex(14)
+    assert ind.build_df(df)[ind.rsi_name].isna().all()
+
+
+def test_flat_prices_follow_legacy_nan_and_limits():
+    df = make_ohlcv(n_bars=100)
+    df.iloc[40:, df.columns.get_loc('Close')] = df['Close'].iloc[40]
+    ind = rsi.RelativeStrengthIndex(5)
+    result = ind.build_df(df)[ind.rsi_name].to_numpy()
+    expected = legacy_rsi(df, 5).to_numpy()
+    np.testing.assert_allclose(result, expected, rtol=1e-10, atol=1e-10)
@@ -0,0 +1,51 @@
+from investing_companion.indicators import moving_averages, bollinger, macd, rsi
+from conftest import make_ohlcv
+import numpy as np
+import pytest
+
+
+INDICATORS = [
+    moving_averages.SimpleMovingAverage(20),
+    moving_averages.ExponentialMovingAverage(20),
+    bollinger.BollingerBands(20, 2),
+    macd.MACD(26, 12, 9),
+    rsi.RelativeStrengthIndex(14),
+]
+
+
+def streamed(indicator, df, n_history):
+    stream = indicator.to_stream().initialize(df.iloc[:n_history])
+    return [stream.update(bar) for _, bar in df.iloc[n_history:].iterrows()]
+
+
+@pytest.mark.parametrize('indicator', INDICATORS, ids=str)
+@pytest.mark.parametrize('n_history', [0, 5, 30, 300])
+def test_updates_match_build_df(indicator, n_history):
+    df = make_ohlcv(n_bars=400, seed=3)
+    expected = indicator.build_df(df)
+    rows = streamed(indicator, df, n_history)
+
+    for column in expected.columns:
+        values = np.array([row[column] for row in rows])
+        np.testing.assert_allclose(values, expected[column].to_numpy()[n_history:],
+                                   rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize('indicator', [INDICATORS[1], INDICATORS[3], INDICATORS[4]], ids=str)
+def test_recursive_indicators_match_exactly(indicator):
+    df = make_ohlcv(n_bars=400, seed=4)
+    expected = indicator.build_df(df)
+    rows = streamed(indicator, df, 100)
+
+    for column in expected.columns:
+        values = np.array([row[column] for row in rows])
+        np.testing.assert_array_equal(values, expected[column].to_numpy()[100:])
+
+
+def test_update_accepts_a_bare_price():
+    df = make_ohlcv(n_bars=100, seed=5)
+    ind = moving_averages.SimpleMovingAverage(10)
+    stream = ind.to_stream().initialize(df.iloc[:90])
+    for price in df['Close'].iloc[90:]:
+        value = stream.update(price)[ind.ma_name]
+    assert np.isclose(value, ind.build_df(df)[ind.ma_name].iloc[-1])
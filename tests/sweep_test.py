@@ -0,0 +1,56 @@
+from investing_companion.strategy import macd_strategy, bollinger_strategy, rsi_strategy
+from investing_companion.indicators import macd, bollinger, rsi
+import numpy as np
+import pytest
+
+
+def assert_matches_backtests(results, build):
+    for row in results.itertuples(index=False):
+        perf = build(row).backtest_strategy()
+        np.testing.assert_allclose([row.daily_returns, row.strat_returns],
+                                   [perf['daily_returns'], perf['strat_returns']], atol=1e-9)
+
+
+@pytest.mark.parametrize('method', list(macd_strategy.Macd_Strategy.Method))
+@pytest.mark.parametrize('use_ppo', [False, True])
+def test_macd_sweep_matches_backtests(source, method, use_ppo):
+    strat = macd_strategy.Macd_Strategy('AAA', method=method, use_ppo=use_ppo, data_source=source)
+    results = strat.sweep_strat_params(fastema_windows=[8, 12], slowema_windows=[26, 30],
+                                       signal_windows=[5, 9], buffers=[1, 3],
+                                       ppo_thresholds=[1.0, 2.5], chunk_size=7)
+    assert len(results) == 32
+    build = lambda row: macd_strategy.Macd_Strategy('AAA', method=method, use_ppo=use_ppo,
+                                                    macd_object=macd.MACD(row.slowema_window,
+                                                                          row.fastema_window,
+                                                                          row.signal_window),
+                                                    buffer=row.buffer, ppo_threshold=row.ppo_threshold,
+                                                    data_source=source)
+    assert_matches_backtests(results.sample(6, random_state=0), build)
+
+
+@pytest.mark.parametrize('method', list(bollinger_strategy.Bollinger_Strategy.Method))
+def test_bollinger_sweep_matches_backtests(source, method):
+    strat = bollinger_strategy.Bollinger_Strategy('AAA', method=method, data_source=source)
+    results = strat.sweep_strat_params(window_sizes=[10, 20, 30], std_deviations=[1.5, 2],
+                                       buffers=[1, 2, 4])
+    assert len(results) == 18
+    build = lambda row: bollinger_strategy.Bollinger_Strategy('AAA', method=method, buffer=row.buffer,
+                                                              bollinger_obj=bollinger.BollingerBands(
+                                                                  row.window_size, row.std_deviations),
+                                                              data_source=source)
+    assert_matches_backtests(results.sample(6, random_state=0), build)
+
+
+@pytest.mark.parametrize('method', list(rsi_strategy.RSI_Strategy.Method))
+def test_rsi_sweep_matches_backtests(source, method):
+    strat = rsi_strategy.RSI_Strategy('AAA', method=method, data_source=source)
+    results = strat.sweep_strat_params(window_sizes=[7, 14], buffers=[1, 2],
+                                       oversold_thresholds=[30, 40], overbought_thresholds=[60, 70],
+                                       uptrend_starts=[40, 45])
+    build = lambda row: rsi_strategy.RSI_Strategy('AAA', method=method, buffer=row.buffer,
+                                                  rsi_obj=rsi.RelativeStrengthIndex(row.window_size),
+                                                  oversold_threshold=row.oversold_threshold,
+                                                  overbought_threshold=row.overbought_threshold,
+                                                  uptrend_start=row.uptrend_start,
+                                                  data_source=source)
+    assert_matches_backtests(results.sample(6, random_state=0), build)
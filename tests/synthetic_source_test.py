@@ -0,0 +1,80 @@
+from investing_companion.data import synthetic
+from investing_companion.strategy import macd_strategy, panel
+from investing_companion.tickers import ticker
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize('model', synthetic.MODELS)
+def test_history_is_seeded_and_consistent(model):
+    src = synthetic.SyntheticSource(n_bars=3000, model=model, seed=7)
+    df = src.history('AAA')
+    assert len(df) == 3000
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+    assert df.index.is_monotonic_increasing and (df.index.dayofweek < 5).all()
+    assert (df['High'] >= df[['Open', 'Close']].max(axis=1)).all()
+    assert (df['Low'] <= df[['Open', 'Close']].min(axis=1)).all()
+    assert (df['Low'] > 0).all() and (df['Volume'] > 0).all()
+
+    pd.testing.assert_frame_equal(df, synthetic.SyntheticSource(n_bars=3000, model=model, seed=7).history('AAA'))
+    assert not np.allclose(df['Close'], src.history('BBB')['Close'])
+    assert not np.allclose(df['Close'],
+                           synthetic.SyntheticSource(n_bars=3000, model=model, seed=8).history('AAA')['Close'])
+
+
+def test_chunks_match_the_history_whatever_their_size():
+    src = synthetic.SyntheticSource(n_bars=10_000, model='regime', interval='1m', block_size=4096)
+    full = src.history('AAA')
+    for chunk_size in (999, 4096, 10_000):
+        chunks = list(src.iter_chunks('AAA', chunk_size=chunk_size))
+        assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+        pd.testing.assert_frame_equal(pd.concat(chunks), full)
+
+    #A longer history starts with the shorter one
+    longer = synthetic.SyntheticSource(n_bars=12_000, model='regime', interval='1m', block_size=4096)
+    pd.testing.assert_frame_equal(longer.history('AAA').iloc[:10_000], full)
+
+
+def test_model_parameters_are_annualized():
+    returns = np.log(synthetic.SyntheticSource(n_bars=252*40, volatility=0.2).history('AAA')['Close']).diff()
+    assert returns.std()*np.sqrt(252) == pytest.approx(0.2, rel=0.05)
+
+    #Intraday bars run round the clock: a calendar year of them has the annual volatility
+    minutes = synthetic.SyntheticSource(n_bars=600_000, interval='1m', volatility=0.2).history('AAA', period='1y')
+    assert len(minutes) in (525_600, 527_040)
+    assert np.log(minutes['Close']).diff().std()*np.sqrt(len(minutes)) == pytest.approx(0.2, rel=0.02)
+
+    calm = synthetic.SyntheticSource(n_bars=5000, model='regime', switch_probabilities=(1e-12, 1.)).history('AAA')
+    assert np.log(calm['Close']).diff().std()*np.sqrt(252) == pytest.approx(0.15, rel=0.1)
+
+    jumps = synthetic.SyntheticSource(n_bars=5000, model='jump', jump_intensity=0., seed=3).history('AAA')
+    smooth = synthetic.SyntheticSource(n_bars=5000, model='gbm', seed=3).history('AAA')
+    np.testing.assert_allclose(jumps['Close'], smooth['Close'])
+
+
+def test_slicing_and_validation():
+    src = synthetic.SyntheticSource(n_bars=2000)
+    sliced = src.history('AAA', start='2002-01-01', end='2003-01-01')
+    assert sliced.index.min() >= pd.Timestamp('2002-01-01') and sliced.index.max() < pd.Timestamp('2003-01-01')
+    assert len(src.history('AAA', period='1y')) in range(250, 263)
+    assert src.symbols(3) == ['SYN0000', 'SYN0001', 'SYN0002']
+
+    with pytest.raises(ValueError):
+        synthetic.SyntheticSource(model='garch')
+    with pytest.raises(ValueError):
+        synthetic.SyntheticSource(interval='7m')
+
+
+def test_strategies_and_ticker_run_on_it():
+    src = synthetic.SyntheticSource(n_bars=1500, model='jump')
+    strat = macd_strategy.Macd_Strategy('AAA', data_source=src)
+    assert np.isfinite(strat.backtest_strategy()['strat_returns'])
+
+    symbols = src.symbols(20)
+    results = panel.PanelBacktest.from_source(macd_strategy.Macd_Strategy, symbols, data_source=src).run()
+    assert list(results.index) == symbols and (results['bars'] == 1499).all()
+
+    df = ticker.TickerAdditionalPricepoints('AAA', data_source=src).history(period='1y', derived=True)
+    assert {'HL2', 'HLC3', 'HLCC4', 'OHLC4'} <= set(df.columns)
+    pd.testing.assert_series_equal(df['Close'], src.history('AAA', period='1y')['Close'])
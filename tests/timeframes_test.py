@@ -0,0 +1,146 @@
+from investing_companion.data import synthetic
+from investing_companion.indicators import timeframes, macd, rsi, moving_averages, bollinger
+from investing_companion.strategy import macd_strategy, rsi_strategy, bollinger_strategy, ma_strategy
+from conftest import make_ohlcv
+import numpy as np
+import pandas as pd
+import pytest
+
+AGG = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum', 'Dividends': 'sum'}
+
+
+@pytest.fixture(scope='module')
+def minutes():
+    return synthetic.SyntheticSource(n_bars=4000, interval='1m', tz='America/New_York').history('SYN')
+
+
+def test_bars_match_pandas_resample(minutes):
+    resampler = timeframes.Resampler(minutes.index, ['15m', '1h', '1d'])
+    bars = resampler.ohlcv(minutes)
+    for timeframe, freq in [('15m', '15min'), ('1h', '1h'), ('1d', '1D')]:
+        expected = minutes.resample(freq).agg(AGG).dropna()
+        pd.testing.assert_frame_equal(bars[timeframe][list(AGG)], expected, check_freq=False)
+
+    weekly = timeframes.Resampler(make_ohlcv(300).index, ['1wk', '1mo'])
+    assert len(weekly.labels('1mo')) == 14
+    assert (weekly.labels('1wk').dayofweek == 0).all()
+    with pytest.raises(ValueError):
+        timeframes.Resampler(minutes.index, ['2d'])
+
+
+def test_sessions_drop_the_off_hours_bars(minutes):
+    session = timeframes.Session('09:30', '16:00')
+    bars = timeframes.Resampler(minutes.index, ['15m', '1d'], session).ohlcv(minutes)
+    in_session = minutes.between_time('09:30', '15:59')
+    assert bars['15m'].index[0] == pd.Timestamp('2000-01-03 09:30', tz='America/New_York')
+    assert (bars['15m'].groupby(bars['15m'].index.date).size() == 26).all()
+    assert bars['1d']['Volume'].sum() == pytest.approx(in_session['Volume'].sum())
+    assert bars['1d']['High'].iloc[0] == in_session['High'].loc['2000-01-03'].max()
+
+    #Wall-clock hours across a DST change, and sessions in another timezone than the index
+    utc = minutes.tz_convert('UTC').set_axis(minutes.index.tz_convert('UTC') + pd.Timedelta(days=89))
+    bars = timeframes.Resampler(utc.index, ['1h'], timeframes.Session(tz='America/New_York')).ohlcv(utc)
+    assert (bars['1h'].index.tz_convert('America/New_York').minute == 30).all()
+    with pytest.raises(ValueError):
+        timeframes.Session('16:00', '09:30')
+
+
+def test_aligned_values_have_no_look_ahead(minutes):
+    ind = timeframes.Timeframe(rsi.RelativeStrengthIndex(14), '15m')
+    full = ind.build_df(minutes)[ind.rsi_name]
+    bars = timeframes.Resampler(minutes.index, ['15m']).ohlcv(minutes)['15m']
+    on_bars = rsi.RelativeStrengthIndex(14).build_df(bars)['RSI(14)']
+    #Each bin's value shows up on its last minute, the previous one before
+    last_minutes = bars.index + pd.Timedelta('14min')
+    np.testing.assert_array_equal(full.loc[last_minutes[:-1]].to_numpy(), on_bars.to_numpy()[:-1])
+    np.testing.assert_array_equal(full.loc[bars.index[1:-1]].to_numpy(), on_bars.to_numpy()[:-2])
+
+    #A shorter history gives the same values on the bars it has, ending on a bin boundary or not
+    for k in (990, 1000, 1005, 1007, 1020, 2345):
+        np.testing.assert_array_equal(ind.build_df(minutes.iloc[:k])[ind.rsi_name].to_numpy(), full.to_numpy()[:k])
+
+
+def test_bins_complete_at_their_close(minutes):
+    session = timeframes.Session('09:30', '16:00')
+    resampler = timeframes.Resampler(minutes.index, ['1d', '15m'], session)
+    #The daily bins close with the session
+    closes = minutes.index[resampler.completed_at('1d')]
+    assert list(closes.strftime('%H:%M')) == ['15:59', '15:59', '15:59']
+    #and the 15-minute ones at the end of each slot, the last one of a history isn't over yet
+    partial = timeframes.Resampler(minutes.index[:1007], ['15m'])
+    assert partial.completed_at('15m')[-2:].tolist() == [1004, 1007]
+
+    #A bin missing its last bar is only known at the next bar
+    gapped = minutes.drop(pd.Timestamp('2000-01-03 10:14', tz='America/New_York'))
+    resampler = timeframes.Resampler(gapped.index, ['15m'], session, interval='1m')
+    completed = gapped.index[resampler.completed_at('15m')[:3]]
+    assert list(completed.strftime('%H:%M')) == ['09:44', '09:59', '10:15']
+
+
+def test_several_timeframes_in_one_frame(minutes):
+    daily_macd = timeframes.Timeframe(macd.MACD(6, 3, 2), '1h')
+    fast_rsi = timeframes.Timeframe(rsi.RelativeStrengthIndex(), '15m')
+    df = timeframes.build_df(minutes, [daily_macd, fast_rsi, timeframes.Timeframe(rsi.RelativeStrengthIndex(5), '15m')])
+    assert list(df.columns) == [daily_macd.macd_name, daily_macd.ppo_name, daily_macd.signal_name,
+                                daily_macd.histogram_name, 'RSI(14)@15m', 'RSI(5)@15m']
+    pd.testing.assert_series_equal(df[fast_rsi.rsi_name], fast_rsi.build_df(minutes)[fast_rsi.rsi_name])
+    columns = fast_rsi.build_columns(minutes['Close'])
+    np.testing.assert_array_equal(columns[fast_rsi.rsi_name].to_numpy(), df[fast_rsi.rsi_name].to_numpy())
+
+    ma = timeframes.Timeframe(moving_averages.SimpleMovingAverage(10), '1h')
+    ma.set_parameters(window_size=20)
+    assert (ma.window_size, ma.indicator.window_size, ma.ma_name) == (20, 20, 'SMA(20)@1h')
+
+
+def test_strategies_mix_timeframes(minutes):
+    hourly_macd = timeframes.Timeframe(macd.MACD(6, 3, 2), '1h')
+    strat = macd_strategy.Macd_Strategy.from_data(minutes, 'SYN', macd_object=hourly_macd)
+    assert hourly_macd.macd_name in strat.data.columns
+    result = strat.backtest_strategy()
+    assert np.isfinite(result['strat_returns'])
+
+    compact = macd_strategy.Macd_Strategy.from_data(minutes, 'SYN', macd_object=hourly_macd, compact=True)
+    assert compact.backtest_strategy()['strat_returns'] == pytest.approx(result['strat_returns'])
+
+    fifteen = timeframes.Timeframe(rsi.RelativeStrengthIndex(), '15m')
+    extended = rsi_strategy.RSI_Strategy.from_data(minutes.iloc[:3000], 'SYN', rsi_obj=fifteen)
+    assert extended.extend(minutes.iloc[3000:]) == 1000
+    full = rsi_strategy.RSI_Strategy.from_data(minutes, 'SYN', rsi_obj=fifteen)
+    pd.testing.assert_series_equal(extended.backtest_strategy(), full.backtest_strategy())
+
+
+def test_optimizers_keep_the_timeframe(minutes):
+    session = timeframes.Session('00:00', '23:59')
+    hourly_macd = timeframes.Timeframe(macd.MACD(6, 3, 2), '1h', session)
+    strat = macd_strategy.Macd_Strategy.from_data(minutes, 'SYN', macd_object=hourly_macd)
+    result = strat.tune({'fast_ema': (2, 8)}, budget=6)
+    rebuilt = strat._strategy_kwargs(**result['params'])['macd_object']
+    assert (rebuilt.timeframe, rebuilt.session, rebuilt.fastema_window) == ('1h', session, result['params']['fast_ema'])
+    expected = macd_strategy.Macd_Strategy.from_data(minutes, 'SYN', macd_object=rebuilt)
+    assert expected.backtest_strategy()['strat_returns'] == pytest.approx(result['score'])
+
+    fifteen = rsi_strategy.RSI_Strategy.from_data(minutes, 'SYN',
+                                                  rsi_obj=timeframes.Timeframe(rsi.RelativeStrengthIndex(), '15m'))
+    assert fifteen._strategy_kwargs(rsi_window=5)['rsi_obj'].rsi_name == 'RSI(5)@15m'
+    bands = bollinger_strategy.Bollinger_Strategy.from_data(minutes, 'SYN',
+                                                            bollinger_obj=timeframes.Timeframe(bollinger.BollingerBands(), '1h'))
+    assert bands._strategy_kwargs(ema=10)['bollinger_obj'].timeframe == '1h'
+    for sweep in (strat.sweep_strat_params, fifteen.sweep_strat_params, bands.sweep_strat_params):
+        with pytest.raises(NotImplementedError):
+            sweep()
+
+
+def test_live_evaluators_need_base_timeframe_indicators(minutes):
+    strategies = [
+        macd_strategy.Macd_Strategy.from_data(minutes, 'SYN', macd_object=timeframes.Timeframe(macd.MACD(6, 3, 2), '1h')),
+        rsi_strategy.RSI_Strategy.from_data(minutes, 'SYN', rsi_obj=timeframes.Timeframe(rsi.RelativeStrengthIndex(), '15m')),
+        bollinger_strategy.Bollinger_Strategy.from_data(minutes, 'SYN',
+                                                        bollinger_obj=timeframes.Timeframe(bollinger.BollingerBands(), '1h')),
+        ma_strategy.Ma_Strategy.from_data(minutes, 'SYN', ma_objs=[moving_averages.SimpleMovingAverage(10),
+                                                                   timeframes.Timeframe(moving_averages.SimpleMovingAverage(5), '1h')])]
+    for strat in strategies:
+        with pytest.raises(NotImplementedError, match='to_live'):
+            strat.to_live()
+
+    #On the base timeframe they still go live
+    assert rsi_strategy.RSI_Strategy.from_data(minutes, 'SYN').to_live().on_bar(minutes.iloc[-1]) in (-1, 0, 1)
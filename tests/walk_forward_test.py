@@ -0,0 +1,66 @@
+from investing_companion import instrumentation
+from investing_companion.strategy import walk_forward, rsi_strategy, macd_strategy
+from conftest import make_ohlcv
+import pickle
+import pandas as pd
+import pytest
+
+SPACE = {'rsi_window': (5, 30), 'buffer': (1, 3)}
+
+
+def test_make_folds():
+    folds = walk_forward.make_folds(100, 40, 20)
+    assert [(f.train.start, f.train.stop, f.test.start, f.test.stop) for f in folds]\
+        == [(0, 40, 40, 60), (20, 60, 60, 80), (40, 80, 80, 100)]
+    anchored = walk_forward.make_folds(100, 40, 20, step=30, anchored=True, gap=5)
+    assert [(f.train.start, f.train.stop, f.test.start, f.test.stop) for f in anchored]\
+        == [(0, 40, 45, 65), (0, 70, 75, 95)]
+    with pytest.raises(ValueError):
+        walk_forward.make_folds(50, 40, 20)
+
+
+def test_fold_returns_are_slices_of_one_backtest():
+    strat = rsi_strategy.RSI_Strategy.from_data(make_ohlcv(1000), 'AAA')
+    wf = walk_forward.WalkForward(strat, SPACE, train_size=400, test_size=200)
+    full = rsi_strategy.RSI_Strategy(**strat._strategy_kwargs(rsi_window=10, buffer=2))
+    returns = wf.bar_returns({'rsi_window': 10, 'buffer': 2})
+    assert returns.sum() == pytest.approx(full.backtest_strategy()['strat_returns'])
+    assert wf.bar_returns({'buffer': 2, 'rsi_window': 10}) is returns
+
+
+def test_indicators_are_built_once_per_parameter_set():
+    strat = rsi_strategy.RSI_Strategy.from_data(make_ohlcv(1201), 'AAA')
+    with instrumentation.profile() as prof:
+        wf = strat.walk_forward(SPACE, train_size=400, test_size=200)
+    report = wf.report
+    assert len(report) == 4
+    assert prof.to_dict()['counters']['optimizer_evaluations'] == len(wf._returns)
+    assert len(wf._returns) < report['evaluations'].sum()
+    assert prof.to_dict()['stages']['RSI_Strategy.backtest_strategy']['calls'] == len(wf._returns)
+
+    for fold, (_, row) in zip(wf.folds, report.iterrows()):
+        returns = wf.bar_returns({'rsi_window': row['rsi_window'], 'buffer': row['buffer']})
+        assert row['in_sample'] == pytest.approx(returns[fold.train].sum())
+        assert row['in_sample'] >= wf.bar_returns(strat.tunable_params())[fold.train].sum()
+        assert row['test_start'] > row['train_end']
+
+
+def test_parallel_folds_and_summary():
+    strat = macd_strategy.Macd_Strategy.from_data(make_ohlcv(1000), 'AAA')
+    space = {'fast_ema': (5, 20), 'signal': (5, 12)}
+    serial = strat.walk_forward(space, train_size=300, test_size=150, method='lhs', n_samples=12)
+    with instrumentation.profile() as prof:
+        threaded = strat.walk_forward(space, train_size=300, test_size=150, method='lhs', n_samples=12,
+                                      executor='thread', max_workers=3)
+    pd.testing.assert_frame_equal(serial.report, threaded.report)
+    #The folds share the parameter sets they have in common without backtesting them twice
+    assert prof.to_dict()['counters']['optimizer_evaluations'] == len(threaded._returns)
+    assert len(pickle.loads(pickle.dumps(threaded))._returns) == len(threaded._returns)
+
+    summary = serial.summary()
+    assert summary['folds'] == len(serial.folds) == 4
+    with pytest.raises(ValueError):
+        strat.walk_forward(space, train_size=300, test_size=150, budget=0)
+    assert summary['out_of_sample'] == pytest.approx(serial.oos_returns().sum())
+    assert summary['bnh'] == pytest.approx(serial.report['bnh'].sum())
+    assert 0 <= summary['positive_folds'] <= 1